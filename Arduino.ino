@@ -33,7 +33,33 @@
 #define EXPECTED_SIDE_DISTANCE 5  // Expected side distance when centered ((25-15)/2 = 5cm)
 #define SIDE_TOLERANCE 2     // Acceptable variation in side distance (cm)
 #define FRONT_SAFETY_MARGIN 8     // Safety distance for front obstacle detection (cm)
-#define COMMAND_BUFFER_SIZE 100  // Maximum number of movement commands
+#define COMMAND_BUFFER_SIZE 100  // Ring size in command runs (e.g. "F12" is one run)
+#define LINE_BUFFER_SIZE 128     // Longest command line from the PC
+#define CONTROL_TICK_MS 20       // Executor and sensor period
+#define MOVE_TIMEOUT_MS 3000     // Longest time to drive one block
+#define TURN_TIME_MS 680         // Time for a 90 degree turn; adjust to your car's turning speed
+#define SETTLE_TIME_MS 500       // Pause after stopping
+#define WAIT_TIME_MS 1000        // A 'W' path command holds still this long; fleets keep in step from the PC
+
+// Binary telemetry frames: SYNC, type, length, payload, CRC-8 (see car_protocol.py)
+#define FRAME_SYNC    0xA5
+#define FRAME_SENSORS 0x01   // 4 x uint8 distances: front, right, left, back
+#define FRAME_STEP    0x02   // uint16 step index
+#define FRAME_POS     0x03   // int16 row, int16 col
+#define FRAME_STATUS  0x04   // uint8 status code [, uint16 argument]
+
+// Status codes, shared with STATUS_TEXT in car_protocol.py
+#define ST_MOVING_FORWARD   1
+#define ST_MOVING_BACKWARD  2
+#define ST_TURNING_LEFT     3
+#define ST_TURNING_RIGHT    4
+#define ST_STOPPING         5
+#define ST_EXECUTING        6
+#define ST_NO_PATH          7
+#define ST_STOPPED          8
+#define ST_COMPLETED        9
+#define ST_PATH_RECEIVED    10
+#define ST_WAITING          11
 
 // Create ultrasonic sensor objects
 NewPing frontSonar(FRONT_TRIG_PIN, FRONT_ECHO_PIN, MAX_DISTANCE);
@@ -41,20 +67,66 @@ NewPing rightSonar(RIGHT_TRIG_PIN, RIGHT_ECHO_PIN, MAX_DISTANCE);
 NewPing leftSonar(LEFT_TRIG_PIN, LEFT_ECHO_PIN, MAX_DISTANCE);
 NewPing backSonar(BACK_TRIG_PIN, BACK_ECHO_PIN, MAX_DISTANCE);
 
+// Latest reading of each sensor in cm (0 = no echo), refreshed one per tick
+#define SENSOR_FRONT 0
+#define SENSOR_RIGHT 1
+#define SENSOR_LEFT  2
+#define SENSOR_BACK  3
+NewPing* const sonars[4] = {&frontSonar, &rightSonar, &leftSonar, &backSonar};
+int sensorCm[4] = {0, 0, 0, 0};
+uint8_t nextSensor = 0;
+
+// Motion executor: loop() never blocks, it advances the current motion by
+// one step every CONTROL_TICK_MS so serial input and sensors keep running
+enum MotionState {
+  MOTION_IDLE,
+  MOTION_FORWARD,
+  MOTION_BACKWARD,
+  MOTION_TURN_LEFT,
+  MOTION_TURN_RIGHT,
+  MOTION_WAIT,        // Standing still for one time step of a fleet plan
+  MOTION_SETTLE       // Motors stopped, pausing before the next command
+};
+MotionState motion = MOTION_IDLE;
+unsigned long motionStart = 0;  // When the current motion (or block of a run) began
+bool pathMotion = false;        // Current motion is a path command, not a CMD:
+unsigned long lastTick = 0;
+
 // Variables for path execution
-char commandBuffer[COMMAND_BUFFER_SIZE];
-int commandLength = 0;
-int currentCommand = 0;
+// The path is a ring of run-length encoded runs: runCommand[i] repeated
+// runCount[i] times. Runs are addressed by absolute counters (slot = n %
+// COMMAND_BUFFER_SIZE), so a streamed path can be longer than the ring:
+// slots of runs already driven are reused for new chunks.
+char runCommand[COMMAND_BUFFER_SIZE];
+uint8_t runCount[COMMAND_BUFFER_SIZE];
+unsigned long runWrite = 0;          // Runs stored since the path started
+unsigned long runRead = 0;           // Run being executed
+int runDone = 0;                     // Commands of the current run already executed
+unsigned long commandLength = 0;     // Commands received so far, once expanded
+unsigned long expectedCommands = 0;  // Commands in the whole path
+unsigned long currentCommand = 0;    // Expanded index of the current command, reported as STEP
+bool isStreaming = false;            // Path arrives in CHUNK lines (STREAM mode)
+unsigned int nextChunk = 1;          // Sequence number of the next expected chunk
+bool isWaiting = false;              // Ring ran dry before the stream finished
+
+// Incoming command line, read without String to avoid heap fragmentation
+char lineBuffer[LINE_BUFFER_SIZE];
+uint8_t lineLength = 0;
+
 bool isExecuting = false;
 bool isStopped = true;
 
-// Car position in maze (row, column)
+// Car position in maze (row, column), dead-reckoned from the pose set by
+// "POSE:row:col:heading"; (0, 0) facing North until the PC sends one
 int currentRow = 0;
 int currentCol = 0;
 
 // Current orientation (0=North, 1=East, 2=South, 3=West)
 int currentOrientation = 0;
 
+// Telemetry format, switched by "MODE:BIN" / "MODE:TEXT" from the PC
+bool binaryMode = false;
+
 // Timing variables
 unsigned long lastSensorUpdate = 0;
 unsigned long lastCommandTime = 0;
@@ -62,16 +134,32 @@ const int sensorUpdateInterval = 500;  // Update sensors every 500ms
 const int commandTimeout = 5000;       // Max 5 seconds per command
 
 // Function prototypes
-void executeCommand(char cmd);
-void moveForward();
-void moveBackward();
-void turnLeft();
-void turnRight();
+void startCommand(char cmd, bool fromPath);
+void startNextCommand();
+char nextPathCommand();
+void commandDone();
+void updateMotion(unsigned long now);
+void finishMotion(unsigned long now);
+void moveOneBlock(int blocks);
+void driveForward();
+void driveBackward();
+void spinLeft();
+void spinRight();
+void readNextSensor();
+bool storeCommand(char cmd, int count);
+bool storeRuns(const char* runs);
+int freeRuns();
+void clearPath();
+bool readLine();
+void handleLine(const char* line);
 void stopMotors();
 void updateSensors();
 void sendPosition();
 void adjustPosition();
 bool isAligned();
+void sendStatus(uint8_t code, int arg = -1);
+void sendStep(unsigned long step);
+void sendFrame(uint8_t type, const uint8_t* payload, uint8_t len);
 
 void setup() {
   // Initialize serial communication
@@ -92,264 +180,442 @@ void setup() {
   stopMotors();
   
   // Initial sensor reading
+  for (int i = 0; i < 4; i++) {
+    readNextSensor();
+  }
   updateSensors();
 }
 
 void loop() {
-  // Check for serial commands
-  if (Serial.available() > 0) {
-    String input = Serial.readStringUntil('\n');
+  // Serial input is read on every pass, so a STOP never waits for a motion
+  while (readLine()) {
+    handleLine(lineBuffer);
+  }
+  
+  // Advance sensors and motion at a fixed control tick; nothing below blocks
+  unsigned long now = millis();
+  if (now - lastTick >= CONTROL_TICK_MS) {
+    lastTick = now;
+    readNextSensor();
+    updateMotion(now);
+    
+    // Start the next path command once the previous one has settled
+    if (motion == MOTION_IDLE && isExecuting && !isStopped) {
+      startNextCommand();
+    }
+  }
+  
+  // Send sensor readings periodically
+  if (now - lastSensorUpdate > sensorUpdateInterval) {
+    updateSensors();
+    lastSensorUpdate = now;
+  }
+}
+
+void startNextCommand() {
+  // Begin the next stored command, or report completion or an empty ring
+  if (currentCommand >= expectedCommands) {
+    isExecuting = false;
+    sendStatus(ST_COMPLETED);
+    sendPosition();
+  } else if (runRead < runWrite) {
+    isWaiting = false;
+    sendStep(currentCommand);
+    startCommand(runCommand[runRead % COMMAND_BUFFER_SIZE], true);
+  } else if (!isWaiting) {
+    // Driving faster than the upload: hold still until the next chunk
+    isWaiting = true;
+    sendStatus(ST_WAITING);
+  }
+}
+
+char nextPathCommand() {
+  // The command that follows in the ring, or 0 if it has not arrived yet
+  if (runRead < runWrite && currentCommand < expectedCommands) {
+    return runCommand[runRead % COMMAND_BUFFER_SIZE];
+  }
+  return 0;
+}
+
+void commandDone() {
+  // Move past the executed path command; a finished run frees its slot
+  int slot = runRead % COMMAND_BUFFER_SIZE;
+  currentCommand++;
+  if (++runDone >= runCount[slot]) {
+    runRead++;
+    runDone = 0;
+    // The slot is free again; tell a streaming PC it may send more
+    if (isStreaming && commandLength < expectedCommands) {
+      Serial.print("FREE:");
+      Serial.println(freeRuns());
+    }
+  }
+  lastCommandTime = millis();
+}
+
+bool readLine() {
+  // Collect serial bytes into lineBuffer; true once a full line is there
+  while (Serial.available() > 0) {
+    char c = Serial.read();
+    if (c == '\n') {
+      lineBuffer[lineLength] = '\0';
+      lineLength = 0;
+      return true;
+    }
+    if (c != '\r' && lineLength < LINE_BUFFER_SIZE - 1) {
+      lineBuffer[lineLength++] = c;
+    }
+  }
+  return false;
+}
+
+void handleLine(const char* input) {
+  // Process different command types
+  if (strncmp(input, "CMD:", 4) == 0) {
+    // Single movement command, ignored while a motion or the path is running
+    if ((motion == MOTION_IDLE || motion == MOTION_SETTLE) && !isExecuting) {
+      startCommand(input[4], false);
+    }
+    
+  } else if (strncmp(input, "PATH:", 5) == 0) {
+    // Store path for execution, one command per character
+    clearPath();
+    for (const char* p = input + 5; *p; p++) {
+      if (!storeCommand(*p, 1)) break;
+    }
+    expectedCommands = commandLength;
+    sendStatus(ST_PATH_RECEIVED, commandLength);
     
-    // Process different command types
-    if (input.startsWith("CMD:")) {
-      // Single movement command
-      char cmd = input.charAt(4);
-      executeCommand(cmd);
-      
-    } else if (input.startsWith("PATH:")) {
-      // Store path for execution
-      commandLength = min(input.length() - 5, COMMAND_BUFFER_SIZE - 1);
-      for (int i = 0; i < commandLength; i++) {
-        commandBuffer[i] = input.charAt(i + 5);
+  } else if (strncmp(input, "RPATH:", 6) == 0) {
+    // Store a run-length encoded path such as "F12RF5"
+    clearPath();
+    storeRuns(input + 6);
+    expectedCommands = commandLength;
+    sendStatus(ST_PATH_RECEIVED, commandLength);
+    
+  } else if (strncmp(input, "STREAM:", 7) == 0) {
+    // Start a streamed upload of the given number of commands
+    clearPath();
+    expectedCommands = strtoul(input + 7, NULL, 10);
+    isStreaming = true;
+    nextChunk = 1;
+    Serial.print("ACK:0:");
+    Serial.println(freeRuns());
+    
+  } else if (strncmp(input, "CHUNK:", 6) == 0) {
+    // "CHUNK:seq:runs": store the runs if they all fit, then acknowledge
+    char* runs;
+    unsigned int seq = strtoul(input + 6, &runs, 10);
+    if (*runs == ':') runs++;
+    int needed = 0;
+    for (const char* p = runs; *p; p++) {
+      if (*p >= 'A' && *p <= 'Z') needed++;
+    }
+    if (!isStreaming || seq > nextChunk || (seq == nextChunk && needed > freeRuns())) {
+      Serial.print("NAK:");
+    } else {
+      if (seq == nextChunk) {  // Older sequence numbers are repeats: just re-acknowledge
+        storeRuns(runs);
+        nextChunk++;
       }
-      commandBuffer[commandLength] = '\0';  // Null-terminate
-      
-      currentCommand = 0;
-      isExecuting = false;
-      
-      Serial.print("STATUS:Path received (");
-      Serial.print(commandLength);
-      Serial.println(" commands)");
-      
-    } else if (input.startsWith("EXEC")) {
-      // Start executing the stored path
-      if (commandLength > 0) {
-        isExecuting = true;
-        isStopped = false;
+      Serial.print("ACK:");
+    }
+    Serial.print(seq);
+    Serial.print(":");
+    Serial.println(freeRuns());
+    
+  } else if (strncmp(input, "EXEC", 4) == 0) {
+    // Start executing the stored path; may come before a stream has finished
+    if (expectedCommands > 0) {
+      if (runWrite <= COMMAND_BUFFER_SIZE) {
+        // Whole path still in the ring: (re)start from the beginning
+        runRead = 0;
+        runDone = 0;
         currentCommand = 0;
-        Serial.println("STATUS:Executing path");
-      } else {
-        Serial.println("STATUS:No path to execute");
       }
-      
-    } else if (input.startsWith("STOP")) {
-      // Stop execution
-      isExecuting = false;
-      isStopped = true;
-      stopMotors();
-      Serial.println("STATUS:Stopped");
+      // Otherwise early runs were overwritten, so resume where we stopped
+      isExecuting = true;
+      isStopped = false;
+      isWaiting = false;
+      sendStatus(ST_EXECUTING);
+    } else {
+      sendStatus(ST_NO_PATH);
     }
-  }
-  
-  // Execute path if active
-  if (isExecuting && !isStopped && commandLength > 0) {
-    // Check if we need to start a new command
-    if (currentCommand < commandLength) {
-      char cmd = commandBuffer[currentCommand];
-      
-      // Send step information
-      Serial.print("STEP:");
-      Serial.println(currentCommand);
-      
-      // Execute the command
-      executeCommand(cmd);
-      
-      // Move to next command
-      currentCommand++;
-      lastCommandTime = millis();
-      
-      // If done, send completion
-      if (currentCommand >= commandLength) {
-        isExecuting = false;
-        Serial.println("STATUS:Completed");
-        sendPosition();
+    
+  } else if (strncmp(input, "POSE:", 5) == 0) {
+    // "POSE:row:col:heading": where the car stands before it drives a path;
+    // ignored while a motion or the path is running
+    if ((motion == MOTION_IDLE || motion == MOTION_SETTLE) && !isExecuting) {
+      char* p;
+      int row = strtol(input + 5, &p, 10);
+      int col = (*p == ':') ? strtol(p + 1, &p, 10) : 0;
+      int heading = (*p == ':') ? strtol(p + 1, &p, 10) : -1;
+      if (heading >= 0 && heading < 4) {
+        currentRow = row;
+        currentCol = col;
+        currentOrientation = heading;
       }
     }
-  }
-  
-  // Update sensor readings periodically
-  if (millis() - lastSensorUpdate > sensorUpdateInterval) {
-    updateSensors();
-    lastSensorUpdate = millis();
+    sendPosition();
+    
+  } else if (strncmp(input, "STOP", 4) == 0) {
+    // Stop execution; the motors are off before the next control tick
+    isExecuting = false;
+    isStopped = true;
+    motion = MOTION_IDLE;
+    pathMotion = false;
+    stopMotors();
+    sendStatus(ST_STOPPED);
+    
+  } else if (strncmp(input, "MODE:", 5) == 0) {
+    // Telemetry format negotiation; the acknowledgement is always text
+    if (strncmp(input, "MODE:BIN", 8) == 0) {
+      Serial.println("MODE:BIN");
+      binaryMode = true;
+    } else {
+      binaryMode = false;
+      Serial.println("MODE:TEXT");
+    }
   }
 }
 
-void executeCommand(char cmd) {
-  // Execute a single movement command
+void startCommand(char cmd, bool fromPath) {
+  // Start a movement; updateMotion() finishes it on a later tick
+  pathMotion = fromPath;
+  motionStart = millis();
   switch (cmd) {
     case 'F':
-      Serial.println("STATUS:Moving Forward");
-      moveForward();
+      sendStatus(ST_MOVING_FORWARD);
+      driveForward();
+      motion = MOTION_FORWARD;
       break;
     case 'B':
-      Serial.println("STATUS:Moving Backward");
-      moveBackward();
+      sendStatus(ST_MOVING_BACKWARD);
+      driveBackward();
+      motion = MOTION_BACKWARD;
       break;
     case 'L':
-      Serial.println("STATUS:Turning Left");
-      turnLeft();
+      sendStatus(ST_TURNING_LEFT);
+      spinLeft();
+      motion = MOTION_TURN_LEFT;
       break;
     case 'R':
-      Serial.println("STATUS:Turning Right");
-      turnRight();
+      sendStatus(ST_TURNING_RIGHT);
+      spinRight();
+      motion = MOTION_TURN_RIGHT;
+      break;
+    case 'W':
+      // Give way to another car; reported like a motion so STEP/POS stay in step
+      stopMotors();
+      motion = MOTION_WAIT;
       break;
     case 'S':
-      Serial.println("STATUS:Stopping");
+      sendStatus(ST_STOPPING);
       stopMotors();
+      motion = MOTION_IDLE;
+      if (fromPath) commandDone();
       break;
     default:
       // Ignore unknown commands
+      if (fromPath) commandDone();
       break;
   }
 }
 
-void moveForward() {
-  // Move forward one block (25cm)
-  // Start motors
-  digitalWrite(RIGHT_MOTOR_PIN1, HIGH);
-  digitalWrite(RIGHT_MOTOR_PIN2, LOW);
-  digitalWrite(LEFT_MOTOR_PIN1, HIGH);
-  digitalWrite(LEFT_MOTOR_PIN2, LOW);
-  analogWrite(RIGHT_MOTOR_ENABLE, BASE_SPEED);
-  analogWrite(LEFT_MOTOR_ENABLE, BASE_SPEED+20);
-  
-  // Wait for block completion with alignment adjustments
-  unsigned long startTime = millis();
-  int targetDistance = BLOCK_SIZE;
-  
-  // Use front sensor to measure distance moved
-  int initialDistance = frontSonar.ping_cm();
-  
-  while (millis() - startTime < 3000) {  // Timeout after 3 seconds
-    // Check if we've moved approximately one block
-    int currentDist = frontSonar.ping_cm();
-    
-    // If we're approaching a wall, we've moved enough
-    // Use a safety margin to prevent collisions
-    if (currentDist > 0 && currentDist <= FRONT_SAFETY_MARGIN) {
+void updateMotion(unsigned long now) {
+  // One control tick of the current motion
+  switch (motion) {
+    case MOTION_FORWARD:
+      // Moved far enough once approaching a wall, with a safety margin
+      if ((sensorCm[SENSOR_FRONT] > 0 && sensorCm[SENSOR_FRONT] <= FRONT_SAFETY_MARGIN) ||
+          now - motionStart >= MOVE_TIMEOUT_MS) {
+        finishMotion(now);
+      } else {
+        adjustPosition();
+      }
       break;
-    }
-    
-    // Adjust position if needed
-    adjustPosition();
-    
-    delay(50);  // Small delay between readings
-  }
-  
-  // Stop motors
-  stopMotors();
-  delay(500);  // Pause briefly
-  
-  // Update position based on orientation
-  switch (currentOrientation) {
-    case 0:  // North
-      currentRow--;
+    case MOTION_BACKWARD:
+      // Same as forward but using the back sensor
+      if ((sensorCm[SENSOR_BACK] > 0 && sensorCm[SENSOR_BACK] <= FRONT_SAFETY_MARGIN) ||
+          now - motionStart >= MOVE_TIMEOUT_MS) {
+        finishMotion(now);
+      } else {
+        adjustPosition();
+      }
       break;
-    case 1:  // East
-      currentCol++;
+    case MOTION_TURN_LEFT:
+    case MOTION_TURN_RIGHT:
+      if (now - motionStart >= TURN_TIME_MS) {
+        finishMotion(now);
+      }
       break;
-    case 2:  // South
-      currentRow++;
+    case MOTION_WAIT:
+      if (now - motionStart >= WAIT_TIME_MS) {
+        finishMotion(now);
+      }
       break;
-    case 3:  // West
-      currentCol--;
+    case MOTION_SETTLE:
+      // Pause briefly after stopping
+      if (now - motionStart >= SETTLE_TIME_MS) {
+        motion = MOTION_IDLE;
+      }
+      break;
+    default:
       break;
   }
-  
-  // Send updated position
-  sendPosition();
 }
 
-void moveBackward() {
-  // Move backward one block
-  digitalWrite(RIGHT_MOTOR_PIN1, LOW);
-  digitalWrite(RIGHT_MOTOR_PIN2, HIGH);
-  digitalWrite(LEFT_MOTOR_PIN1, LOW);
-  digitalWrite(LEFT_MOTOR_PIN2, HIGH);
-  analogWrite(RIGHT_MOTOR_ENABLE, BASE_SPEED);
-  analogWrite(LEFT_MOTOR_ENABLE, BASE_SPEED);
-  
-  // Similar to forward but using back sensor
-  unsigned long startTime = millis();
-  
-  while (millis() - startTime < 3000) {  // Timeout after 3 seconds
-    // Check if we've moved approximately one block
-    int currentDist = backSonar.ping_cm();
-    
-    // If we're approaching a wall, we've moved enough
-    if (currentDist > 0 && currentDist <= FRONT_SAFETY_MARGIN) {
+void finishMotion(unsigned long now) {
+  // Book a completed block or turn and report the new position
+  switch (motion) {
+    case MOTION_FORWARD:
+      moveOneBlock(1);
+      break;
+    case MOTION_BACKWARD:
+      moveOneBlock(-1);
+      break;
+    case MOTION_TURN_LEFT:
+      // Counter-clockwise
+      currentOrientation = (currentOrientation + 3) % 4;
+      break;
+    case MOTION_TURN_RIGHT:
+      // Clockwise
+      currentOrientation = (currentOrientation + 1) % 4;
+      break;
+    default:
       break;
-    }
-    
-    // Adjust position if needed
-    adjustPosition();
-    
-    delay(50);
   }
+  sendPosition();
+  // Readings from where the motion ended, so the PC can check the walls of this cell
+  updateSensors();
   
-  // Stop motors
+  if (pathMotion) {
+    bool forward = motion == MOTION_FORWARD;
+    commandDone();
+    // The next command is already in the ring: a following F drives on
+    // without stopping, everything else starts after the settle pause
+    if (forward && isExecuting && nextPathCommand() == 'F') {
+      sendStep(currentCommand);
+      motionStart = now;
+      return;
+    }
+  }
   stopMotors();
-  delay(500);
-  
-  // Update position based on orientation
+  motion = MOTION_SETTLE;
+  motionStart = now;
+}
+
+void moveOneBlock(int blocks) {
+  // Update position based on orientation; blocks is 1 forward, -1 backward
   switch (currentOrientation) {
     case 0:  // North
-      currentRow++;
+      currentRow -= blocks;
       break;
     case 1:  // East
-      currentCol--;
+      currentCol += blocks;
       break;
     case 2:  // South
-      currentRow--;
+      currentRow += blocks;
       break;
     case 3:  // West
-      currentCol++;
+      currentCol -= blocks;
       break;
   }
-  
-  sendPosition();
 }
 
-void turnLeft() {
-  // Turn left 90 degrees
+void clearPath() {
+  // Forget the stored path
+  runWrite = 0;
+  runRead = 0;
+  runDone = 0;
+  commandLength = 0;
+  expectedCommands = 0;
+  currentCommand = 0;
+  isStreaming = false;
+  isExecuting = false;
+  isWaiting = false;
+  // A motion still under way finishes as a single command
+  pathMotion = false;
+}
+
+int freeRuns() {
+  // Ring slots not holding a run that still has to be driven
+  return COMMAND_BUFFER_SIZE - (int)(runWrite - runRead);
+}
+
+bool storeCommand(char cmd, int count) {
+  // Append count repetitions of cmd, merging into the last run when possible.
+  // Returns false once the ring is full.
+  while (count > 0) {
+    int last = (runWrite + COMMAND_BUFFER_SIZE - 1) % COMMAND_BUFFER_SIZE;
+    if (runWrite > runRead && runCommand[last] == cmd && runCount[last] < 255) {
+      int add = min(count, 255 - runCount[last]);
+      runCount[last] += add;
+      commandLength += add;
+      count -= add;
+    } else if (freeRuns() > 0) {
+      int slot = runWrite % COMMAND_BUFFER_SIZE;
+      runCommand[slot] = cmd;
+      runCount[slot] = 0;
+      runWrite++;
+    } else {
+      return false;
+    }
+  }
+  return true;
+}
+
+bool storeRuns(const char* runs) {
+  // Append run-length encoded commands ("F12RF5"); false if the ring filled up
+  while (*runs) {
+    char cmd = *runs++;
+    int count = 0;
+    while (*runs >= '0' && *runs <= '9') {
+      count = count * 10 + (*runs++ - '0');
+    }
+    if (!storeCommand(cmd, count > 0 ? count : 1)) return false;
+  }
+  return true;
+}
+
+void driveForward() {
+  // Start both motors forward
+  digitalWrite(RIGHT_MOTOR_PIN1, HIGH);
+  digitalWrite(RIGHT_MOTOR_PIN2, LOW);
+  digitalWrite(LEFT_MOTOR_PIN1, HIGH);
+  digitalWrite(LEFT_MOTOR_PIN2, LOW);
+  analogWrite(RIGHT_MOTOR_ENABLE, BASE_SPEED);
+  analogWrite(LEFT_MOTOR_ENABLE, BASE_SPEED+20);
+}
+
+void driveBackward() {
+  // Start both motors backward
+  digitalWrite(RIGHT_MOTOR_PIN1, LOW);
+  digitalWrite(RIGHT_MOTOR_PIN2, HIGH);
+  digitalWrite(LEFT_MOTOR_PIN1, LOW);
+  digitalWrite(LEFT_MOTOR_PIN2, HIGH);
+  analogWrite(RIGHT_MOTOR_ENABLE, BASE_SPEED);
+  analogWrite(LEFT_MOTOR_ENABLE, BASE_SPEED);
+}
+
+void spinLeft() {
+  // Turn in place to the left; TURN_TIME_MS gives about 90 degrees
   digitalWrite(RIGHT_MOTOR_PIN1, LOW);
   digitalWrite(RIGHT_MOTOR_PIN2, HIGH);
   digitalWrite(LEFT_MOTOR_PIN1, HIGH);
   digitalWrite(LEFT_MOTOR_PIN2, LOW);
   analogWrite(RIGHT_MOTOR_ENABLE, TURN_SPEED);
   analogWrite(LEFT_MOTOR_ENABLE, TURN_SPEED);
-  
-  // Turn for approximately 90 degrees
-  delay(680);  // Adjust this based on your car's turning speed
-  
-  stopMotors();
-  delay(500);
-  
-  // Update orientation (counter-clockwise)
-  currentOrientation = (currentOrientation + 3) % 4;
-  
-  sendPosition();
 }
 
-void turnRight() {
-  // Turn right 90 degrees
+void spinRight() {
+  // Turn in place to the right; TURN_TIME_MS gives about 90 degrees
   digitalWrite(RIGHT_MOTOR_PIN1, HIGH);
   digitalWrite(RIGHT_MOTOR_PIN2, LOW);
   digitalWrite(LEFT_MOTOR_PIN1, LOW);
   digitalWrite(LEFT_MOTOR_PIN2, HIGH);
   analogWrite(RIGHT_MOTOR_ENABLE, TURN_SPEED);
   analogWrite(LEFT_MOTOR_ENABLE, TURN_SPEED);
-  
-  // Turn for approximately 90 degrees
-  delay(680);  // Adjust this based on your car's turning speed
-  
-  stopMotors();
-  delay(500);
-  
-  // Update orientation (clockwise)
-  currentOrientation = (currentOrientation + 1) % 4;
-  
-  sendPosition();
 }
 
 void stopMotors() {
@@ -362,22 +628,38 @@ void stopMotors() {
   analogWrite(LEFT_MOTOR_ENABLE, 0);
 }
 
+void readNextSensor() {
+  // Ping one sensor per control tick, round robin, so a tick stays short
+  sensorCm[nextSensor] = sonars[nextSensor]->ping_cm();
+  nextSensor = (nextSensor + 1) % 4;
+}
+
 void updateSensors() {
-  // Read all sensors and send data
+  // Send the latest sensor readings
   
   // Ultrasonic sensors
-  int frontDist = frontSonar.ping_cm();
+  int frontDist = sensorCm[SENSOR_FRONT];
   if (frontDist == 0) frontDist = MAX_DISTANCE;  // Convert 0 (no echo) to max distance
   
-  int rightDist = rightSonar.ping_cm();
+  int rightDist = sensorCm[SENSOR_RIGHT];
   if (rightDist == 0) rightDist = MAX_DISTANCE;
   
-  int leftDist = leftSonar.ping_cm();
+  int leftDist = sensorCm[SENSOR_LEFT];
   if (leftDist == 0) leftDist = MAX_DISTANCE;
   
-  int backDist = backSonar.ping_cm();
+  int backDist = sensorCm[SENSOR_BACK];
   if (backDist == 0) backDist = MAX_DISTANCE;
   
+  if (binaryMode) {
+    // One 8-byte frame instead of four text lines
+    uint8_t payload[4] = {
+      (uint8_t)min(frontDist, 255), (uint8_t)min(rightDist, 255),
+      (uint8_t)min(leftDist, 255), (uint8_t)min(backDist, 255)
+    };
+    sendFrame(FRAME_SENSORS, payload, 4);
+    return;
+  }
+  
   // Send ultrasonic sensor data to GUI
   Serial.print("DATA:front:");
   Serial.println(frontDist);
@@ -394,16 +676,89 @@ void updateSensors() {
 
 void sendPosition() {
   // Send current position in maze
+  if (binaryMode) {
+    uint8_t payload[4] = {
+      (uint8_t)(currentRow & 0xFF), (uint8_t)((currentRow >> 8) & 0xFF),
+      (uint8_t)(currentCol & 0xFF), (uint8_t)((currentCol >> 8) & 0xFF)
+    };
+    sendFrame(FRAME_POS, payload, 4);
+    return;
+  }
   Serial.print("POS:");
   Serial.print(currentRow);
   Serial.print(":");
   Serial.println(currentCol);
 }
 
+void sendStep(unsigned long step) {
+  // Report the index of the command being executed
+  if (binaryMode) {
+    // The frame carries the low 16 bits; the PC only needs them to advance
+    uint8_t payload[2] = {(uint8_t)(step & 0xFF), (uint8_t)((step >> 8) & 0xFF)};
+    sendFrame(FRAME_STEP, payload, 2);
+    return;
+  }
+  Serial.print("STEP:");
+  Serial.println(step);
+}
+
+// Status texts for text mode, indexed by status code; keep in step with
+// car_protocol.STATUS_TEXT
+const char* const statusText[] = {
+  "", "Moving Forward", "Moving Backward", "Turning Left", "Turning Right",
+  "Stopping", "Executing path", "No path to execute", "Stopped", "Completed",
+  "Path received", "Waiting for path"
+};
+#define STATUS_TEXT_COUNT (sizeof(statusText) / sizeof(statusText[0]))
+
+void sendStatus(uint8_t code, int arg) {
+  // Report a status change; arg (if >= 0) is the command count for ST_PATH_RECEIVED
+  if (binaryMode) {
+    uint8_t payload[3] = {code, (uint8_t)(arg & 0xFF), (uint8_t)((arg >> 8) & 0xFF)};
+    sendFrame(FRAME_STATUS, payload, arg >= 0 ? 3 : 1);
+    return;
+  }
+  Serial.print("STATUS:");
+  if (code < STATUS_TEXT_COUNT) {
+    Serial.print(statusText[code]);
+  } else {
+    Serial.print("Status ");
+    Serial.print(code);
+  }
+  if (arg >= 0) {
+    Serial.print(" (");
+    Serial.print(arg);
+    Serial.print(" commands)");
+  }
+  Serial.println();
+}
+
+uint8_t crc8Update(uint8_t crc, uint8_t data) {
+  // CRC-8, polynomial 0x07
+  crc ^= data;
+  for (uint8_t i = 0; i < 8; i++) {
+    crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+  }
+  return crc;
+}
+
+void sendFrame(uint8_t type, const uint8_t* payload, uint8_t len) {
+  // Write one binary frame: SYNC, type, length, payload, CRC over type..payload
+  uint8_t crc = crc8Update(crc8Update(0, type), len);
+  Serial.write(FRAME_SYNC);
+  Serial.write(type);
+  Serial.write(len);
+  for (uint8_t i = 0; i < len; i++) {
+    Serial.write(payload[i]);
+    crc = crc8Update(crc, payload[i]);
+  }
+  Serial.write(crc);
+}
+
 void adjustPosition() {
   // Adjust car position to stay centered in the maze cell
-  int leftDist = leftSonar.ping_cm();
-  int rightDist = rightSonar.ping_cm();
+  int leftDist = sensorCm[SENSOR_LEFT];
+  int rightDist = sensorCm[SENSOR_RIGHT];
   
   // Only adjust if both sensors have valid readings
   if (leftDist > 0 && rightDist > 0) {
@@ -437,8 +792,8 @@ void adjustPosition() {
 
 bool isAligned() {
   // Check if the car is aligned in the center of a cell
-  int leftDist = leftSonar.ping_cm();
-  int rightDist = rightSonar.ping_cm();
+  int leftDist = sensorCm[SENSOR_LEFT];
+  int rightDist = sensorCm[SENSOR_RIGHT];
   
   // Car is 15cm wide, corridor is 25cm = ~5cm on each side when centered
   // Consider aligned if distance difference is small AND distances are around expected value
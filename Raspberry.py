@@ -1,14 +1,57 @@
 #!/usr/bin/env python3
 import tkinter as tk
 from tkinter import messagebox, StringVar, simpledialog, filedialog, ttk
-from collections import deque
-import io
-import json
+import os
+import random
 import time
-import threading
 import serial
 import serial.tools.list_ports
-from PIL import Image
+import numpy as np
+
+from maze_cache import SolutionCache, solution_key
+from maze_core import Maze, search as search_maze
+from maze_gen import GENERATORS, generate as generate_maze
+from maze_io import BINARY_EXT, load_maze, save_maze, write_path_export
+from maze_render import CELL_CAR, CELL_END, CELL_PATH, CELL_START, MARK_COLORS, export_image
+from maze_planner import ORIENTATION_COMMANDS, DriveCosts, GoalField, path_commands, plan_drive
+from maze_incremental import IncrementalSolver
+from maze_multi import assign_goals, nearest_free, plan_fleet
+from maze_replan import Replanner
+from car_fleet import FLEET_COLORS, CarSession, FleetManager, FleetRun
+from car_protocol import PathStreamer, parse_message
+from car_telemetry import RECORDING_EXT, RecordingPort, ReplayReader, TelemetryRecorder
+from ring_log import DEBUG, ERROR, INFO, LEVELS, WARNING, RingLog
+from serial_link import SIM_PORT, MessageBus, SerialReader, coalesce, open_port
+
+# Largest maze side the editor accepts; bigger mazes are solved headless with maze_core
+MAX_GUI_SIZE = 500
+
+# Cell fill colors on the canvas, indexed by what the cell shows; a fleet
+# car is drawn as CELL_FLEET plus the index of its color in FLEET_COLORS
+CELL_COLORS = list(MARK_COLORS) + list(FLEET_COLORS)
+CELL_FLEET = len(MARK_COLORS)
+
+# Default resolution of saved images, and the most the dialog allows
+IMAGE_CELL_PX = 16
+MAX_IMAGE_CELL_PX = 256
+
+# Serial feedback is applied once per UI frame, within a fixed time budget
+FRAME_MS = 33
+FRAME_BUDGET_S = 0.015
+
+# How long the car gets to acknowledge MODE:BIN before we stay on text
+MODE_ACK_TIMEOUT_MS = 1000
+
+# Where telemetry recordings of connected runs go
+RECORDINGS_DIR = "recordings"
+
+# Log entries kept in memory, lines kept in the log widget, and how often it is refreshed
+LOG_CAPACITY = 20000
+LOG_VIEW_LINES = 1000
+LOG_REFRESH_MS = 250
+
+# High-rate telemetry, logged at DEBUG so it can be filtered out
+TELEMETRY_KINDS = ("DATA", "STEP", "POS")
 
 class MazeSolverGUI:
     def __init__(self, master):
@@ -19,8 +62,27 @@ class MazeSolverGUI:
         # Serial communication variables
         self.serial_port = None
         self.is_connected = False
-        self.stop_monitor_thread = threading.Event()
-        self.monitor_thread = None
+        self.serial_reader = None
+        self.feedback_bus = MessageBus()  # (line, message) from the reader thread
+        self.link_mode = "TEXT"  # Telemetry format the car acknowledged
+        self.car_acknowledged = False  # Car answered MODE, so it accepts streamed paths
+        self.path_streamer = None  # Chunked upload in progress, if any
+        self.replanner = None  # Follows the car along the path while online replanning is on
+        self.auto_execute = False  # Send EXEC as soon as the streamed path is accepted
+        self.recorder = None  # TelemetryRecorder of the current connection, if recording
+        self.replay_reader = None  # Recording being played back into the feedback bus
+        self.feedback_drain = None  # after() id of the pending _drain_feedback, one at a time
+        
+        # Communication log; the widget shows a filtered tail of it, redrawn in batches
+        self.log = RingLog(LOG_CAPACITY)
+        self.log_render_pending = False
+        
+        # Fleet mode: any number of cars, read by one FleetManager thread
+        self.fleet = None
+        self.fleet_bus = MessageBus()  # (session name, line, message)
+        self.fleet_cars = 0  # Cars added so far, for names and colors
+        self.fleet_summaries = []  # Lines shown in the fleet list
+        self.fleet_run = None  # Steps the planned routes in lockstep while the fleet runs
         
         # Arduino feedback data
         # Arduino feedback data
@@ -45,13 +107,17 @@ class MazeSolverGUI:
         self.car_orientation = 0
         
         # Motion sequence (relative to car's current orientation)
-        self.orientation_commands = {
-            # target_orientation: (current_orientation: command)
-            0: {0: '', 1: 'L', 2: 'BB', 3: 'R'},  # Face North
-            1: {0: 'R', 1: '', 2: 'L', 3: 'BB'},  # Face East
-            2: {0: 'BB', 1: 'R', 2: '', 3: 'L'},  # Face South
-            3: {0: 'L', 1: 'BB', 2: 'R', 3: ''}   # Face West
-        }
+        self.orientation_commands = ORIENTATION_COMMANDS
+        
+        # Estimated maneuver times used by the drive-time planner
+        self.drive_costs = DriveCosts()
+        
+        # Solved routes by maze content, kept across edits, loads and new mazes
+        self.solution_cache = SolutionCache()
+        
+        # Routes to the end from every cell, rebuilt when the walls, end or planner change
+        self.goal_field = None
+        self.goal_field_key = None
         
         # For path execution
         self.path = []
@@ -61,8 +127,8 @@ class MazeSolverGUI:
 
     def create_new_maze(self):
         # Prompt for maze dimensions
-        self.R = simpledialog.askinteger("Rows", "Enter number of rows:", parent=self.master, minvalue=1, maxvalue=50)
-        self.C = simpledialog.askinteger("Columns", "Enter number of columns:", parent=self.master, minvalue=1, maxvalue=50)
+        self.R = simpledialog.askinteger("Rows", "Enter number of rows:", parent=self.master, minvalue=1, maxvalue=MAX_GUI_SIZE)
+        self.C = simpledialog.askinteger("Columns", "Enter number of columns:", parent=self.master, minvalue=1, maxvalue=MAX_GUI_SIZE)
         if not self.R or not self.C:
             messagebox.showerror("Error", "Invalid maze size. Exiting.")
             self.master.destroy()
@@ -70,18 +136,24 @@ class MazeSolverGUI:
 
         # Compute canvas and cell size
         canvas_size = 500
-        self.SW = canvas_size // max(self.C, self.R)
+        self.SW = max(1, canvas_size // max(self.C, self.R))
         self.canvas_width = self.C * self.SW
         self.canvas_height = self.R * self.SW
 
-        # Wall arrays (1=wall)
-        self.hw = [[0] * self.C for _ in range(self.R + 1)]
-        self.vw = [[0] * (self.C + 1) for _ in range(self.R)]
-        self._set_border_walls()
+        # Wall grid (1=wall), kept in a headless Maze model
+        self.maze = Maze(self.R, self.C)
 
         self.start = self.end = None
         self.mode = StringVar(master=self.master, value="wall")
+        self.strategy = StringVar(master=self.master, value="bfs")
+        self.minimize_drive_time = tk.BooleanVar(master=self.master, value=False)
+        self.live_solve = tk.BooleanVar(master=self.master, value=False)
+        self.online_replan = tk.BooleanVar(master=self.master, value=False)
+        self.generator = StringVar(master=self.master, value="backtracker")
+        self.generator_seed = StringVar(master=self.master, value="")  # Blank for a random seed
+        self.incremental = None  # LPA* state reused across wall toggles
         self.car_location = None  # Current car location in maze coordinates
+        self.drawn_layout = None  # (R, C, SW, canvas) the canvas items were built for
 
         # Remove old widgets if they exist
         for widget in self.master.winfo_children():
@@ -90,11 +162,13 @@ class MazeSolverGUI:
         self._build_ui()
         self._draw()
 
-    def _set_border_walls(self):
-        for c in range(self.C):
-            self.hw[0][c] = self.hw[self.R][c] = 1
-        for r in range(self.R):
-            self.vw[r][0] = self.vw[r][self.C] = 1
+    @property
+    def hw(self):
+        return self.maze.hw
+
+    @property
+    def vw(self):
+        return self.maze.vw
 
     def _build_ui(self):
         # Main container with 3 frames
@@ -123,8 +197,16 @@ class MazeSolverGUI:
         for val, txt in [("wall", "Toggle Walls"), ("start", "Start"), ("end", "End")]:
             tk.Radiobutton(self.middle_frame, text=txt, variable=self.mode, value=val).pack(anchor=tk.W)
 
+        tk.Label(self.middle_frame, text="Search:").pack(anchor=tk.W)
+        for val, txt in [("bfs", "BFS"), ("astar", "A*"), ("bidirectional", "Bidirectional")]:
+            tk.Radiobutton(self.middle_frame, text=txt, variable=self.strategy, value=val).pack(anchor=tk.W)
+        tk.Checkbutton(self.middle_frame, text="Minimize drive time", variable=self.minimize_drive_time).pack(anchor=tk.W)
+        tk.Checkbutton(self.middle_frame, text="Live solve", variable=self.live_solve,
+                       command=self._live_resolve).pack(anchor=tk.W)
+
         # Main buttons
         tk.Button(self.middle_frame, text="Solve", command=self.solve).pack(fill=tk.X, pady=5)
+        tk.Button(self.middle_frame, text="Replan from Car", command=self._replan_from_car).pack(fill=tk.X, pady=5)
         tk.Button(self.middle_frame, text="Clear", command=self._reset).pack(fill=tk.X, pady=5)
         
         # File operations section
@@ -135,6 +217,18 @@ class MazeSolverGUI:
         tk.Button(file_frame, text="Load Maze", command=self._load_maze).pack(fill=tk.X, pady=3)
         tk.Button(file_frame, text="New Maze", command=self.create_new_maze).pack(fill=tk.X, pady=3)
         
+        # Maze generator
+        gen_frame = tk.LabelFrame(self.middle_frame, text="Generate")
+        gen_frame.pack(fill=tk.X, pady=10)
+        
+        ttk.Combobox(gen_frame, textvariable=self.generator, values=GENERATORS,
+                     state="readonly", width=12).pack(fill=tk.X, pady=3)
+        seed_frame = tk.Frame(gen_frame)
+        seed_frame.pack(fill=tk.X)
+        tk.Label(seed_frame, text="Seed:").pack(side=tk.LEFT)
+        tk.Entry(seed_frame, textvariable=self.generator_seed, width=8).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(gen_frame, text="Generate Maze", command=self._generate_maze).pack(fill=tk.X, pady=3)
+        
         # Export buttons
         export_frame = tk.LabelFrame(self.middle_frame, text="Export")
         export_frame.pack(fill=tk.X, pady=10)
@@ -158,9 +252,9 @@ class MazeSolverGUI:
         self.port_combo = ttk.Combobox(port_frame, textvariable=self.port_var)
         self.port_combo.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         
-        # Get available ports
+        # Get available ports; the simulated car is always offered last
         ports = [port.device for port in serial.tools.list_ports.comports()]
-        self.port_combo['values'] = ports
+        self.port_combo['values'] = ports + [SIM_PORT]
         if ports:
             self.port_combo.current(0)
             
@@ -170,6 +264,15 @@ class MazeSolverGUI:
         self.connect_button = tk.Button(arduino_frame, text="Connect", command=self._toggle_connection)
         self.connect_button.pack(fill=tk.X, pady=5)
         
+        # Ask the car for binary telemetry frames on connect (falls back to text)
+        self.binary_telemetry = tk.BooleanVar(master=self.master, value=True)
+        tk.Checkbutton(arduino_frame, text="Binary telemetry", variable=self.binary_telemetry).pack(anchor=tk.W)
+        
+        # Record all traffic of each connection to RECORDINGS_DIR, and play recordings back
+        self.record_telemetry = tk.BooleanVar(master=self.master, value=False)
+        tk.Checkbutton(arduino_frame, text="Record telemetry", variable=self.record_telemetry).pack(anchor=tk.W)
+        tk.Button(arduino_frame, text="Replay Recording", command=self._replay_recording).pack(fill=tk.X, pady=5)
+        
         # Car control
         control_frame = tk.LabelFrame(self.right_frame, text="Car Control")
         control_frame.pack(fill=tk.X, pady=10)
@@ -186,6 +289,9 @@ class MazeSolverGUI:
         self.stop_button = tk.Button(control_frame, text="Stop Execution", command=self._stop_execution, state=tk.DISABLED)
         self.stop_button.pack(fill=tk.X, pady=5)
         
+        # Watch STEP/POS/DATA while driving and send a corrected path when the car strays
+        tk.Checkbutton(control_frame, text="Replan while driving", variable=self.online_replan).pack(anchor=tk.W)
+        
         # Test movement buttons
         test_frame = tk.Frame(control_frame)
         test_frame.pack(fill=tk.X, pady=5)
@@ -196,6 +302,19 @@ class MazeSolverGUI:
         tk.Button(test_frame, text="R", command=lambda: self._send_test_command('R'), width=3).pack(side=tk.LEFT, padx=2)
         tk.Button(test_frame, text="S", command=lambda: self._send_test_command('S'), width=3).pack(side=tk.LEFT, padx=2)
         
+        # Fleet of cars, each on its own port, driven side by side
+        fleet_frame = tk.LabelFrame(self.right_frame, text="Fleet")
+        fleet_frame.pack(fill=tk.X, pady=5)
+        
+        self.fleet_list = tk.Listbox(fleet_frame, height=4)
+        self.fleet_list.pack(fill=tk.X)
+        fleet_buttons = tk.Frame(fleet_frame)
+        fleet_buttons.pack(fill=tk.X)
+        for text, command in (("Add Car", self._add_fleet_car), ("Remove", self._remove_fleet_car),
+                              ("Plan", self._plan_fleet), ("Run", self._run_fleet), ("Stop", self._stop_fleet)):
+            tk.Button(fleet_buttons, text=text, command=command).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.fleet_summaries = []
+        
         # Sensor data display
         sensor_frame = tk.LabelFrame(self.right_frame, text="Sensor Data")
         sensor_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -236,8 +355,22 @@ class MazeSolverGUI:
         log_frame = tk.LabelFrame(self.right_frame, text="Communication Log")
         log_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
+        # Filters: minimum level and a prefix such as "DATA", "STATUS" or "→"
+        filter_frame = tk.Frame(log_frame)
+        filter_frame.pack(fill=tk.X)
+        self.log_level = StringVar(master=self.master, value="Debug")
+        self.log_prefix = StringVar(master=self.master, value="")
+        ttk.Combobox(filter_frame, textvariable=self.log_level, values=list(LEVELS),
+                     state="readonly", width=8).pack(side=tk.LEFT)
+        tk.Label(filter_frame, text="Prefix:").pack(side=tk.LEFT)
+        tk.Entry(filter_frame, textvariable=self.log_prefix, width=10).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        for var in (self.log_level, self.log_prefix):
+            var.trace_add("write", lambda *args: self._render_log(full=True))
+        
         self.log_text = tk.Text(log_frame, height=10, width=40)
         self.log_text.pack(fill=tk.BOTH, expand=True)
+        self.log_view_lines = 0
+        self.log_rendered_seq = 0
         
         # Add scrollbar to log
         scrollbar = tk.Scrollbar(self.log_text)
@@ -245,30 +378,54 @@ class MazeSolverGUI:
         self.log_text.config(yscrollcommand=scrollbar.set)
         scrollbar.config(command=self.log_text.yview)
 
-    def _draw(self, path=None):
+    def _build_canvas_items(self):
+        """Create one persistent item per cell and per wall edge"""
         self.canvas.delete("all")
-        # Cells
-        for r in range(self.R):
-            for c in range(self.C):
-                x, y = c*self.SW, r*self.SW
-                fill = "white"
-                if (r,c) == self.start: fill = "green"
-                elif (r,c) == self.end: fill = "red"
-                elif (r,c) == self.car_location: fill = "orange"
-                elif path and (r,c) in path: fill = "lightblue"
-                self.canvas.create_rectangle(x, y, x+self.SW, y+self.SW, fill=fill, outline="black")
-        # Horizontal walls
-        for r in range(self.R+1):
-            for c in range(self.C):
-                if self.hw[r][c]:
-                    x1, y1 = c*self.SW, r*self.SW
-                    self.canvas.create_line(x1, y1, x1+self.SW, y1, width=4)
-        # Vertical walls
-        for r in range(self.R):
-            for c in range(self.C+1):
-                if self.vw[r][c]:
-                    x1, y1 = c*self.SW, r*self.SW
-                    self.canvas.create_line(x1, y1, x1, y1+self.SW, width=4)
+        SW = self.SW
+        self.cell_items = [[self.canvas.create_rectangle(c*SW, r*SW, (c+1)*SW, (r+1)*SW, fill="white", outline="black")
+                            for c in range(self.C)] for r in range(self.R)]
+        # Wall lines are created hidden and shown while the wall exists
+        self.hwall_items = [[self.canvas.create_line(c*SW, r*SW, (c+1)*SW, r*SW, width=4, state=tk.HIDDEN)
+                             for c in range(self.C)] for r in range(self.R+1)]
+        self.vwall_items = [[self.canvas.create_line(c*SW, r*SW, c*SW, (r+1)*SW, width=4, state=tk.HIDDEN)
+                             for c in range(self.C+1)] for r in range(self.R)]
+        self.drawn_cells = np.zeros((self.R, self.C), dtype=np.uint8)
+        self.drawn_hw = np.zeros_like(self.hw)
+        self.drawn_vw = np.zeros_like(self.vw)
+        self.drawn_layout = (self.R, self.C, SW, str(self.canvas))
+
+    def _cell_marks(self, path=None):
+        """What each cell shows, as indexes into CELL_COLORS; later marks win over earlier ones"""
+        cells = np.zeros((self.R, self.C), dtype=np.uint8)
+        if path:
+            rows, cols = zip(*path)
+            cells[list(rows), list(cols)] = CELL_PATH
+        for session in self._fleet_sessions():
+            if session.path:
+                rows, cols = zip(*session.path)
+                cells[list(rows), list(cols)] = CELL_PATH
+        for session in self._fleet_sessions():
+            if session.location and self.maze.in_bounds(*session.location):
+                cells[session.location] = CELL_FLEET + FLEET_COLORS.index(session.color)
+        for mark, cell in ((CELL_CAR, self.car_location), (CELL_END, self.end), (CELL_START, self.start)):
+            if cell:
+                cells[cell] = mark
+        return cells
+
+    def _draw(self, path=None):
+        """Bring the canvas up to date, reconfiguring only the items that changed"""
+        if self.drawn_layout != (self.R, self.C, self.SW, str(self.canvas)):
+            self._build_canvas_items()
+        cells = self._cell_marks(path)
+        for r, c in np.argwhere(cells != self.drawn_cells).tolist():
+            self.canvas.itemconfig(self.cell_items[r][c], fill=CELL_COLORS[cells[r, c]])
+        self.drawn_cells = cells
+        # Walls
+        for walls, drawn, items in ((self.hw, self.drawn_hw, self.hwall_items),
+                                    (self.vw, self.drawn_vw, self.vwall_items)):
+            for r, c in np.argwhere(walls != drawn).tolist():
+                self.canvas.itemconfig(items[r][c], state=tk.NORMAL if walls[r, c] else tk.HIDDEN)
+                drawn[r, c] = walls[r, c]
 
     def _on_click(self, ev):
         x, y = ev.x, ev.y
@@ -283,67 +440,136 @@ class MazeSolverGUI:
                 # If setting start, also set as car location
                 if mode == "start":
                     self.car_location = (r, c)
-            self._draw()
+            if not self._live_resolve():
+                self._draw()
             return
 
         # Toggle specific wall edges
         cell_x = x - c*self.SW
         cell_y = y - r*self.SW
         th = 6
+        cells = []
         if 0 <= r <= self.R and 0 <= c < self.C and abs(cell_y) <= th:
-            self.hw[r][c] ^= 1
+            cells = self.maze.toggle_wall('h', r, c)
         elif 0 <= r < self.R and 0 <= c < self.C and abs(cell_y-self.SW) <= th:
-            self.hw[r+1][c] ^= 1
+            cells = self.maze.toggle_wall('h', r+1, c)
         elif 0 <= r < self.R and 0 <= c <= self.C and abs(cell_x) <= th:
-            self.vw[r][c] ^= 1
+            cells = self.maze.toggle_wall('v', r, c)
         elif 0 <= r < self.R and 0 <= c < self.C and abs(cell_x-self.SW) <= th:
-            self.vw[r][c+1] ^= 1
+            cells = self.maze.toggle_wall('v', r, c+1)
         self.status.set(f"Toggled wall at {(r,c)}")
-        self._draw()
+        if self.incremental:
+            self.incremental.wall_changed(cells)
+        if self.replanner:
+            self.replanner.wall_changed(cells)
+        if not self._live_resolve():
+            self._draw()
 
     def can_move(self, r, c, dr, dc):
-        if dr == 1: return self.hw[r+1][c] == 0
-        if dr == -1: return self.hw[r][c] == 0
-        if dc == 1: return self.vw[r][c+1] == 0
-        if dc == -1: return self.vw[r][c] == 0
-        return False
+        return self.maze.can_move(r, c, dr, dc)
 
     def solve(self):
         if not self.start or not self.end:
             messagebox.showwarning("Need start+end", "Please set both start and end")
             return
-        prev = {self.start: None}
-        dq = deque([self.start])
-        while dq:
-            r, c = dq.popleft()
-            if (r,c) == self.end: break
-            for dr, dc in [(1,0),(-1,0),(0,1),(0,-1)]:
-                nr, nc = r+dr, c+dc
-                if 0<=nr<self.R and 0<=nc<self.C and (nr,nc) not in prev and self.can_move(r,c,dr,dc):
-                    prev[(nr,nc)] = (r,c); dq.append((nr,nc))
-        if self.end not in prev:
+        # Same walls, endpoints and settings as an earlier solve: reuse its route
+        key = solution_key(self.maze, self.start, self.end, self._solve_settings())
+        cached = self.solution_cache.get(key)
+        if cached:
+            self.path, self.movement_commands = cached
+            self._draw(self.path)
+            self.status.set(f"Path found ({len(self.path)} steps, cached)")
+            if self.is_connected:
+                self.send_path_button.config(state=tk.NORMAL)
+            return
+        if self.minimize_drive_time.get():
+            # Plan over (cell, heading) so turns are paid for, not just cells
+            plan = plan_drive(self.maze, self.start, self.end, self.car_orientation, self.drive_costs)
+            path = plan[0] if plan else None
+        else:
+            path, expanded = search_maze(self.maze, self.start, self.end, self.strategy.get())
+        if path is None:
             messagebox.showinfo("No path", "Cannot reach end")
             self.status.set("No path found")
             return
-        path, cur = [], self.end
-        while cur:
-            path.append(cur); cur = prev[cur]
-        path.reverse()
         self.path = path  # Store the path for later use
         self._draw(path)
-        self.status.set(f"Path found ({len(path)} steps)")
         
-        # Generate movement commands
-        self._generate_movement_commands()
+        if self.minimize_drive_time.get():
+            _, self.movement_commands, cost = plan
+            self.status.set(f"Path found ({len(path)} steps, ~{cost:.1f} s drive time)")
+        else:
+            self.status.set(f"Path found ({len(path)} steps, {expanded} nodes expanded)")
+            
+            # Generate movement commands
+            self._generate_movement_commands()
+        self.solution_cache.put(key, self.path, self.movement_commands)
         
         # Enable sending path to car if connected
         if self.is_connected:
             self.send_path_button.config(state=tk.NORMAL)
 
+    def _solve_settings(self):
+        """Planner settings that change the route, as part of the solution cache key"""
+        if self.minimize_drive_time.get():
+            costs = self.drive_costs
+            return ('drive', self.car_orientation, costs.forward, costs.turn90, costs.turn180)
+        return ('search', self.strategy.get())
+
+    def _goal_field(self):
+        """GoalField for the current walls, end and planner; built only when one of them changed"""
+        drive = self.minimize_drive_time.get()
+        costs = self.drive_costs
+        settings = ('field', costs.forward, costs.turn90, costs.turn180) if drive else ('field',)
+        key = solution_key(self.maze, self.end, self.end, settings)
+        if key != self.goal_field_key:
+            self.goal_field = GoalField(self.maze, self.end, costs if drive else None)
+            self.goal_field_key = key
+        return self.goal_field
+
+    def _replan_from_car(self):
+        """Route from wherever the car is now to the same end, read from the goal field"""
+        if not self.end:
+            messagebox.showwarning("Need end", "Please set the end")
+            return
+        origin = self.car_location or self.start
+        if not origin:
+            messagebox.showwarning("Need car", "Please set the start or connect the car")
+            return
+        route = self._goal_field().route(origin, self.car_orientation)
+        if route is None:
+            messagebox.showinfo("No path", "Cannot reach end from the car")
+            self.status.set("No path found")
+            return
+        self.path, self.movement_commands = route
+        self._draw(self.path)
+        self.status.set(f"Replanned from {origin} ({len(self.path)} steps)")
+        if self.is_connected:
+            self.send_path_button.config(state=tk.NORMAL)
+
+    def _live_resolve(self):
+        """Repair the path after an edit when live solving is on; returns True if redrawn"""
+        if not self.live_solve.get() or not self.start or not self.end:
+            return False
+        inc = self.incremental
+        if inc is None or inc.maze is not self.maze or (inc.start, inc.end) != (self.start, self.end):
+            self.incremental = inc = IncrementalSolver(self.maze, self.start, self.end)
+        inc.expanded = 0
+        path = inc.path()
+        self.path = path or []
+        self.movement_commands = []
+        self._draw(self.path)
+        if path is None:
+            self.status.set("Live: no path")
+        else:
+            self.status.set(f"Live: {len(path)} steps ({inc.expanded} cells re-expanded)")
+            self._generate_movement_commands()
+        return True
+
     def _reset(self):
-        self.hw = [[0]*self.C for _ in range(self.R+1)]
-        self.vw = [[0]*(self.C+1) for _ in range(self.R)]
-        self._set_border_walls()
+        self.maze.clear()
+        self.incremental = None
+        self.goal_field = self.goal_field_key = None
         self.start = self.end = None
         self.car_location = None
         self.path = []
@@ -351,6 +577,25 @@ class MazeSolverGUI:
         self.status.set("Cleared")
         self._draw()
 
+    def _generate_maze(self):
+        """Replace the walls with a generated maze of the current size"""
+        seed_text = self.generator_seed.get().strip()
+        try:
+            seed = int(seed_text) if seed_text else random.randrange(2**31)
+        except ValueError:
+            messagebox.showerror("Invalid seed", f"Seed must be a whole number, not {seed_text!r}")
+            return
+        algorithm = self.generator.get()
+        self.maze = generate_maze(self.R, self.C, algorithm, seed)
+        self.path = []
+        self.movement_commands = []
+        self.incremental = None
+        self.replanner = None
+        if not self._live_resolve():
+            self._draw()
+        # The seed is shown so the maze can be generated again
+        self.status.set(f"Generated {algorithm} maze, seed {seed}")
+
     def _export_path(self):
         if not self.start or not self.end or not self.path:
             messagebox.showwarning("No path", "Please solve the maze first")
@@ -368,15 +613,7 @@ class MazeSolverGUI:
             self._generate_movement_commands()
             
         try:
-            with open(file_path, 'w') as f:
-                # Write path cells
-                f.write("Path (row, col):\n")
-                for r, c in self.path:
-                    f.write(f"({r}, {c})\n")
-                    
-                # Write movement commands
-                f.write("\nMovement Commands:\n")
-                f.write(''.join(self.movement_commands))
+            write_path_export(file_path, self.path, self.movement_commands)
                 
             self.status.set(f"Path exported to {file_path}")
         except Exception as e:
@@ -385,51 +622,50 @@ class MazeSolverGUI:
     def _save_maze(self):
         file_path = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", ".json"), ("All files", ".*")]
+            filetypes=[("JSON files", ".json"), ("Binary maze files", BINARY_EXT), ("All files", ".*")]
         )
         if not file_path:
             return
             
-        maze_data = {
-            'rows': self.R,
-            'cols': self.C,
-            'horizontal_walls': self.hw,
-            'vertical_walls': self.vw,
-            'start': self.start,
-            'end': self.end
-        }
-        
         try:
-            with open(file_path, 'w') as f:
-                json.dump(maze_data, f)
+            # Binary for BINARY_EXT files, JSON otherwise
+            save_maze(file_path, self.maze, self.start, self.end)
             self.status.set(f"Maze saved to {file_path}")
         except Exception as e:
             messagebox.showerror("Save error", str(e))
 
     def _load_maze(self):
         file_path = filedialog.askopenfilename(
-            filetypes=[("JSON files", ".json"), ("All files", ".*")]
+            filetypes=[("Maze files", f".json {BINARY_EXT}"), ("JSON files", ".json"),
+                       ("Binary maze files", BINARY_EXT), ("All files", ".*")]
         )
         if not file_path:
             return
             
         try:
-            with open(file_path, 'r') as f:
-                maze_data = json.load(f)
-                
-            self.R = maze_data['rows']
-            self.C = maze_data['cols']
-            self.hw = maze_data['horizontal_walls']
-            self.vw = maze_data['vertical_walls']
-            self.start = tuple(maze_data['start']) if maze_data['start'] else None
-            self.end = tuple(maze_data['end']) if maze_data['end'] else None
+            # Either format, recognized by content
+            maze, start, end = load_maze(file_path)
+            if max(maze.R, maze.C) > MAX_GUI_SIZE:
+                messagebox.showwarning("Maze too large",
+                                       f"{maze.R}x{maze.C} is larger than the editor supports "
+                                       f"({MAX_GUI_SIZE}); solve it headless with maze_core")
+                return
+            self.maze, self.start, self.end = maze, start, end
+            self.R = self.maze.R
+            self.C = self.maze.C
+            
+            # Solvers and the old path belong to the previous maze
+            self.path = []
+            self.movement_commands = []
+            self.incremental = None
+            self.replanner = None
             
             # Update car location to start
             self.car_location = self.start
             
             # Recompute canvas dimensions
             canvas_size = 500
-            self.SW = canvas_size // max(self.C, self.R)
+            self.SW = max(1, canvas_size // max(self.C, self.R))
             self.canvas_width = self.C * self.SW
             self.canvas_height = self.R * self.SW
             
@@ -442,28 +678,32 @@ class MazeSolverGUI:
             messagebox.showerror("Load error", str(e))
 
     def _export_image(self):
+        """Render the maze, path and cars from the wall arrays at a chosen resolution"""
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
             filetypes=[("PNG files", ".png"), ("All files", ".*")]
         )
         if not file_path:
             return
+        cell_px = simpledialog.askinteger("Image resolution", "Pixels per cell:", parent=self.master,
+                                          initialvalue=max(self.SW, IMAGE_CELL_PX),
+                                          minvalue=1, maxvalue=MAX_IMAGE_CELL_PX)
+        if not cell_px:
+            return
             
         try:
-            # Create a temporary PostScript file
-            ps_data = self.canvas.postscript(colormode='color')
-            
-            # Convert PostScript to image using PIL
-            img = Image.open(io.BytesIO(ps_data.encode('utf-8')))
-            img.save(file_path)
-            
-            self.status.set(f"Image saved to {file_path}")
+            # Very large images come out as tiles next to file_path
+            files = export_image(file_path, self.maze, self._cell_marks(self.path), CELL_COLORS, cell_px)
+            if len(files) == 1:
+                self.status.set(f"Image saved to {file_path}")
+            else:
+                self.status.set(f"Image saved as {len(files)} tiles next to {file_path}")
         except Exception as e:
             messagebox.showerror("Export error", str(e))
 
     def _refresh_ports(self):
         ports = [port.device for port in serial.tools.list_ports.comports()]
-        self.port_combo['values'] = ports
+        self.port_combo['values'] = ports + [SIM_PORT]
         if ports:
             self.port_combo.current(0)
 
@@ -475,20 +715,40 @@ class MazeSolverGUI:
                 return
                 
             try:
-                # Connect to Arduino with a 115200 baud rate
-                self.serial_port = serial.Serial(port, 115200, timeout=1)
-                time.sleep(2)  # Wait for Arduino to reset
+                if port == SIM_PORT:
+                    # Software car in the current maze, starting at the start cell
+                    self.serial_port = open_port(port, timeout=1, maze=self.maze.copy(),
+                                                 start=self.start or (0, 0),
+                                                 heading=self.car_orientation)
+                else:
+                    # Connect to Arduino with a 115200 baud rate
+                    self.serial_port = open_port(port, 115200, timeout=1)
+                    time.sleep(2)  # Wait for Arduino to reset
+                
+                if self.record_telemetry.get():
+                    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+                    name = time.strftime("run_%Y%m%d_%H%M%S") + RECORDING_EXT
+                    self.recorder = TelemetryRecorder(os.path.join(RECORDINGS_DIR, name))
+                    self.serial_port = RecordingPort(self.serial_port, self.recorder)
+                    self._log(f"Recording telemetry to {self.recorder.path}")
                 
                 self.is_connected = True
                 self.connect_button.config(text="Disconnect")
                 self.status.set(f"Connected to {port}")
                 self._log(f"Connected to {port}")
                 
-                # Start monitoring thread
-                self.stop_monitor_thread.clear()
-                self.monitor_thread = threading.Thread(target=self._monitor_serial)
-                self.monitor_thread.daemon = True
-                self.monitor_thread.start()
+                # Start reader thread and drain its bus from the Tk loop
+                self.serial_reader = SerialReader(self.serial_port, self.feedback_bus)
+                self.serial_reader.start()
+                self._schedule_feedback(FRAME_MS)
+                
+                # Negotiate telemetry format; an older car ignores the request
+                self.link_mode = "TEXT"
+                self.car_acknowledged = False
+                mode = "BIN" if self.binary_telemetry.get() else "TEXT"
+                self.serial_port.write(f"MODE:{mode}\n".encode())
+                self._log(f"→ MODE:{mode}")
+                self.master.after(MODE_ACK_TIMEOUT_MS, self._check_link_mode)
                 
                 # Enable control buttons if path exists
                 if self.path:
@@ -501,15 +761,21 @@ class MazeSolverGUI:
                 
             except Exception as e:
                 messagebox.showerror("Connection Error", str(e))
-                self._log(f"Error: {str(e)}")
+                self._log(f"Error: {str(e)}", ERROR)
         else:
             # Disconnect
-            self.stop_monitor_thread.set()
-            if self.monitor_thread:
-                self.monitor_thread.join(timeout=1)
+            if self.serial_reader:
+                self.serial_reader.stop()
             
             if self.serial_port and self.serial_port.is_open:
                 self.serial_port.close()
+            if self.serial_reader:
+                self.serial_reader.join(timeout=1)
+                self.serial_reader = None
+            if self.recorder:
+                self.recorder.close()
+                self._log(f"Recorded {self.recorder.records} records to {self.recorder.path}")
+                self.recorder = None
             
             self.is_connected = False
             self.connect_button.config(text="Connect")
@@ -519,78 +785,359 @@ class MazeSolverGUI:
             self.status.set("Disconnected")
             self._log("Disconnected")
 
-    def _monitor_serial(self):
-        """Thread function to monitor serial data from Arduino"""
-        while not self.stop_monitor_thread.is_set():
-            if self.serial_port and self.serial_port.is_open:
-                try:
-                    if self.serial_port.in_waiting:
-                        line = self.serial_port.readline().decode('utf-8').strip()
-                        self._log(f"← {line}")
-                        self._process_feedback(line)
-                except Exception as e:
-                    self._log(f"Error reading: {str(e)}")
-                    break
-            time.sleep(0.1)
-
-    def _process_feedback(self, data):
+    def _schedule_feedback(self, delay):
+        """Run _drain_feedback after delay ms, unless a run is already pending"""
+        if self.feedback_drain is None:
+            self.feedback_drain = self.master.after(delay, self._drain_feedback)
+
+    def _drain_feedback(self):
+        """Apply one frame's worth of queued serial feedback on the Tk thread"""
+        self.feedback_drain = None
+        batch = self.feedback_bus.drain(FRAME_BUDGET_S)
+        if batch:
+            self._log_entries([(DEBUG if message[0] in TELEMETRY_KINDS else INFO, f"← {line}")
+                               if line is not None else (ERROR, f"Error reading: {message[1]}")
+                               for line, message in batch])
+        # Superseded sensor values and positions are never shown, so skip them;
+        # but a followed car's readings belong to the cell of the POS before
+        # them, so the replanner gets every message in order
+        for line, message in (batch if self.replanner else coalesce(batch)):
+            if line is not None:
+                self._process_feedback(line, message)
+        if self.path_streamer and not self.path_streamer.done:
+            self.path_streamer.tick()
+        replay = self.replay_reader
+        if replay and not replay.is_alive() and self.feedback_bus.empty():
+            self._log(f"Replay finished: {replay.messages} messages")
+            self.replay_reader = None
+        if self.is_connected or self.replay_reader:
+            # Come straight back if the budget ran out before the bus was empty
+            self._schedule_feedback(1 if not self.feedback_bus.empty() else FRAME_MS)
+
+    def _replay_recording(self):
+        """Play a telemetry recording back through the feedback path, as if the car sent it"""
+        file_path = filedialog.askopenfilename(
+            initialdir=RECORDINGS_DIR if os.path.isdir(RECORDINGS_DIR) else None,
+            filetypes=[("Telemetry recordings", f"*{RECORDING_EXT}"), ("All files", "*.*")])
+        if not file_path:
+            return
+        speed = simpledialog.askfloat("Replay speed", "Speed (1 = real time, 0 = as fast as possible):",
+                                      parent=self.master, initialvalue=1.0, minvalue=0.0)
+        if speed is None:
+            return
+        try:
+            reader = ReplayReader(file_path, self.feedback_bus, speed)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Replay Error", str(e))
+            return
+        if self.replay_reader:
+            self.replay_reader.stop()
+        self.replay_reader = reader
+        reader.start()
+        self._log(f"Replaying {os.path.basename(file_path)} at {f'{speed:g}x' if speed else 'full speed'}")
+        self._schedule_feedback(FRAME_MS)
+
+    def _fleet_sessions(self):
+        return list(self.fleet.sessions.values()) if self.fleet else []
+
+    def _add_fleet_car(self):
+        """Open the selected port as one more fleet car, at the start cell or the nearest free one"""
+        port = self.port_var.get()
+        if not port:
+            messagebox.showwarning("No Port", "Please select a serial port")
+            return
+        if port != SIM_PORT and (port in self.fleet.sessions if self.fleet else False):
+            messagebox.showwarning("In Use", f"{port} is already in the fleet")
+            return
+        cell = nearest_free(self.maze, self.start or (0, 0),
+                            [session.location for session in self._fleet_sessions() if session.location])
+        if cell is None:
+            messagebox.showwarning("Fleet", "No free cell left for another car")
+            return
+        try:
+            if port == SIM_PORT:
+                conn = open_port(port, timeout=1, maze=self.maze.copy(), start=cell,
+                                 heading=self.car_orientation)
+            else:
+                # The manager only reads what is waiting, so reads never block
+                conn = open_port(port, 115200, timeout=0)
+        except Exception as e:
+            messagebox.showerror("Connection Error", str(e))
+            self._log(f"Error: {str(e)}", ERROR)
+            return
+        
+        self.fleet_cars += 1
+        name = f"car{self.fleet_cars}" if port == SIM_PORT else port
+        session = CarSession(name, conn, cell, self.car_orientation,
+                             FLEET_COLORS[(self.fleet_cars - 1) % len(FLEET_COLORS)])
+        if self.fleet is None:
+            self.fleet = FleetManager(self.fleet_bus)
+            self.fleet.start()
+        running = bool(self.fleet.sessions)
+        self.fleet.add(session)
+        self._log(f"[{name}] Added to the fleet at {cell}")
+        
+        # Negotiate telemetry format; a real car needs its reset time first
+        mode = "BIN" if self.binary_telemetry.get() else "TEXT"
+        self.master.after(0 if port == SIM_PORT else 2000, lambda: self._fleet_send(session, f"MODE:{mode}"))
+        if not running:
+            self.master.after(FRAME_MS, self._drain_fleet)
+        self._draw(self.path)
+
+    def _remove_fleet_car(self):
+        selection = self.fleet_list.curselection()
+        sessions = self._fleet_sessions()
+        if not selection or selection[0] >= len(sessions):
+            messagebox.showinfo("Fleet", "Select a car in the fleet list")
+            return
+        session = self.fleet.remove(sessions[selection[0]].name)
+        self._log(f"[{session.name}] Removed from the fleet")
+        if self.fleet_run and session in self.fleet_run.sessions:
+            # The others would wait for it at the next step for ever
+            self.fleet_run.stop()
+        self._draw(self.path)
+
+    def _fleet_send(self, session, line):
+        try:
+            session.send_line(line)
+            self._log(f"[{session.name}] → {line}")
+        except Exception as e:
+            self._log(f"[{session.name}] Error sending: {str(e)}", ERROR)
+
+    def _plan_fleet(self):
+        """Give every car its own route from where it is to the end; several cars share the maze in time"""
+        if not self.end:
+            messagebox.showwarning("Need end", "Please set the end")
+            return
+        sessions = self._fleet_sessions()
+        placed = [session for session in sessions if session.location]
+        if len(placed) > 1:
+            self._plan_fleet_together(placed)
+        else:
+            field = self._goal_field()
+            for session in placed:
+                route = field.route(session.location, session.heading)
+                if route is None:
+                    self._log(f"[{session.name}] No path from {session.location}", WARNING)
+                    session.set_route([], "")
+                else:
+                    session.set_route(*route)
+            self.status.set(f"Planned {len(sessions)} cars")
+        self._draw(self.path)
+
+    def _plan_fleet_together(self, sessions):
+        """Cooperative routes: the cars park next to each other around the end without ever meeting"""
+        starts = [session.location for session in sessions]
+        try:
+            goals = assign_goals(self.maze, self.end, starts)
+            plan = plan_fleet(self.maze, starts, goals, [session.heading for session in sessions])
+        except ValueError as e:
+            messagebox.showerror("Fleet planning failed", str(e))
+            return
+        for k, session in enumerate(sessions):
+            route = plan.routes[k]
+            if route is None:
+                self._log(f"[{session.name}] Cannot get out of the way at {session.location}, stays put", WARNING)
+                session.set_route([], "")
+                continue
+            session.set_route(*route)
+            if k in plan.short:
+                self._log(f"[{session.name}] Parks at {route[0][-1]}, {goals[k]} is out of reach", WARNING)
+        self.status.set(f"Planned {len(sessions)} cars, {plan.makespan} steps until the last one parks")
+        self._log(f"Fleet plan: makespan {plan.makespan} steps, {plan.total_steps} in all")
+
+    def _run_fleet(self):
+        """Drive the planned routes; several cars go one plan step at a time, all together"""
+        sessions = [session for session in self._fleet_sessions() if session.commands]
+        if len(sessions) > 1:
+            self.fleet_run = FleetRun(sessions)
+            self._log(f"Fleet run: {self.fleet_run.steps} steps, each started once every car has done the last")
+            self._step_fleet()
+            return
+        for session in sessions:
+            try:
+                session.run_route()
+                self._log(f"[{session.name}] → Route of {len(session.commands)} commands")
+            except Exception as e:
+                self._log(f"[{session.name}] Error sending path: {str(e)}", ERROR)
+
+    def _step_fleet(self):
+        """Start the next step of the fleet run once every car has finished the last"""
+        run = self.fleet_run
+        try:
+            run.tick()
+        except Exception as e:
+            self._log(f"Fleet run stopped, error sending a step: {str(e)}", ERROR)
+            run.stop()
+        if run.done:
+            self.fleet_run = None
+            if run.stopped:
+                self._log(f"Fleet run stopped at step {run.step}/{run.steps}", WARNING)
+            else:
+                self._log(f"Fleet run finished after {run.steps} steps")
+
+    def _stop_fleet(self):
+        if self.fleet_run:
+            self.fleet_run.stop()
+        for session in self._fleet_sessions():
+            try:
+                session.stop()
+                self._log(f"[{session.name}] → STOP")
+            except Exception as e:
+                self._log(f"[{session.name}] Error stopping: {str(e)}", ERROR)
+
+    def _drain_fleet(self):
+        """Apply one frame's worth of fleet messages; all cars share one redraw"""
+        batch = self.fleet_bus.drain(FRAME_BUDGET_S)
+        if batch:
+            self._log_entries([(DEBUG if message[0] in TELEMETRY_KINDS else INFO, f"[{name}] ← {line}")
+                               if line is not None else (ERROR, f"[{name}] Error reading: {message[1]}")
+                               for name, line, message in batch])
+        sessions = self.fleet.sessions
+        moved = False
+        for name, line, message in batch:
+            session = sessions.get(name)
+            if session:
+                moved |= session.handle(line, message)
+        for session in self._fleet_sessions():
+            session.tick()
+        if self.fleet_run:
+            self._step_fleet()
+        if moved:
+            self._draw(self.path)
+        
+        # Refresh the list only when a line changed
+        summaries = [f"{s.name} {s.location} {s.status} {s.step}/{len(s.commands)}" for s in self._fleet_sessions()]
+        if summaries != self.fleet_summaries:
+            self.fleet_list.delete(0, tk.END)
+            for k, session in enumerate(self._fleet_sessions()):
+                self.fleet_list.insert(tk.END, summaries[k])
+                self.fleet_list.itemconfig(k, fg=session.color)
+            self.fleet_summaries = summaries
+        if sessions or not self.fleet_bus.empty():
+            self.master.after(1 if not self.fleet_bus.empty() else FRAME_MS, self._drain_fleet)
+
+    def _check_link_mode(self):
+        """Report when the car did not acknowledge the MODE request"""
+        if self.is_connected and not self.car_acknowledged:
+            self._log("No MODE acknowledgement, using text telemetry and plain PATH", WARNING)
+
+    def _process_feedback(self, data, message=None):
         """Process feedback data from Arduino"""
         try:
-            # Parse data format: "DATA:sensor:value"
-            if data.startswith("DATA:"):
-                parts = data.split(":")
-                if len(parts) >= 3:
-                    sensor = parts[1].lower()
-                    value = parts[2]
-                    
-                    # Update sensor data dictionary
-                    self.sensor_data[sensor] = value
+            kind, value = message or parse_message(data)
+            
+            # Sensor reading: "DATA:sensor:value"
+            if kind == "DATA":
+                sensor, value = value
                     
-                    # Update UI elements
-                    if sensor == 'front':
-                        self.front_dist.set(f"{value} cm")
-                    elif sensor == 'right':
-                        self.right_dist.set(f"{value} cm")
-                    elif sensor == 'left':
-                        self.left_dist.set(f"{value} cm")
-                    elif sensor == 'back':
-                        self.back_dist.set(f"{value} cm")
+                # Update sensor data dictionary
+                self.sensor_data[sensor] = value
+                
+                # Update UI elements
+                if sensor == 'front':
+                    self.front_dist.set(f"{value} cm")
+                elif sensor == 'right':
+                    self.right_dist.set(f"{value} cm")
+                elif sensor == 'left':
+                    self.left_dist.set(f"{value} cm")
+                elif sensor == 'back':
+                    self.back_dist.set(f"{value} cm")
+                
+                if self.replanner and value.isdigit():
+                    cells, blocked = self.replanner.on_sensor(sensor, int(value))
+                    if cells:
+                        if self.incremental:
+                            self.incremental.wall_changed(cells)
+                        self._draw(self.path)
+                    if blocked:
+                        self._replan_online()
             
             # Process execution status update
-            elif data.startswith("STEP:"):
-                try:
-                    step = int(data.split(":")[1])
-                    self.current_step = step
-                    self.step_var.set(f"Step: {step}/{len(self.movement_commands)}")
-                    
-                    # Update car location in maze
+            elif kind == "STEP":
+                step = value
+                self.current_step = step
+                self.step_var.set(f"Step: {step}/{len(self.movement_commands)}")
+                
+                # Update car location in maze; a followed car reports it with POS
+                if self.replanner:
+                    self.replanner.on_step(step)
+                else:
                     self._update_car_location(step)
-                except ValueError:
-                    pass
             
-            elif data.startswith("STATUS:"):
-                status = data.split(":", 1)[1]
+            elif kind == "STATUS":
+                status = value
                 self.execution_status = status
                 self.status_var.set(f"Status: {status}")
                 
-                # Handle completion
-                if status.lower() == "completed":
+                if self.replanner:
+                    if status.lower().startswith("executing"):
+                        self.replanner.start()
+                    elif status.lower() in ("completed", "stopped") and not self.auto_execute:
+                        # The plan says which way the car faces now
+                        self.car_orientation = self.replanner.heading
+                
+                # Handle completion, or a stop the car reports on its own
+                if status.lower() in ("completed", "stopped"):
                     self.execute_path_button.config(state=tk.NORMAL)
                     self.stop_button.config(state=tk.DISABLED)
             
+            elif kind in ("ACK", "NAK", "FREE"):
+                streamer = self.path_streamer
+                if streamer:
+                    was_ready, was_done = streamer.ready, streamer.done
+                    streamer.handle(kind, value)
+                    if streamer.ready and not was_ready:
+                        if self.auto_execute:
+                            self._execute_path()
+                        else:
+                            self.execute_path_button.config(state=tk.NORMAL)
+                    if streamer.done and not was_done:
+                        self._log("Path upload complete")
+            
+            elif kind == "MODE":
+                self.link_mode = value
+                self.car_acknowledged = True
+                self._log(f"Telemetry mode: {value}")
+            
             # Update car location if position received
-            elif data.startswith("POS:"):
-                try:
-                    parts = data.split(":")
-                    row = int(parts[1])
-                    col = int(parts[2])
-                    self.car_location = (row, col)
-                    self._draw(self.path)
-                except (ValueError, IndexError):
-                    pass
+            elif kind == "POS":
+                self.car_location = value
+                self._draw(self.path)
+                if self.replanner and self.replanner.on_position(value):
+                    self._replan_online()
         except Exception as e:
-            self._log(f"Error processing feedback: {str(e)}")
+            self._log(f"Error processing feedback: {str(e)}", ERROR)
     
+    def _replan_online(self):
+        """Stop the car and send it a new route from where it is, then run it"""
+        replanner = self.replanner
+        reason = replanner.reason
+        route = replanner.replan()
+        # A replayed recording has no car to redirect; the new plan is only shown
+        connected = self.is_connected and self.serial_port is not None
+        if connected:
+            self._send_line("STOP")
+            self.serial_port.flush()
+        if route is None:
+            self._log(f"Replanning: {reason}; no route to the end, car stopped", WARNING)
+            self.status.set("Replanning: no path")
+            self.replanner = None
+            return
+        self.path, self.movement_commands = route
+        self.car_location = replanner.cell
+        self.car_orientation = replanner.heading
+        self._draw(self.path)
+        self._log(f"Replanning: {reason}; {len(self.path)} steps from {replanner.cell}")
+        self.status.set(f"Replanned ({replanner.replans}x, {replanner.walls_learned} walls learned)")
+        if not self.movement_commands or not connected:
+            return  # Already at the end, or nobody to drive it
+        # Stream the new route and start it once the car accepts it
+        self.auto_execute = True
+        self._send_path_to_car()
+        if not self.path_streamer:
+            self._execute_path()
+
     def _update_car_location(self, step_index):
         """Update car location based on current step in path execution"""
         if not self.path or step_index >= len(self.path):
@@ -612,7 +1159,7 @@ class MazeSolverGUI:
             self.serial_port.write(cmd.encode())
             self._log(f"→ {cmd.strip()}")
         except Exception as e:
-            self._log(f"Error sending command: {str(e)}")
+            self._log(f"Error sending command: {str(e)}", ERROR)
 
     def _generate_movement_commands(self):
         """Convert path cells to movement commands for the car"""
@@ -620,44 +1167,8 @@ class MazeSolverGUI:
             self.movement_commands = []
             return
             
-        # Initialize with start position and north orientation
-        current_pos = self.path[0]
-        current_orientation = 0  # Start facing North
-        commands = []
-        
-        for next_pos in self.path[1:]:
-            # Calculate direction vector
-            dr = next_pos[0] - current_pos[0]
-            dc = next_pos[1] - current_pos[1]
-            move_dir = (dr, dc)
-            
-            # Determine target orientation based on movement direction
-            target_orientation = None
-            if move_dir == (1, 0):   # Moving down (South)
-                target_orientation = 2
-            elif move_dir == (-1, 0): # Moving up (North)
-                target_orientation = 0
-            elif move_dir == (0, 1):  # Moving right (East)
-                target_orientation = 1
-            elif move_dir == (0, -1): # Moving left (West)
-                target_orientation = 3
-                
-            # Get turning commands to face the right direction
-            if target_orientation is not None:
-                turn_cmd = self.orientation_commands[target_orientation][current_orientation]
-                commands.append(turn_cmd)
-                
-                # Update orientation
-                current_orientation = target_orientation
-                
-                # Add forward command to move to next cell
-                commands.append('F')
-                
-            # Update current position
-            current_pos = next_pos
-            
-        # Join all commands into a single string
-        self.movement_commands = ''.join(commands)
+        # Start facing North, turning with ORIENTATION_COMMANDS
+        self.movement_commands = path_commands(self.path, 0)
         return self.movement_commands
 
     def _send_path_to_car(self):
@@ -673,18 +1184,36 @@ class MazeSolverGUI:
             self._generate_movement_commands()
             
         try:
-            # Format for Arduino: "PATH:commands"
-            cmd = f"PATH:{self.movement_commands}\n"
+            commands = ''.join(self.movement_commands)
+            if self.car_acknowledged:
+                # Stream in acknowledged chunks; Execute unlocks after the first ACK
+                self.path_streamer = PathStreamer(commands, self._send_line)
+                self.path_streamer.start()
+                self._log(f"→ Streaming path: {len(commands)} commands in "
+                          f"{len(self.path_streamer.chunks)} chunks")
+                return
+            
+            # Format for older firmware: "PATH:commands"
+            self.path_streamer = None
+            cmd = f"PATH:{commands}\n"
             self.serial_port.write(cmd.encode())
-            self._log(f"→ Path sent: {self.movement_commands}")
+            self._log(f"→ Path sent: {commands}")
             
             # Enable execute button
             self.execute_path_button.config(state=tk.NORMAL)
             
         except Exception as e:
-            self._log(f"Error sending path: {str(e)}")
+            self._log(f"Error sending path: {str(e)}", ERROR)
             messagebox.showerror("Send Error", str(e))
 
+    def _send_line(self, line):
+        """Write one command line to the car"""
+        try:
+            self.serial_port.write(f"{line}\n".encode())
+            self._log(f"→ {line}")
+        except Exception as e:
+            self._log(f"Error sending: {str(e)}", ERROR)
+
     def _execute_path(self):
         """Tell Arduino to start executing the path"""
         if not self.is_connected or not self.serial_port:
@@ -692,7 +1221,23 @@ class MazeSolverGUI:
             return
             
         try:
-            # Send execute command
+            # Follow the car from the start of the path it is about to drive
+            self.auto_execute = False
+            if self.online_replan.get() and self.end and self.path:
+                replanner = self.replanner
+                if replanner is None or replanner.maze is not self.maze or replanner.end != self.end:
+                    self.replanner = Replanner(self.maze, self.end, self.path, self.car_orientation,
+                                               ''.join(self.movement_commands))
+                else:
+                    replanner.follow(self.path, self.car_orientation, ''.join(self.movement_commands))
+            else:
+                self.replanner = None
+            
+            # The car dead-reckons from the pose it is given, so set it to the
+            # start of the path before it drives, then send execute command
+            if self.path:
+                row, col = self.path[0]
+                self.serial_port.write(f"POSE:{row}:{col}:{self.car_orientation}\n".encode())
             cmd = "EXEC\n"
             self.serial_port.write(cmd.encode())
             self._log("→ Execute command sent")
@@ -703,7 +1248,7 @@ class MazeSolverGUI:
             self.status_var.set("Status: Executing")
             
         except Exception as e:
-            self._log(f"Error executing path: {str(e)}")
+            self._log(f"Error executing path: {str(e)}", ERROR)
             messagebox.showerror("Execute Error", str(e))
 
     def _stop_execution(self):
@@ -712,31 +1257,62 @@ class MazeSolverGUI:
             return
             
         try:
-            # Send stop command
+            # Send stop command; the car acts on it within one control tick,
+            # so push it out now rather than behind buffered output
             cmd = "STOP\n"
             self.serial_port.write(cmd.encode())
+            self.serial_port.flush()
             self._log("→ Stop command sent")
             
             # Update UI
             self.execute_path_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.DISABLED)
+            self.status_var.set("Status: Stopping")
             
         except Exception as e:
-            self._log(f"Error stopping execution: {str(e)}")
+            self._log(f"Error stopping execution: {str(e)}", ERROR)
+
+    def _log(self, message, level=INFO):
+        """Add message to the communication log"""
+        self._log_entries([(level, message)])
 
-    def _log(self, message):
-        """Add message to log display with timestamp"""
-        timestamp = time.strftime("%H:%M:%S", time.localtime())
-        log_entry = f"[{timestamp}] {message}\n"
+    def _log_entries(self, entries):
+        """Add (level, message) pairs to the log; the widget catches up within LOG_REFRESH_MS"""
+        self.log.extend(entries)
+        if not self.log_render_pending:
+            self.log_render_pending = True
+            self.master.after(LOG_REFRESH_MS, self._render_log)
+
+    def _render_log(self, full=False):
+        """Append the new entries that pass the filters to the widget with one insert"""
+        self.log_render_pending = False
+        if full:
+            self.log_text.delete("1.0", tk.END)
+            self.log_view_lines = self.log_rendered_seq = 0
+        entries = self.log.select(self.log_rendered_seq, LEVELS.get(self.log_level.get(), DEBUG),
+                                  self.log_prefix.get())
+        self.log_rendered_seq = self.log.seq
+        if not entries:
+            return
+        entries = entries[-LOG_VIEW_LINES:]
+        lines = []
+        second = stamp = None
+        for _, t, _, message in entries:
+            if int(t) != second:
+                second = int(t)
+                stamp = time.strftime("%H:%M:%S", time.localtime(t))
+            lines.append(f"[{stamp}] {message}\n")
         
         # Insert at end and scroll to see it
-        self.log_text.insert(tk.END, log_entry)
+        self.log_text.insert(tk.END, "".join(lines))
         self.log_text.see(tk.END)
         
-        # Keep log size manageable (max 1000 lines)
-        lines = int(self.log_text.index('end-1c').split('.')[0])
-        if lines > 1000:
-            self.log_text.delete(1.0, 2.0)
+        # Keep the widget at LOG_VIEW_LINES lines, trimming the oldest in one delete
+        self.log_view_lines += len(lines)
+        excess = self.log_view_lines - LOG_VIEW_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_view_lines = LOG_VIEW_LINES
 
 # Run the application
 if __name__ == "__main__":
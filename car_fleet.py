@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Fleet mode: many cars, one session per port, all served by a single I/O thread.
+
+A FleetManager owns the ports of every CarSession. Ports with a file
+descriptor (serial devices, pseudo-terminals) are watched with a selector;
+the others (the in-process loopback of simulated cars) are polled every
+POLL_INTERVAL. Decoded messages go onto one MessageBus as
+(session name, line, message), and the Tk loop drains it and calls
+CarSession.handle(), so all session state is only touched on the Tk thread.
+
+A FleetRun drives planned routes in lockstep: the fleet plan counts every
+command as one step, but a block forward, a turn and a wait take a real
+car different times, so each step is sent to all cars at once and the next
+one only when every car has completed it.
+"""
+import io
+import selectors
+import threading
+import time
+
+from car_protocol import FrameDecoder, PathStreamer, parse_message
+from maze_replan import expected_poses
+
+# Seconds between checks of ports that cannot be selected on; with only
+# selectable ports the thread sleeps in select() up to SELECT_TIMEOUT
+POLL_INTERVAL = 0.01
+SELECT_TIMEOUT = 0.1
+
+# Canvas colors of the cars, in the order they join
+FLEET_COLORS = ("purple", "magenta", "cyan", "gold", "brown", "pink", "gray", "olive")
+
+
+def _fileno(port):
+    try:
+        return port.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+class CarSession:
+    """One car of the fleet: its port, route, execution state and telemetry"""
+
+    def __init__(self, name, port, cell=None, heading=0, color="purple"):
+        self.name = name
+        self.port = port
+        self.color = color
+        self.decoder = FrameDecoder()
+        self.fd = None  # Selected on by the FleetManager, None when polled
+        self.location = cell
+        self.heading = heading
+        self.path = []
+        self.commands = ""
+        self.end_heading = heading  # Heading once the route is driven
+        self.poses = []  # (row, col, heading) along the route
+        self.next_step = 0  # Commands of the route sent one at a time so far
+        self.step_base = 0  # Route index of the car's command 0
+        self.running = False
+        self.streamer = None
+        self.auto_execute = False
+        self.acknowledged = False
+        self.link_mode = "TEXT"
+        self.status = "Not started"
+        self.step = 0
+        self.sensors = {}
+        self.messages = 0
+        self.error = None
+
+    def send_line(self, line):
+        self.port.write(f"{line}\n".encode())
+
+    def set_route(self, path, commands):
+        """Route from the car's location and heading; commands as the car takes them"""
+        self.path = list(path)
+        self.commands = commands
+        self.poses = expected_poses(self.location, self.heading, commands)
+        self.end_heading = self.poses[-1][2]
+        self.next_step = 0
+
+    def run_route(self):
+        """Upload the route and start it as soon as the car has it"""
+        self.auto_execute = True
+        self.step_base = 0
+        if self.acknowledged:
+            self.streamer = PathStreamer(self.commands, self.send_line)
+            self.streamer.start()
+        else:
+            self.streamer = None
+            self.send_line(f"PATH:{self.commands}")
+            self.execute()
+
+    def load_step(self):
+        """Send the next command of the route as a path of its own, to start with execute()"""
+        self.streamer = None
+        self.step_base = self.next_step
+        self.send_line(f"PATH:{self.commands[self.next_step]}")
+        self.next_step += 1
+        self.end_heading = self.poses[self.next_step][2]
+
+    def execute(self):
+        """Start the route; the car dead-reckons, so first tell it where it stands"""
+        self.auto_execute = False
+        row, col = self.location
+        self.send_line(f"POSE:{row}:{col}:{self.heading}")
+        self.send_line("EXEC")
+        self.running = True
+
+    def stop(self):
+        self.auto_execute = False
+        self.send_line("STOP")
+        self.port.flush()
+
+    def handle(self, line, message=None):
+        """Apply one message from the car; returns True if its position changed"""
+        kind, value = message or parse_message(line)
+        self.messages += 1
+        if kind == "POS":
+            moved = value != self.location
+            self.location = value
+            return moved
+        if kind == "DATA":
+            self.sensors[value[0]] = value[1]
+        elif kind == "STEP":
+            self.step = self.step_base + value
+        elif kind == "STATUS":
+            self.status = value
+            if value.lower() == "completed":
+                self.heading = self.end_heading
+            if value.lower() in ("completed", "stopped", "no path to execute"):
+                self.running = False
+        elif kind == "MODE":
+            self.link_mode = value
+            self.acknowledged = True
+        elif kind in ("ACK", "NAK", "FREE") and self.streamer:
+            was_ready = self.streamer.ready
+            self.streamer.handle(kind, value)
+            if self.streamer.ready and not was_ready and self.auto_execute:
+                self.execute()
+        elif kind == "ERROR":
+            self.error = value
+            self.status = f"Link error: {value}"
+            self.running = False
+        return False
+
+    def tick(self):
+        if self.streamer and not self.streamer.done:
+            self.streamer.tick()
+
+    def __repr__(self):
+        return f"CarSession({self.name!r}, at {self.location}, {self.status!r})"
+
+
+class FleetRun:
+    """Drives the routes of sessions one plan step at a time, every car together.
+
+    Each step is loaded into all cars that still have commands left before
+    any of them is told to execute it, and tick() only starts the next step
+    once every car reported its step completed, so a car that is done early
+    waits for the slowest instead of running into the next step of the plan.
+    A car that stops or loses its link ends the run for all of them.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = [session for session in sessions if session.commands]
+        for session in self.sessions:
+            session.next_step = 0
+        self.steps = max((len(session.commands) for session in self.sessions), default=0)
+        self.step = 0  # Steps started so far
+        self.stopped = False
+
+    @property
+    def done(self):
+        return self.stopped or (self.step >= self.steps and not any(s.running for s in self.sessions))
+
+    def stop(self):
+        self.stopped = True
+
+    def tick(self):
+        """Start the next step if every car has finished the last; returns True if one was started"""
+        if self.done or any(session.running for session in self.sessions):
+            return False
+        if self.step and any(session.error or session.status in ("Stopped", "No path to execute")
+                             for session in self.sessions):
+            self.stopped = True
+            return False
+        moving = [session for session in self.sessions if session.next_step < len(session.commands)]
+        for session in moving:
+            session.load_step()
+        for session in moving:
+            session.execute()
+        self.step += 1
+        return True
+
+    def __repr__(self):
+        return f"FleetRun(step {self.step}/{self.steps}, {len(self.sessions)} cars)"
+
+
+class FleetManager(threading.Thread):
+    """Reads every session's port from one thread and puts (name, line, message) on bus"""
+
+    def __init__(self, bus):
+        super().__init__(daemon=True)
+        self.bus = bus
+        self.sessions = {}
+        self.selector = selectors.DefaultSelector()
+        self.polled = []
+        self.lock = threading.Lock()
+        self.changes = []  # ("add" | "remove", session), applied by the I/O thread
+        self.stop_event = threading.Event()
+
+    def add(self, session):
+        self.sessions[session.name] = session
+        with self.lock:
+            self.changes.append(("add", session))
+
+    def remove(self, name):
+        """Forget a session and close its port"""
+        session = self.sessions.pop(name, None)
+        if session:
+            with self.lock:
+                self.changes.append(("remove", session))
+        return session
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _apply_changes(self):
+        with self.lock:
+            changes, self.changes = self.changes, []
+        for action, session in changes:
+            if action == "add":
+                session.fd = _fileno(session.port)
+                if session.fd is None:
+                    self.polled.append(session)
+                else:
+                    self.selector.register(session.fd, selectors.EVENT_READ, session)
+            else:
+                if session in self.polled:
+                    self.polled.remove(session)
+                elif session.fd in self.selector.get_map():
+                    self.selector.unregister(session.fd)
+                try:
+                    session.port.close()
+                except OSError:
+                    pass
+
+    def _read(self, session):
+        put = self.bus.put
+        try:
+            data = session.port.read(max(1, session.port.in_waiting))
+        except Exception as e:
+            # The session stays listed with its error; only its port is dropped
+            put((session.name, None, ("ERROR", str(e))))
+            with self.lock:
+                self.changes.append(("remove", session))
+            return
+        for line, message in session.decoder.feed(data):
+            put((session.name, line, message))
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                self._apply_changes()
+                timeout = POLL_INTERVAL if self.polled else SELECT_TIMEOUT
+                if self.selector.get_map():
+                    for key, _ in self.selector.select(timeout):
+                        self._read(key.data)
+                else:
+                    time.sleep(timeout)
+                for session in list(self.polled):
+                    if session.port.in_waiting:
+                        self._read(session)
+        finally:
+            for session in list(self.sessions.values()):
+                self.remove(session.name)
+            self._apply_changes()
+            self.selector.close()
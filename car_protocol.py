@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Wire format between the PC and the car: text lines and binary telemetry frames.
+
+The car always starts in text mode, one ASCII line per message. After the
+PC sends "MODE:BIN" a car that supports it answers "MODE:BIN" and switches
+its telemetry to checksummed binary frames:
+
+    SYNC (0xA5) | type | length | payload (length bytes) | CRC-8 of type, length, payload
+
+SYNC never occurs in the ASCII text, so FrameDecoder accepts both formats
+on the same stream and a car without binary support simply keeps talking
+text. Commands from the PC stay text lines in either mode.
+
+Paths go out either as "PATH:<commands>", one character per command, or,
+to a car that answered the MODE request, streamed by PathStreamer:
+"STREAM:<total commands>" followed by "CHUNK:<seq>:<runs>" lines of
+run-length encoded commands (see compress_commands), each answered with
+"ACK:<seq>:<free>" or "NAK:<seq>:<free>". While streaming, the car sends
+"FREE:<free>" whenever it has driven a run and freed a slot of its ring.
+
+The car dead-reckons the cells it reports in POS from (0, 0) facing North,
+or from the pose the PC gives it with "POSE:<row>:<col>:<heading>" before a
+path; it answers POSE with its POS.
+"""
+import re
+import struct
+import time
+
+SYNC = 0xA5
+MAX_PAYLOAD = 64
+
+# Frame types sent by the car
+FRAME_SENSORS = 0x01  # 4 x uint8 distances in cm, in SENSOR_ORDER
+FRAME_STEP = 0x02     # uint16 step index
+FRAME_POS = 0x03      # int16 row, int16 col
+FRAME_STATUS = 0x04   # uint8 status code [, uint16 argument]
+FRAME_TEXT = 0x05     # raw ASCII line
+
+SENSOR_ORDER = ('front', 'right', 'left', 'back')
+
+# Sensor directions relative to the heading, in SENSOR_ORDER
+SENSOR_TURNS = (0, 1, 3, 2)
+
+# Sensor geometry, as in Arduino.ino: a block is BLOCK_CM long and a sensor
+# sits SIDE_GAP_CM back from the edge of the block the car is in
+BLOCK_CM = 25
+SIDE_GAP_CM = 5
+MAX_DISTANCE_CM = 200
+
+# Motion of a single command: (position change in blocks, quarter turns);
+# 'W' stands still for one time step of a fleet plan
+MOTIONS = {'F': (1, 0), 'B': (-1, 0), 'L': (0, 3), 'R': (0, 1), 'W': (0, 0)}
+
+# Status codes shared with Arduino.ino (ST_* defines)
+ST_MOVING_FORWARD = 1
+ST_MOVING_BACKWARD = 2
+ST_TURNING_LEFT = 3
+ST_TURNING_RIGHT = 4
+ST_STOPPING = 5
+ST_EXECUTING = 6
+ST_NO_PATH = 7
+ST_STOPPED = 8
+ST_COMPLETED = 9
+ST_PATH_RECEIVED = 10
+ST_WAITING = 11
+
+# Status texts; {} is filled with the frame argument
+STATUS_TEXT = {
+    ST_MOVING_FORWARD: "Moving Forward",
+    ST_MOVING_BACKWARD: "Moving Backward",
+    ST_TURNING_LEFT: "Turning Left",
+    ST_TURNING_RIGHT: "Turning Right",
+    ST_STOPPING: "Stopping",
+    ST_EXECUTING: "Executing path",
+    ST_NO_PATH: "No path to execute",
+    ST_STOPPED: "Stopped",
+    ST_COMPLETED: "Completed",
+    ST_PATH_RECEIVED: "Path received ({} commands)",
+    ST_WAITING: "Waiting for path",
+}
+
+
+def _crc8_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data, crc=0):
+    """CRC-8 with polynomial 0x07, as computed by crc8Update() on the car"""
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_frame(kind, payload=b""):
+    header = bytes((kind, len(payload)))
+    return bytes((SYNC,)) + header + payload + bytes((crc8(header + payload),))
+
+
+# Longest run the car stores in one entry (a uint8 count)
+MAX_RUN = 255
+
+_RUN_RE = re.compile(r"([A-Z])(\d*)")
+
+# Run slots in the car's ring buffer (COMMAND_BUFFER_SIZE in Arduino.ino)
+CAR_RING_RUNS = 100
+
+# Payload bytes per CHUNK line; the whole line must fit the car's 64-byte
+# serial receive buffer, which fills while the car is busy driving
+CHUNK_BYTES = 40
+
+
+def compress_commands(commands):
+    """Run-length encode a movement string: 'FFFFRFF' -> 'F4RF2'"""
+    out = []
+    i, n = 0, len(commands)
+    while i < n:
+        cmd = commands[i]
+        j = i + 1
+        while j < n and commands[j] == cmd and j - i < MAX_RUN:
+            j += 1
+        out.append(cmd if j - i == 1 else f"{cmd}{j - i}")
+        i = j
+    return "".join(out)
+
+
+def parse_runs(runs):
+    """Runs of a compressed movement string as (command, count): 'F4R' -> [('F', 4), ('R', 1)]"""
+    return [(cmd, int(count) if count else 1) for cmd, count in _RUN_RE.findall(runs)]
+
+
+def expand_commands(runs):
+    """Inverse of compress_commands: 'F4RF2' -> 'FFFFRFF'"""
+    return "".join(cmd * count for cmd, count in parse_runs(runs))
+
+
+def parse_message(line):
+    """Parse one text line from the car into a (kind, value) tuple.
+
+    DATA:front:123     -> ('DATA', ('front', '123'))
+    STEP:4             -> ('STEP', 4)
+    STATUS:Completed   -> ('STATUS', 'Completed')
+    POS:2:3            -> ('POS', (2, 3))
+    MODE:BIN           -> ('MODE', 'BIN')
+    ACK:3:97           -> ('ACK', (3, 97))   (likewise NAK)
+    FREE:98            -> ('FREE', 98)
+    Anything else, including malformed lines, is ('TEXT', line).
+    """
+    kind, sep, rest = line.partition(":")
+    if sep:
+        try:
+            if kind == "DATA":
+                sensor, sep, value = rest.partition(":")
+                if sep:
+                    return ("DATA", (sensor.lower(), value.split(":", 1)[0]))
+            elif kind == "STEP":
+                return ("STEP", int(rest))
+            elif kind == "STATUS":
+                return ("STATUS", rest)
+            elif kind == "POS":
+                row, col = rest.split(":")[:2]
+                return ("POS", (int(row), int(col)))
+            elif kind == "MODE":
+                return ("MODE", rest)
+            elif kind in ("ACK", "NAK"):
+                seq, free = rest.split(":")[:2]
+                return (kind, (int(seq), int(free)))
+            elif kind == "FREE":
+                return ("FREE", int(rest))
+        except ValueError:
+            pass
+    return ("TEXT", line)
+
+
+def decode_frame(kind, payload):
+    """Turn one binary frame into (line, message) tuples, as if it had come as text"""
+    try:
+        if kind == FRAME_SENSORS:
+            return [(f"DATA:{name}:{value}", ("DATA", (name, str(value))))
+                    for name, value in zip(SENSOR_ORDER, payload)]
+        if kind == FRAME_STEP:
+            (step,) = struct.unpack("<H", payload)
+            return [(f"STEP:{step}", ("STEP", step))]
+        if kind == FRAME_POS:
+            row, col = struct.unpack("<hh", payload)
+            return [(f"POS:{row}:{col}", ("POS", (row, col)))]
+        if kind == FRAME_STATUS:
+            text = STATUS_TEXT.get(payload[0], f"Status {payload[0]}")
+            if len(payload) >= 3:
+                text = text.format(struct.unpack_from("<H", payload, 1)[0])
+            return [(f"STATUS:{text}", ("STATUS", text))]
+        if kind == FRAME_TEXT:
+            line = payload.decode("ascii", "replace")
+            return [(line, parse_message(line))]
+    except (struct.error, IndexError):
+        pass
+    return [(f"<frame {kind:#04x}: {payload.hex()}>", ("TEXT", payload.hex()))]
+
+
+class FrameDecoder:
+    """Incremental decoder for a stream mixing text lines and binary frames.
+
+    feed() takes whatever bytes arrived and returns the complete messages
+    as (line, message) tuples; incomplete input stays in a reused buffer.
+    Frames with a bad checksum are counted in errors and skipped by
+    resynchronizing on the next SYNC byte.
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        out = []
+        pos, n = 0, len(buf)
+        while pos < n:
+            if buf[pos] == SYNC:
+                if n - pos < 3:
+                    break
+                kind, length = buf[pos+1], buf[pos+2]
+                end = pos + 3 + length
+                if length > MAX_PAYLOAD:
+                    self.errors += 1
+                    pos += 1
+                    continue
+                if n <= end:
+                    break
+                if crc8(buf[pos+1:end]) != buf[end]:
+                    self.errors += 1
+                    pos += 1
+                    continue
+                out.extend(decode_frame(kind, bytes(buf[pos+3:end])))
+                pos = end + 1
+            else:
+                nl = buf.find(b"\n", pos)
+                sync = buf.find(SYNC, pos, nl if nl >= 0 else n)
+                if sync >= 0:
+                    # Text never contains SYNC: this is the tail of a damaged frame
+                    self.errors += 1
+                    pos = sync
+                    continue
+                if nl < 0:
+                    break
+                line = buf[pos:nl].decode("utf-8", "replace").strip()
+                if line:
+                    out.append((line, parse_message(line)))
+                pos = nl + 1
+        del buf[:pos]
+        return out
+
+
+class PathStreamer:
+    """Uploads a movement string to the car in acknowledged chunks.
+
+    The path is run-length encoded and cut into CHUNK lines of whole runs.
+    A chunk is only sent when the car has reported enough free ring slots
+    for all of its runs, and at most window chunks are unacknowledged at
+    a time, so the car can start driving after the first ACK while the
+    rest of an arbitrarily long route follows. send is called with each
+    line to write (without the newline); feed the car's ACK, NAK and FREE
+    messages to handle() and call tick() periodically so a chunk whose
+    acknowledgement got lost is sent again.
+    """
+
+    def __init__(self, commands, send, window=1, chunk_bytes=CHUNK_BYTES, ack_timeout=5.0):
+        self.total = len(commands)
+        self.send = send
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.chunks = self._split(parse_runs(compress_commands(commands)), chunk_bytes)
+        self.next_chunk = 0  # Index of the next chunk to send
+        self.in_flight = {}  # seq -> time sent
+        self.acked = 0       # Chunks acknowledged so far
+        self.free = 0        # Free ring slots as last reported by the car
+        self.started = False
+        self.stream_sent = None
+
+    @staticmethod
+    def _split(runs, chunk_bytes):
+        # Returns a list of (runs payload, number of runs)
+        chunks, current, size = [], [], 0
+        for cmd, count in runs:
+            token = cmd if count == 1 else f"{cmd}{count}"
+            if current and size + len(token) > chunk_bytes:
+                chunks.append(("".join(current), len(current)))
+                current, size = [], 0
+            current.append(token)
+            size += len(token)
+        if current:
+            chunks.append(("".join(current), len(current)))
+        return chunks
+
+    @property
+    def done(self):
+        return self.acked == len(self.chunks)
+
+    @property
+    def ready(self):
+        """True once the car holds enough of the path to start driving"""
+        return self.acked > 0 or (self.started and not self.chunks)
+
+    def start(self):
+        self.send(f"STREAM:{self.total}")
+        self.stream_sent = time.monotonic()
+
+    def _runs_in_flight(self):
+        return sum(self.chunks[seq - 1][1] for seq in self.in_flight)
+
+    def _pump(self):
+        while (self.next_chunk < len(self.chunks) and len(self.in_flight) < self.window
+               and self.chunks[self.next_chunk][1] <= self.free - self._runs_in_flight()):
+            seq = self.next_chunk + 1
+            self.send(f"CHUNK:{seq}:{self.chunks[self.next_chunk][0]}")
+            self.in_flight[seq] = time.monotonic()
+            self.next_chunk += 1
+
+    def handle(self, kind, value):
+        """Process one ACK, NAK or FREE message from the car"""
+        if kind == "FREE":
+            self.free = value
+        elif kind == "ACK":
+            seq, self.free = value
+            if seq == 0:
+                self.started = True
+            elif self.in_flight.pop(seq, None) is not None:
+                self.acked += 1
+        elif kind == "NAK":
+            # Not stored (no room yet): send it again once slots free up
+            seq, self.free = value
+            if self.in_flight.pop(seq, None) is not None:
+                self.next_chunk = min(self.next_chunk, seq - 1)
+                for later in [s for s in self.in_flight if s > seq]:
+                    del self.in_flight[later]
+        self._pump()
+
+    def tick(self, now=None):
+        """Resend the STREAM line or chunks whose acknowledgement is overdue"""
+        now = time.monotonic() if now is None else now
+        if not self.started and self.stream_sent is not None and now - self.stream_sent > self.ack_timeout:
+            self.start()
+        for seq, sent in list(self.in_flight.items()):
+            if now - sent > self.ack_timeout:
+                self.send(f"CHUNK:{seq}:{self.chunks[seq - 1][0]}")
+                self.in_flight[seq] = now
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""Software stand-in for the car: speaks the Arduino.ino protocol with configurable timing."""
+import os
+import struct
+import threading
+import time
+
+from car_protocol import (
+    BLOCK_CM, CAR_RING_RUNS, FRAME_POS, FRAME_SENSORS, FRAME_STATUS, FRAME_STEP, MAX_DISTANCE_CM,
+    MAX_RUN, MOTIONS, SENSOR_TURNS, SIDE_GAP_CM, STATUS_TEXT,
+    ST_COMPLETED, ST_EXECUTING, ST_MOVING_BACKWARD, ST_MOVING_FORWARD, ST_NO_PATH,
+    ST_PATH_RECEIVED, ST_STOPPED, ST_STOPPING, ST_TURNING_LEFT, ST_TURNING_RIGHT, ST_WAITING,
+    encode_frame, parse_runs,
+)
+from maze_planner import HEADING_MOVES
+
+class CarTiming:
+    """Seconds each maneuver takes on the simulated car.
+
+    The defaults are close to the real car. sensor_interval 0 turns
+    sensor telemetry off; tick is how often a threaded car checks its
+    input and clock, i.e. the control tick of the firmware.
+    """
+
+    def __init__(self, forward=1.0, backward=1.0, turn=0.68, settle=0.5,
+                 sensor_interval=0.5, tick=0.02):
+        self.forward = forward
+        self.backward = backward
+        self.turn = turn
+        self.settle = settle
+        self.sensor_interval = sensor_interval
+        self.tick = tick
+
+    @classmethod
+    def instant(cls, sensor_interval=0.0):
+        """Every maneuver finishes at once: measures the link, not the car"""
+        return cls(0.0, 0.0, 0.0, 0.0, sensor_interval, tick=0.001)
+
+    def duration(self, cmd):
+        return {'F': self.forward, 'B': self.backward, 'L': self.turn, 'R': self.turn, 'W': self.forward}[cmd]
+
+    def __repr__(self):
+        return (f"CarTiming(forward={self.forward}, backward={self.backward}, turn={self.turn}, "
+                f"settle={self.settle}, sensor_interval={self.sensor_interval}, tick={self.tick})")
+
+
+class SimulatedCar(threading.Thread):
+    """A car in software, behaving like Arduino.ino on the other end of a port.
+
+    It accepts MODE, CMD, POSE, PATH, RPATH, STREAM/CHUNK, EXEC and STOP
+    and answers with the same STATUS, STEP, POS, DATA, ACK/NAK and FREE
+    messages, as text or binary frames, driving a path from a ring of
+    ring_runs runs just like the firmware. Sensor distances come from maze
+    when one is given, so the readings match the walls around the car.
+
+    start and heading are where the car physically stands. Like the
+    firmware, it reports POS by dead reckoning from (0, 0) facing North
+    until the PC sets its pose with POSE.
+
+    The car is deterministic: feed() and advance(now) only depend on their
+    arguments, so a test can drive it on a virtual clock. As a thread
+    (start()) it reads from port and runs on the wall clock instead.
+    """
+
+    def __init__(self, port, timing=None, maze=None, start=(0, 0), heading=0,
+                 ring_runs=CAR_RING_RUNS):
+        super().__init__(daemon=True)
+        self.port = port
+        self.timing = timing or CarTiming()
+        self.maze = maze
+        self.row, self.col = start
+        self.heading = heading
+        # Pose the firmware believes it has, reported by POS
+        self.pose_row = self.pose_col = self.pose_heading = 0
+        self.ring_runs = ring_runs
+        self.stop_event = threading.Event()
+        self.line = bytearray()
+        self.binary = False
+        self.clock = 0.0
+        self.next_sensor = 0.0
+        self.messages_in = 0
+        self.messages_out = 0
+        # Motion in progress: a command letter, 'SETTLE' or None when idle
+        self.motion = None
+        self.motion_end = 0.0
+        self.path_motion = False
+        self.executing = False
+        self.waiting = False
+        self._clear_path()
+
+    def _clear_path(self):
+        self.run_cmd = [''] * self.ring_runs
+        self.run_count = [0] * self.ring_runs
+        self.run_write = 0
+        self.run_read = 0
+        self.run_done = 0
+        self.command_length = 0
+        self.expected = 0
+        self.current = 0
+        self.streaming = False
+        self.next_chunk = 1
+        self.executing = False
+        self.waiting = False
+        self.path_motion = False
+
+    # Output
+
+    def _write(self, data):
+        self.messages_out += 1
+        self.port.write(data)
+
+    def _send_line(self, text):
+        self._write(f"{text}\n".encode())
+
+    def _send_status(self, code, arg=None):
+        if self.binary:
+            payload = bytes((code,)) + (struct.pack("<H", arg & 0xFFFF) if arg is not None else b"")
+            self._write(encode_frame(FRAME_STATUS, payload))
+        elif arg is not None:
+            self._send_line("STATUS:" + STATUS_TEXT[code].format(arg))
+        else:
+            self._send_line("STATUS:" + STATUS_TEXT[code])
+
+    def _send_step(self, step):
+        if self.binary:
+            self._write(encode_frame(FRAME_STEP, struct.pack("<H", step & 0xFFFF)))
+        else:
+            self._send_line(f"STEP:{step}")
+
+    def _send_position(self):
+        if self.binary:
+            self._write(encode_frame(FRAME_POS, struct.pack("<hh", self.pose_row, self.pose_col)))
+        else:
+            self._send_line(f"POS:{self.pose_row}:{self.pose_col}")
+
+    def _send_sensors(self):
+        distances = self.sensor_distances()
+        if self.binary:
+            self._write(encode_frame(FRAME_SENSORS, bytes(min(d, 255) for d in distances)))
+        else:
+            for name, value in zip(("front", "right", "left", "back"), distances):
+                self._send_line(f"DATA:{name}:{value}")
+
+    def sensor_distances(self):
+        """(front, right, left, back) in cm, from the maze walls if there is a maze"""
+        if self.maze is None or not self.maze.in_bounds(self.row, self.col):
+            return (MAX_DISTANCE_CM,) * 4
+        out = []
+        for turn in SENSOR_TURNS:
+            dr, dc = HEADING_MOVES[(self.heading + turn) % 4]
+            r, c, blocks = self.row, self.col, 0
+            while self.maze.can_move(r, c, dr, dc) and self.maze.in_bounds(r + dr, c + dc):
+                r, c, blocks = r + dr, c + dc, blocks + 1
+            out.append(min(blocks * BLOCK_CM + SIDE_GAP_CM, MAX_DISTANCE_CM))
+        return tuple(out)
+
+    # Input
+
+    def feed(self, data):
+        """Handle the complete lines in data; a partial line waits for the rest"""
+        self.line += data
+        while True:
+            nl = self.line.find(b"\n")
+            if nl < 0:
+                break
+            text = self.line[:nl].decode("ascii", "replace").strip()
+            del self.line[:nl + 1]
+            if text:
+                self.messages_in += 1
+                self.handle_line(text)
+
+    def _free_runs(self):
+        return self.ring_runs - (self.run_write - self.run_read)
+
+    def _store(self, cmd, count):
+        while count > 0:
+            last = (self.run_write - 1) % self.ring_runs
+            if self.run_write > self.run_read and self.run_cmd[last] == cmd and self.run_count[last] < MAX_RUN:
+                add = min(count, MAX_RUN - self.run_count[last])
+                self.run_count[last] += add
+                self.command_length += add
+                count -= add
+            elif self._free_runs() > 0:
+                slot = self.run_write % self.ring_runs
+                self.run_cmd[slot] = cmd
+                self.run_count[slot] = 0
+                self.run_write += 1
+            else:
+                return False
+        return True
+
+    def _store_runs(self, runs):
+        for cmd, count in parse_runs(runs):
+            if not self._store(cmd, count):
+                return False
+        return True
+
+    def handle_line(self, line):
+        """One command line from the PC, as handleLine() in Arduino.ino"""
+        if line.startswith("CMD:"):
+            if self.motion in (None, 'SETTLE') and not self.executing and len(line) > 4:
+                self._start_command(line[4], False)
+        elif line.startswith("PATH:"):
+            self._clear_path()
+            for cmd in line[5:]:
+                if not self._store(cmd, 1):
+                    break
+            self.expected = self.command_length
+            self._send_status(ST_PATH_RECEIVED, self.command_length)
+        elif line.startswith("RPATH:"):
+            self._clear_path()
+            self._store_runs(line[6:])
+            self.expected = self.command_length
+            self._send_status(ST_PATH_RECEIVED, self.command_length)
+        elif line.startswith("STREAM:"):
+            self._clear_path()
+            self.expected = int(line[7:] or 0)
+            self.streaming = True
+            self._send_line(f"ACK:0:{self._free_runs()}")
+        elif line.startswith("CHUNK:"):
+            seq, _, runs = line[6:].partition(":")
+            seq = int(seq or 0)
+            needed = len(parse_runs(runs))
+            if not self.streaming or seq > self.next_chunk or (seq == self.next_chunk and needed > self._free_runs()):
+                kind = "NAK"
+            else:
+                if seq == self.next_chunk:
+                    self._store_runs(runs)
+                    self.next_chunk += 1
+                kind = "ACK"
+            self._send_line(f"{kind}:{seq}:{self._free_runs()}")
+        elif line.startswith("EXEC"):
+            if self.expected > 0:
+                if self.run_write <= self.ring_runs:
+                    self.run_read = self.run_done = self.current = 0
+                self.executing = True
+                self.waiting = False
+                self._send_status(ST_EXECUTING)
+            else:
+                self._send_status(ST_NO_PATH)
+        elif line.startswith("POSE:"):
+            if self.motion in (None, 'SETTLE') and not self.executing:
+                try:
+                    row, col, heading = (int(v) for v in line[5:].split(":"))
+                except ValueError:
+                    heading = -1
+                if 0 <= heading < 4:
+                    self.pose_row, self.pose_col, self.pose_heading = row, col, heading
+            self._send_position()
+        elif line.startswith("STOP"):
+            self.executing = False
+            self.motion = None
+            self.path_motion = False
+            self._send_status(ST_STOPPED)
+        elif line.startswith("MODE:"):
+            # The acknowledgement is always text
+            binary = line.startswith("MODE:BIN")
+            self._send_line("MODE:BIN" if binary else "MODE:TEXT")
+            self.binary = binary
+
+    # Motion
+
+    def _start_command(self, cmd, from_path):
+        self.path_motion = from_path
+        if cmd in MOTIONS:
+            if cmd != 'W':
+                self._send_status({'F': ST_MOVING_FORWARD, 'B': ST_MOVING_BACKWARD,
+                                   'L': ST_TURNING_LEFT, 'R': ST_TURNING_RIGHT}[cmd])
+            self.motion = cmd
+            self.motion_end = self.clock + self.timing.duration(cmd)
+        else:
+            if cmd == 'S':
+                self._send_status(ST_STOPPING)
+            self.motion = None
+            if from_path:
+                self._command_done()
+
+    def _command_done(self):
+        slot = self.run_read % self.ring_runs
+        self.current += 1
+        self.run_done += 1
+        if self.run_done >= self.run_count[slot]:
+            self.run_read += 1
+            self.run_done = 0
+            if self.streaming and self.command_length < self.expected:
+                self._send_line(f"FREE:{self._free_runs()}")
+
+    def _next_path_command(self):
+        if self.run_read < self.run_write and self.current < self.expected:
+            return self.run_cmd[self.run_read % self.ring_runs]
+        return None
+
+    def _finish_motion(self):
+        blocks, turns = MOTIONS[self.motion]
+        dr, dc = HEADING_MOVES[self.heading]
+        self.row += dr * blocks
+        self.col += dc * blocks
+        self.heading = (self.heading + turns) % 4
+        dr, dc = HEADING_MOVES[self.pose_heading]
+        self.pose_row += dr * blocks
+        self.pose_col += dc * blocks
+        self.pose_heading = (self.pose_heading + turns) % 4
+        self._send_position()
+        self._send_sensors()
+        if self.path_motion:
+            forward = self.motion == 'F'
+            self._command_done()
+            if forward and self.executing and self._next_path_command() == 'F':
+                # Drive straight on into the next block
+                self._send_step(self.current)
+                self.motion_end = self.clock + self.timing.forward
+                return
+        self.motion = 'SETTLE'
+        self.motion_end = self.clock + self.timing.settle
+
+    def _start_next(self):
+        if self.current >= self.expected:
+            self.executing = False
+            self._send_status(ST_COMPLETED)
+            self._send_position()
+        elif self.run_read < self.run_write:
+            self.waiting = False
+            self._send_step(self.current)
+            self._start_command(self.run_cmd[self.run_read % self.ring_runs], True)
+        elif not self.waiting:
+            self.waiting = True
+            self._send_status(ST_WAITING)
+
+    def advance(self, now):
+        """Run the car's clock forward to now (seconds), in event order"""
+        interval = self.timing.sensor_interval
+        while True:
+            if self.motion is None and self.executing:
+                self._start_next()
+                if self.motion is None and self.executing and not self.waiting:
+                    continue  # A command that finished at once
+            due = self.motion_end if self.motion is not None else None
+            if interval and self.next_sensor <= now and (due is None or self.next_sensor <= due):
+                self.clock = max(self.clock, self.next_sensor)
+                self._send_sensors()
+                self.next_sensor += interval
+            elif due is not None and due <= now:
+                self.clock = max(self.clock, due)
+                if self.motion == 'SETTLE':
+                    self.motion = None
+                else:
+                    self._finish_motion()
+            else:
+                break
+        self.clock = max(self.clock, now)
+
+    # Thread
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        self.port.timeout = self.timing.tick
+        started = time.monotonic()
+        try:
+            self._send_line("Simulated maze car initialized")
+            while not self.stop_event.is_set():
+                data = self.port.read(max(1, self.port.in_waiting))
+                now = time.monotonic() - started
+                self.advance(now)
+                if data:
+                    self.feed(data)
+                    self.advance(now)
+        except OSError:
+            pass  # The PC closed the port
+
+
+class PtyPort:
+    """Master side of a pseudo-terminal with the port methods SimulatedCar uses"""
+
+    def __init__(self, master_fd, slave_fd, timeout=0.02):
+        self.fd = master_fd
+        self.slave_fd = slave_fd  # Held open so the pty survives PC reconnects
+        self.timeout = timeout
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        import fcntl
+        import termios
+        buf = fcntl.ioctl(self.fd, termios.FIONREAD, b"\0\0\0\0")
+        return struct.unpack("i", buf)[0]
+
+    def read(self, size=1):
+        import select
+        if not self.is_open:
+            raise OSError("Port is closed")
+        ready, _, _ = select.select([self.fd], [], [], self.timeout)
+        return os.read(self.fd, size) if ready else b""
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            os.close(self.fd)
+            os.close(self.slave_fd)
+
+
+def open_pty_car(**options):
+    """Start a SimulatedCar on a new pseudo-terminal (POSIX only).
+
+    Returns (car, device path); open the path with serial.Serial like a
+    real car. options are passed to SimulatedCar.
+    """
+    import tty
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    car = SimulatedCar(PtyPort(master, slave), **options)
+    car.start()
+    return car, os.ttyname(slave)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a simulated car on a pseudo-terminal")
+    parser.add_argument("--forward", type=float, default=1.0, help="seconds per block forward")
+    parser.add_argument("--turn", type=float, default=0.68, help="seconds per 90 degree turn")
+    parser.add_argument("--settle", type=float, default=0.5, help="pause after stopping")
+    parser.add_argument("--sensors", type=float, default=0.5, help="sensor interval, 0 for none")
+    args = parser.parse_args()
+    timing = CarTiming(args.forward, args.forward, args.turn, args.settle, args.sensors)
+    car, device = open_pty_car(timing=timing)
+    print(f"Simulated car on {device} ({timing})")
+    try:
+        while car.is_alive():
+            car.join(1)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Telemetry recordings: every byte to and from the car, timestamped, and replay of them.
+
+    python car_telemetry.py run.ptel            # summary and parser throughput
+    python car_telemetry.py run.ptel --dump     # one line per message
+
+File layout (little endian), version 1: a header, then records appended as
+the link runs, so a crash loses at most the unflushed tail.
+
+    header  4s magic b"PTEL", uint16 version, uint16 header size,
+            float64 wall-clock start (time.time())
+    record  uint32 microseconds since the previous record (monotonic clock),
+            uint8 direction (0 from the car, 1 to the car),
+            uint16 length, then that many bytes as read or written
+
+Bytes are recorded as they crossed the port, text lines and binary frames
+alike, so a replay goes through the same FrameDecoder and parse_message
+as the live link did.
+"""
+import os
+import struct
+import threading
+import time
+
+from car_protocol import FrameDecoder
+
+MAGIC = b"PTEL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHd")
+RECORD = struct.Struct("<IBH")
+RECORDING_EXT = ".ptel"
+
+FROM_CAR, TO_CAR = 0, 1
+
+# Longest record payload; bigger reads and writes are split
+MAX_RECORD = 0xFFFF
+
+# Buffered records are written out at least this often (seconds)
+FLUSH_INTERVAL = 1.0
+
+
+class TelemetryRecorder:
+    """Appends timestamped traffic to a recording; safe to call from several threads"""
+
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, HEADER.size, time.time()))
+        self.last = self.flushed = clock()
+        self.records = 0
+        self.bytes = 0
+
+    def record(self, direction, data):
+        with self.lock:
+            if self.file is None:
+                return
+            now = self.clock()
+            delta = min(int((now - self.last) * 1e6), 0xFFFFFFFF)
+            self.last = now
+            for i in range(0, len(data), MAX_RECORD):
+                part = data[i:i + MAX_RECORD]
+                self.file.write(RECORD.pack(delta, direction, len(part)))
+                self.file.write(part)
+                delta = 0
+                self.records += 1
+            self.bytes += len(data)
+            if now - self.flushed >= FLUSH_INTERVAL:
+                self.file.flush()
+                self.flushed = now
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class RecordingPort:
+    """Wraps a port so everything read from and written to it is recorded"""
+
+    def __init__(self, port, recorder):
+        self.port = port
+        self.recorder = recorder
+
+    def read(self, size=1):
+        data = self.port.read(size)
+        if data:
+            self.recorder.record(FROM_CAR, data)
+        return data
+
+    def write(self, data):
+        self.recorder.record(TO_CAR, data)
+        return self.port.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+
+def read_recording(path):
+    """Return (start time, [(seconds since start, direction, bytes)]); a truncated tail is dropped"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size or data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a telemetry recording")
+    magic, version, header_size, started = HEADER.unpack_from(data)
+    if version > VERSION:
+        raise ValueError(f"{path} has recording version {version}, newer than {VERSION}")
+    records = []
+    t = 0
+    pos = header_size
+    while pos + RECORD.size <= len(data):
+        delta, direction, length = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        if pos + length > len(data):
+            break
+        t += delta
+        records.append((t / 1e6, direction, data[pos:pos + length]))
+        pos += length
+    return started, records
+
+
+def _paced(records, speed, stop_event=None):
+    """Yield the records from the car, sleeping so they come at speed times the recorded rate"""
+    t0 = time.perf_counter()
+    for t, direction, data in records:
+        if stop_event is not None and stop_event.is_set():
+            return
+        if direction != FROM_CAR:
+            continue
+        if speed:
+            wait = t / speed - (time.perf_counter() - t0)
+            if wait > 0:
+                time.sleep(wait)
+        yield data
+
+
+def replay(path, handle, speed=None):
+    """Feed a recording's messages to handle(line, message) in this thread.
+
+    speed 1 is real time, N is N times faster and None or 0 as fast as
+    possible. Returns (messages, seconds taken).
+    """
+    _, records = read_recording(path)
+    decoder = FrameDecoder()
+    messages = 0
+    t0 = time.perf_counter()
+    for data in _paced(records, speed):
+        for line, message in decoder.feed(data):
+            handle(line, message)
+            messages += 1
+    return messages, time.perf_counter() - t0
+
+
+class ReplayReader(threading.Thread):
+    """Puts a recording's messages on a MessageBus, as SerialReader does with a live port"""
+
+    def __init__(self, path, bus, speed=1.0):
+        super().__init__(daemon=True)
+        self.records = read_recording(path)[1]
+        self.bus = bus
+        self.speed = speed
+        self.messages = 0
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        decoder = FrameDecoder()
+        put = self.bus.put
+        for data in _paced(self.records, self.speed, self.stop_event):
+            for item in decoder.feed(data):
+                put(item)
+                self.messages += 1
+
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+
+    parser = argparse.ArgumentParser(description="Summarize, dump or time a telemetry recording")
+    parser.add_argument("recording")
+    parser.add_argument("--dump", action="store_true", help="print every message with its time")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="replay rate for the timing run (1 = real time, 0 = as fast as possible)")
+    args = parser.parse_args()
+
+    started, records = read_recording(args.recording)
+    if args.dump:
+        decoder = FrameDecoder()
+        for t, direction, data in records:
+            if direction == TO_CAR:
+                for line in data.decode("ascii", "replace").splitlines():
+                    print(f"{t:10.3f} → {line}")
+            else:
+                for line, _ in decoder.feed(data):
+                    print(f"{t:10.3f} ← {line}")
+    else:
+        kinds = Counter()
+        messages, elapsed = replay(args.recording, lambda line, message: kinds.update((message[0],)), args.speed)
+        duration = records[-1][0] if records else 0.0
+        inbound = sum(len(d) for _, direction, d in records if direction == FROM_CAR)
+        print(f"{os.path.basename(args.recording)}: recorded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started))}, "
+              f"{duration:.1f} s, {len(records)} records, {inbound:,} bytes from the car, "
+              f"{sum(len(d) for _, _, d in records) - inbound:,} to it")
+        print(", ".join(f"{kind} {count}" for kind, count in kinds.most_common()))
+        print(f"Replayed {messages} messages in {elapsed:.3f} s ({messages / max(elapsed, 1e-9):,.0f} messages/s)")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Headless batch solver: routes and car commands for many maze files, across cores.
+
+    python maze_batch.py mazes/ --output routes/ --jobs 4
+    python maze_batch.py a.json b.pmaze --minimize-drive-time --summary runs.jsonl
+
+Every maze file (JSON or binary, see maze_io; directories are searched for
+both) is solved from its stored start to its end, or from the corners when
+it has none. For each one a path export is written to the output directory
+in the GUI's "Export Path" format, with the commands the GUI would send. A
+progress line with the throughput goes to stderr; --summary writes one JSON
+record per maze. With --cache, solutions are kept in a SolutionCache
+directory, so mazes solved in an earlier run are not solved again.
+Outputs are named after the maze file; mazes with the same file name in
+different folders are told apart by their path (a__m.pmaze.path.txt).
+With --images, a picture of each maze and its path is rendered into the
+output directory too (tiled for very large mazes, see maze_render).
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import sys
+import time
+
+from maze_cache import SolutionCache, solution_key
+from maze_core import search
+from maze_io import BINARY_EXT, load_maze, write_path_export
+from maze_planner import DriveCosts, path_commands, plan_drive
+from maze_render import export_image, mark_cells
+
+MAZE_EXTS = (".json", BINARY_EXT)
+
+
+def find_mazes(inputs):
+    """Expand files and directories into a sorted list of maze files"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files += [os.path.join(root, n) for n in names if n.lower().endswith(MAZE_EXTS)]
+        else:
+            files.append(item)
+    return sorted(files)
+
+
+def output_names(files):
+    """Name of each maze's outputs: its file name without the extension, or, for names
+    that occur more than once, its path below the folder all the mazes are in"""
+    stems = [os.path.splitext(os.path.basename(f))[0] for f in files]
+    counts = Counter(stems)
+    if len(files) > 1:
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+    names = [stem if counts[stem] == 1 else os.path.relpath(os.path.abspath(f), base).replace(os.sep, "__")
+             for f, stem in zip(files, stems)]
+    duplicates = [name for name, count in Counter(names).items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Maze listed more than once: {duplicates[0]}")
+    return names
+
+
+# Per-process solution cache, opened on the first task that asks for one
+_cache = None
+
+
+def _open_cache(directory):
+    global _cache
+    if _cache is None or _cache.directory != directory:
+        # Workers share the directory; their memory tiers stay small
+        _cache = SolutionCache(max_bytes=8 << 20, directory=directory)
+    return _cache
+
+
+def solve_file(task):
+    """Solve one maze file and write its export; returns a summary dict (never raises)"""
+    path, name, output_dir, strategy, minimize_drive_time, cache_dir, image_px = task
+    t0 = time.perf_counter()
+    summary = {"file": path}
+    try:
+        maze, start, end = load_maze(path)
+        start = start or (0, 0)
+        end = end or (maze.R - 1, maze.C - 1)
+        summary.update(rows=maze.R, cols=maze.C, start=start, end=end)
+        if minimize_drive_time:
+            costs = DriveCosts()
+            settings = ('drive', 0, costs.forward, costs.turn90, costs.turn180)
+        else:
+            settings = ('search', strategy)
+        cache = _open_cache(cache_dir) if cache_dir else None
+        key = solution_key(maze, start, end, settings) if cache is not None else None
+        cached = cache.get(key) if cache is not None else None
+        if cached:
+            cells, commands = cached
+        elif minimize_drive_time:
+            plan = plan_drive(maze, start, end, 0, costs)
+            cells, commands = (plan[0], plan[1]) if plan else (None, "")
+        else:
+            cells = search(maze, start, end, strategy)[0]
+            commands = path_commands(cells, 0) if cells else ""
+        if cache is not None and not cached and cells is not None:
+            cache.put(key, cells, commands)
+        summary["cached"] = bool(cached)
+        summary.update(solved=cells is not None, path_cells=len(cells or ()), commands=len(commands))
+        if cells is not None and output_dir:
+            export = os.path.join(output_dir, f"{name}.path.txt")
+            write_path_export(export, cells, commands)
+            summary["export"] = export
+        if image_px and output_dir:
+            image = os.path.join(output_dir, f"{name}.png")
+            summary["images"] = export_image(image, maze, mark_cells(maze, cells, start, end), cell_px=image_px)
+    except Exception as e:
+        summary.update(solved=False, error=f"{type(e).__name__}: {e}")
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+# Seconds between progress updates (on a terminal; a pipe gets one line per update)
+PROGRESS_INTERVAL = 0.2
+
+
+def _progress(done, total, cells, elapsed, failed):
+    rate = done / elapsed if elapsed else 0.0
+    line = (f"[{done}/{total}] {rate:.1f} mazes/s, {cells / max(elapsed, 1e-9):,.0f} cells/s"
+            + (f", {failed} failed" if failed else ""))
+    if sys.stderr.isatty():
+        print("\r" + line, end="", file=sys.stderr, flush=True)
+    else:
+        print(line, file=sys.stderr, flush=True)
+
+
+def run(files, output_dir=None, strategy="bfs", minimize_drive_time=False, jobs=None,
+        summary_file=None, quiet=False, cache_dir=None, image_px=None):
+    """Solve files on a pool of jobs processes; returns the list of summaries"""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tasks = [(f, name, output_dir, strategy, minimize_drive_time, cache_dir, image_px)
+             for f, name in zip(files, output_names(files))]
+    results = []
+    cells = failed = 0
+    t0 = shown = time.perf_counter()
+    out = open(summary_file, "w") if summary_file else None
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # Small mazes are cheap: hand them out in batches to keep the pool busy
+            chunksize = max(1, len(tasks) // (4 * (jobs or os.cpu_count() or 1)))
+            for summary in pool.map(solve_file, tasks, chunksize=chunksize):
+                results.append(summary)
+                cells += summary.get("rows", 0) * summary.get("cols", 0)
+                failed += not summary["solved"]
+                if out:
+                    out.write(json.dumps(summary) + "\n")
+                now = time.perf_counter()
+                if not quiet and (now - shown >= PROGRESS_INTERVAL or len(results) == len(tasks)):
+                    _progress(len(results), len(tasks), cells, now - t0, failed)
+                    shown = now
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    if not quiet:
+        if sys.stderr.isatty():
+            print(file=sys.stderr)
+        print(f"{len(results)} mazes, {len(results) - failed} solved, {cells:,} cells in {elapsed:.2f} s "
+              f"({len(results) / max(elapsed, 1e-9):.1f} mazes/s)", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a set of maze files and export routes and car commands")
+    parser.add_argument("inputs", nargs="+", help="maze files or directories")
+    parser.add_argument("--output", "-o", help="directory for the path exports (none are written without it)")
+    parser.add_argument("--strategy", choices=("bfs", "astar", "bidirectional"), default="bfs")
+    parser.add_argument("--minimize-drive-time", action="store_true",
+                        help="plan by drive time (turns cost time) instead of path length")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--summary", help="write one JSON record per maze to this file")
+    parser.add_argument("--quiet", "-q", action="store_true", help="no progress output")
+    parser.add_argument("--cache", metavar="DIR", help="reuse and store solutions in this cache directory")
+    parser.add_argument("--images", type=int, metavar="PX",
+                        help="also render each maze and its path to the output directory, PX pixels per cell")
+    args = parser.parse_args(argv)
+    if args.images and not args.output:
+        parser.error("--images needs --output")
+
+    files = find_mazes(args.inputs)
+    if not files:
+        parser.error("no maze files found")
+    try:
+        output_names(files)
+    except ValueError as e:
+        parser.error(str(e))
+    results = run(files, args.output, args.strategy, args.minimize_drive_time, args.jobs,
+                  args.summary, args.quiet, args.cache, args.images)
+    for summary in results:
+        if "error" in summary:
+            print(f"{summary['file']}: {summary['error']}", file=sys.stderr)
+    return 1 if any("error" in s for s in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Benchmarks for the solver, canvas, file and serial hot paths, with JSON output.
+
+    python maze_bench.py                          # default sizes, results on stdout
+    python maze_bench.py --sizes 32 128 --output bench.json
+    python maze_bench.py --compare bench.json     # exit 1 on regressions
+
+Each result is a record {"name", "params", "best_s", "median_s", "repeat"}
+plus benchmark-specific fields (per-item time, throughput, counts). The GUI
+methods run on a MazeSolverGUI whose widgets are virtual stand-ins, so no
+display is needed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+
+from maze_core import MOVES, Maze, search
+from maze_gen import GENERATORS, generate
+from maze_multi import assign_goals, plan_fleet
+from maze_planner import DriveCosts, GoalField, plan_drive
+from maze_render import MazeRenderer, mark_cells
+
+DEFAULT_SIZES = (16, 64, 256, 1024)
+
+# _draw and the JSON file benchmarks only run up to the editor's size limit
+GUI_SIZES_LIMIT = 500
+
+# Cooperative fleet planning searches in space and time; only on small mazes
+FLEET_SIZES_LIMIT = 64
+FLEET_CARS = 4
+
+# Pixels per cell of the raster export benchmark
+RENDER_CELL_PX = 4
+
+
+def random_maze(rows, cols, seed, density=0.2):
+    """Maze with each inner wall present with probability density"""
+    rng = np.random.default_rng(seed)
+    maze = Maze(rows, cols,
+                (rng.random((rows + 1, cols)) < density).astype(np.uint8),
+                (rng.random((rows, cols + 1)) < density).astype(np.uint8))
+    maze.set_border_walls()
+    return maze
+
+
+def perfect_maze(rows, cols, seed):
+    """Spanning-tree maze (exactly one route between any two cells)"""
+    return generate(rows, cols, 'backtracker', seed)
+
+
+MAZE_KINDS = {'random': random_maze, 'perfect': perfect_maze}
+
+
+def measure(func, repeat=5, number=1):
+    """Run func number times per sample; returns (best, median) seconds per call"""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - t0) / number)
+    return min(samples), statistics.median(samples)
+
+
+def record(name, params, timing, repeat, **extra):
+    best, median = timing
+    result = {"name": name, "params": params, "best_s": best, "median_s": median, "repeat": repeat}
+    result.update(extra)
+    return result
+
+
+class VirtualWidget:
+    """Stands in for any Tk widget: every method call is accepted and ignored"""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+
+class VirtualVar:
+    """Stands in for a Tk StringVar or BooleanVar"""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class VirtualCanvas(VirtualWidget):
+    """Canvas that hands out item ids and counts item updates instead of drawing"""
+
+    def __init__(self):
+        self.items = 0
+        self.updates = 0
+
+    def _create(self, *args, **kwargs):
+        self.items += 1
+        return self.items
+
+    create_rectangle = create_line = _create
+
+    def itemconfig(self, item, **options):
+        self.updates += 1
+
+    def delete(self, *items):
+        if "all" in items:
+            self.items = 0
+
+
+class VirtualText(VirtualWidget):
+    """Log widget that stays empty, counting the inserts"""
+
+    def __init__(self):
+        self.inserts = 0
+
+    def insert(self, where, text):
+        self.inserts += 1
+
+    def index(self, where):
+        return "1.0"
+
+
+def virtual_gui(maze, start=None, end=None):
+    """A MazeSolverGUI without a display, its widgets replaced by virtual ones"""
+    from Raspberry import MazeSolverGUI
+    with mock.patch.object(MazeSolverGUI, "create_new_maze", lambda self: None):
+        gui = MazeSolverGUI(VirtualWidget())
+    gui.maze = maze
+    gui.R, gui.C = maze.R, maze.C
+    gui.SW = max(1, 500 // max(maze.R, maze.C))
+    gui.canvas_width, gui.canvas_height = maze.C * gui.SW, maze.R * gui.SW
+    gui.start, gui.end = start, end
+    gui.car_location = None
+    gui.drawn_layout = None
+    gui.incremental = None
+    gui.strategy = VirtualVar("bfs")
+    gui.minimize_drive_time = VirtualVar(False)
+    gui.live_solve = VirtualVar(False)
+    gui.online_replan = VirtualVar(False)
+    gui.canvas = VirtualCanvas()
+    gui.log_text = VirtualText()
+    gui.log_view_lines = gui.log_rendered_seq = 0
+    gui.log_level = VirtualVar("Debug")
+    gui.log_prefix = VirtualVar("")
+    for name in ("status", "front_dist", "right_dist", "left_dist", "back_dist", "step_var", "status_var"):
+        setattr(gui, name, VirtualVar(""))
+    for name in ("execute_path_button", "stop_button", "send_path_button"):
+        setattr(gui, name, VirtualWidget())
+    return gui
+
+
+def bench_solvers(maze, kind, repeat):
+    results = []
+    R, C = maze.R, maze.C
+    start, end = (0, 0), (R - 1, C - 1)
+    params = {"maze": kind, "rows": R, "cols": C}
+    for strategy in ("bfs", "astar", "bidirectional"):
+        path, expanded = search(maze, start, end, strategy)
+        timing = measure(lambda: search(maze, start, end, strategy), repeat)
+        results.append(record(f"solve.{strategy}", params, timing, repeat,
+                              path_cells=len(path) if path else 0, expanded=expanded,
+                              cells_per_s=R * C / timing[0]))
+    timing = measure(lambda: plan_drive(maze, start, end), repeat)
+    results.append(record("solve.plan_drive", params, timing, repeat))
+
+    # Goal fields: built once, then a route from any cell is a table walk
+    for label, costs in (("bfs", None), ("drive", DriveCosts())):
+        timing = measure(lambda: GoalField(maze, end, costs), repeat)
+        field = GoalField(maze, end, costs)
+        results.append(record(f"goal_field.build_{label}", params, timing, repeat, nbytes=field.nbytes))
+        if field.reachable(start):
+            timing = measure(lambda: field.route(start, 0), repeat)
+            results.append(record(f"goal_field.route_{label}", params, timing, repeat))
+
+    # Random mazes can wall cars off from the end; those stay out of the fleet
+    starts = [(0, c) for c in range(min(FLEET_CARS, C)) if field.reachable((0, c))]
+    if max(R, C) <= FLEET_SIZES_LIMIT and starts:
+        goals = assign_goals(maze, end, starts)
+        timing = measure(lambda: plan_fleet(maze, starts, goals), repeat)
+        plan = plan_fleet(maze, starts, goals)
+        results.append(record("fleet.plan", params, timing, repeat, cars=len(starts),
+                              makespan=plan.makespan, short=len(plan.short)))
+
+    if max(R, C) <= GUI_SIZES_LIMIT:
+        renderer = MazeRenderer(maze, mark_cells(maze, None, start, end), cell_px=RENDER_CELL_PX)
+        width, height = renderer.size
+        timing = measure(renderer.render, repeat)
+        results.append(record("render.image", params, timing, repeat, pixels=width * height,
+                              pixels_per_s=width * height / timing[0]))
+
+    # can_move on random cells and directions, per call
+    rng = random.Random(0)
+    calls = [(rng.randrange(R), rng.randrange(C)) + rng.choice(MOVES) for _ in range(10000)]
+    can_move = maze.can_move
+
+    def probe():
+        for r, c, dr, dc in calls:
+            can_move(r, c, dr, dc)
+    timing = measure(probe, repeat)
+    results.append(record("can_move", params, timing, repeat, per_call_s=timing[0] / len(calls)))
+    return results
+
+
+def bench_gui(maze, kind, repeat, workdir):
+    results = []
+    R, C = maze.R, maze.C
+    start, end = (0, 0), (R - 1, C - 1)
+    params = {"maze": kind, "rows": R, "cols": C}
+    gui = virtual_gui(maze, start, end)
+    gui.path = search(maze, start, end)[0] or []
+
+    timing = measure(gui._generate_movement_commands, repeat)
+    results.append(record("generate_movement_commands", params, timing, repeat,
+                          commands=len(gui.movement_commands)))
+
+    if max(R, C) <= GUI_SIZES_LIMIT:
+        def full_draw():
+            gui.drawn_layout = None
+            gui._draw(gui.path)
+        timing = measure(full_draw, repeat)
+        results.append(record("draw.full", params, timing, repeat, items=gui.canvas.items))
+
+        # One car step along the path: the common redraw while driving
+        cells = gui.path or [start]
+        steps = iter(range(10 ** 9))
+
+        def car_step():
+            gui.car_location = cells[next(steps) % len(cells)]
+            gui._draw(gui.path)
+        gui.canvas.updates = 0
+        timing = measure(car_step, repeat, number=20)
+        results.append(record("draw.car_step", params, timing, repeat,
+                              item_updates=gui.canvas.updates / (repeat * 20)))
+
+        path = os.path.join(workdir, f"{kind}_{R}x{C}.json")
+        with mock.patch("Raspberry.filedialog.asksaveasfilename", return_value=path):
+            timing = measure(gui._save_maze, repeat)
+        results.append(record("json.save", params, timing, repeat, bytes=os.path.getsize(path)))
+        with mock.patch("Raspberry.filedialog.askopenfilename", return_value=path):
+            timing = measure(gui._load_maze, repeat)
+        results.append(record("json.load", params, timing, repeat))
+    return results
+
+
+def bench_generators(size, repeat):
+    params = {"rows": size, "cols": size}
+    results = []
+    for algorithm in GENERATORS:
+        timing = measure(lambda: generate(size, size, algorithm, seed=1), repeat)
+        results.append(record(f"generate.{algorithm}", params, timing, repeat,
+                              cells_per_s=size * size / timing[0]))
+    return results
+
+
+def bench_files(maze, kind, repeat, workdir):
+    """Headless maze_io round trips in both formats, at every size"""
+    import maze_io
+    results = []
+    params = {"maze": kind, "rows": maze.R, "cols": maze.C}
+    for fmt, ext in (("json", ".json"), ("binary", maze_io.BINARY_EXT)):
+        path = os.path.join(workdir, f"{kind}_{maze.R}x{maze.C}_io{ext}")
+        timing = measure(lambda: maze_io.save_maze(path, maze, (0, 0), (maze.R - 1, maze.C - 1)), repeat)
+        results.append(record(f"file.{fmt}.save", params, timing, repeat, bytes=os.path.getsize(path)))
+        timing = measure(lambda: maze_io.load_maze(path), repeat)
+        results.append(record(f"file.{fmt}.load", params, timing, repeat))
+    return results
+
+
+def feedback_lines(count, seed=0):
+    """A telemetry stream shaped like a driving car's: mostly DATA, some STEP/POS/STATUS"""
+    rng = random.Random(seed)
+    lines = []
+    step = 0
+    while len(lines) < count:
+        for sensor in ("front", "right", "left", "back"):
+            lines.append(f"DATA:{sensor}:{rng.randrange(3, 200)}")
+        lines.append(f"STEP:{step}")
+        lines.append(f"POS:{step // 7}:{step % 7}")
+        if step % 5 == 0:
+            lines.append("STATUS:Moving Forward")
+        step += 1
+    return lines[:count]
+
+
+def bench_feedback(repeat, count=20000):
+    from car_protocol import parse_message
+    maze = Maze(16, 16)
+    gui = virtual_gui(maze, (0, 0), (15, 15))
+    gui.path = search(maze, (0, 0), (15, 15))[0]
+    gui._generate_movement_commands()
+    gui._draw(gui.path)
+    lines = feedback_lines(count)
+    params = {"messages": count}
+
+    timing = measure(lambda: [parse_message(line) for line in lines], repeat)
+    results = [record("feedback.parse", params, timing, repeat, messages_per_s=count / timing[0])]
+
+    def process():
+        for line in lines:
+            gui._process_feedback(line)
+    timing = measure(process, repeat)
+    results.append(record("feedback.process", params, timing, repeat, messages_per_s=count / timing[0]))
+
+    # Logging every line as _drain_feedback does, then one widget refresh
+    def log():
+        gui._log_entries([(10, f"← {line}") for line in lines])
+        gui._render_log()
+    timing = measure(log, repeat)
+    results.append(record("feedback.log", params, timing, repeat, messages_per_s=count / timing[0]))
+    return results
+
+
+def bench_link(repeat, commands=2000):
+    """Round trips and streamed driving against an instant SimulatedCar over a loopback pipe"""
+    from car_protocol import FrameDecoder, PathStreamer
+    from car_sim import CarTiming
+    from serial_link import SIM_PORT, open_port
+
+    port = open_port(SIM_PORT, timeout=0.01, timing=CarTiming.instant())
+    decoder = FrameDecoder()
+
+    def wait_for(pred, timeout=30.0):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            for line, message in decoder.feed(port.read(max(1, port.in_waiting))):
+                if pred(line, message):
+                    return
+        raise TimeoutError("no reply from the simulated car")
+
+    try:
+        wait_for(lambda line, message: line.startswith("Simulated"))
+
+        def round_trip():
+            port.write(b"EXEC\n")
+            wait_for(lambda line, message: message[0] == "STATUS")
+        timing = measure(round_trip, repeat, number=50)
+        results = [record("link.round_trip", {"transport": "loopback"}, timing, repeat)]
+
+        path = "".join(random.Random(1).choice("FFFRL") for _ in range(commands))
+        counted = [0]
+
+        def drive():
+            counted[0] = 0
+            streamer = PathStreamer(path, lambda line: port.write(f"{line}\n".encode()), window=4)
+            streamer.start()
+            executing = False
+            deadline = time.perf_counter() + 60
+            while time.perf_counter() < deadline:
+                for line, (kind, value) in decoder.feed(port.read(max(1, port.in_waiting))):
+                    counted[0] += 1
+                    if kind in ("ACK", "NAK", "FREE"):
+                        streamer.handle(kind, value)
+                    elif kind == "STATUS" and value == "Completed":
+                        return
+                if streamer.ready and not executing:
+                    port.write(b"EXEC\n")
+                    executing = True
+            raise TimeoutError("streamed path did not complete")
+        timing = measure(drive, repeat)
+        results.append(record("link.stream_and_drive", {"transport": "loopback", "commands": commands},
+                              timing, repeat, messages=counted[0], messages_per_s=counted[0] / timing[0]))
+    finally:
+        port.close()
+    return results
+
+
+def run(sizes=DEFAULT_SIZES, kinds=tuple(MAZE_KINDS), repeat=3, gui=True, link=True):
+    """Run the suite; returns the report as a dict"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            results += bench_generators(size, repeat)
+            for kind in kinds:
+                maze = MAZE_KINDS[kind](size, size, seed=size)
+                results += bench_solvers(maze, kind, repeat)
+                results += bench_files(maze, kind, repeat, workdir)
+                if gui:
+                    results += bench_gui(maze, kind, repeat, workdir)
+    if gui:
+        results += bench_feedback(repeat)
+    if link:
+        results += bench_link(repeat)
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def _key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(report, baseline, tolerance=0.25, floor=1e-3):
+    """Results more than tolerance slower (best_s) than in baseline, as (result, ratio).
+
+    Timings below floor seconds in both reports are too noisy to judge and skipped.
+    """
+    before = {_key(r): r for r in baseline["results"]}
+    slower = []
+    for result in report["results"]:
+        old = before.get(_key(result))
+        if old and old["best_s"] > 0 and max(old["best_s"], result["best_s"]) >= floor:
+            ratio = result["best_s"] / old["best_s"]
+            if ratio > 1 + tolerance:
+                slower.append((result, ratio))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the maze solver hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="maze sides to test")
+    parser.add_argument("--kinds", nargs="+", choices=sorted(MAZE_KINDS), default=sorted(MAZE_KINDS))
+    parser.add_argument("--repeat", type=int, default=3, help="samples per benchmark (best is reported)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the Tk-dependent benchmarks")
+    parser.add_argument("--no-link", action="store_true", help="skip the simulated serial link")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="report regressions against an earlier JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown for --compare")
+    parser.add_argument("--floor", type=float, default=1e-3, help="ignore timings below this many seconds")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.kinds, args.repeat, gui=not args.no_gui, link=not args.no_link)
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(report, json.load(f), args.tolerance, args.floor)
+        for result, ratio in slower:
+            print(f"REGRESSION {result['name']} {result['params']}: {ratio:.2f}x slower", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
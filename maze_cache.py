@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""LRU cache of solved routes, keyed by a hash of the maze, endpoints and planner settings."""
+from collections import OrderedDict
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+# On-disk entry: magic, number of path cells, length of the command string,
+# then the cells as int32 (row, col) pairs and the ASCII commands
+ENTRY_HEADER = struct.Struct("<4sII")
+ENTRY_MAGIC = b"PSOL"
+ENTRY_EXT = ".sol"
+
+
+def solution_key(maze, start, end, settings=()):
+    """Hex digest identifying a solve: the walls, start, end and planner settings.
+
+    settings is any tuple whose repr() pins down how the route was planned,
+    e.g. ('search', 'bfs') or ('drive', heading, forward, turn90, turn180).
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(struct.pack("<II", maze.R, maze.C))
+    h.update(maze.hw.tobytes())
+    h.update(maze.vw.tobytes())
+    h.update(repr((tuple(start), tuple(end), tuple(settings))).encode())
+    return h.hexdigest()
+
+
+def _entry_size(path, commands):
+    # About what the entry costs in memory: a (row, col) tuple per cell, plus the string
+    return 72 * len(path) + len(commands) + 100
+
+
+class SolutionCache:
+    """Least-recently-used store of (path, commands) solutions.
+
+    The memory tier holds at most max_bytes (estimated) of entries. With a
+    directory, entries are also written there, one file per key, and the
+    directory is kept under max_disk_bytes by deleting the files read or
+    written longest ago; a miss in memory falls back to disk, so a cache
+    directory survives restarts and can be shared by batch workers.
+    """
+
+    def __init__(self, max_bytes=64 << 20, directory=None, max_disk_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()  # key -> (path, commands, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_size = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_size = sum(size for _, size, _ in self._disk_entries())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries or (self.directory is not None and os.path.exists(self._file(key)))
+
+    def get(self, key):
+        """Return (path, commands) for key, or None"""
+        entry = self.entries.get(key)
+        if entry is None and self.directory:
+            entry = self._read(key)
+            if entry is not None:
+                self._remember(key, *entry)
+                entry = self.entries[key]
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, key, path, commands):
+        path = [tuple(cell) for cell in path]
+        self._remember(key, path, commands)
+        if self.directory:
+            self._write(key, path, commands)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def _remember(self, key, path, commands):
+        old = self.entries.pop(key, None)
+        if old:
+            self.size -= old[2]
+        size = _entry_size(path, commands)
+        self.entries[key] = (path, commands, size)
+        self.size += size
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    # Disk tier
+
+    def _file(self, key):
+        return os.path.join(self.directory, key + ENTRY_EXT)
+
+    def _read(self, key):
+        try:
+            with open(self._file(key), "rb") as f:
+                data = f.read()
+            magic, ncells, ncommands = ENTRY_HEADER.unpack_from(data)
+            if magic != ENTRY_MAGIC:
+                return None
+            cells = np.frombuffer(data, dtype="<i4", count=2 * ncells, offset=ENTRY_HEADER.size)
+            commands = data[ENTRY_HEADER.size + 8 * ncells:][:ncommands].decode("ascii")
+            # Reading counts as use for the disk LRU
+            os.utime(self._file(key))
+        except (OSError, struct.error, ValueError):
+            return None
+        return list(zip(cells[0::2].tolist(), cells[1::2].tolist())), commands
+
+    def _write(self, key, path, commands):
+        cells = np.asarray(path, dtype="<i4").reshape(-1)
+        try:
+            # Rewriting a key replaces its file, so only the difference counts
+            self.disk_size -= os.path.getsize(self._file(key))
+        except OSError:
+            pass
+        tmp = f"{self._file(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(ENTRY_HEADER.pack(ENTRY_MAGIC, len(path), len(commands)))
+            f.write(cells.tobytes())
+            f.write(commands.encode("ascii"))
+        # Atomic, so concurrent readers never see half an entry
+        os.replace(tmp, self._file(key))
+        self.disk_size += ENTRY_HEADER.size + cells.nbytes + len(commands)
+        if self.disk_size > self.max_disk_bytes:
+            self._trim_disk()
+
+    def _disk_entries(self):
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith(ENTRY_EXT):
+                    st = e.stat()
+                    yield st.st_mtime, st.st_size, e.path
+
+    def _trim_disk(self):
+        files = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in files)
+        # Keep the newest file even if it alone is over the limit
+        for _, size, path in files[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.disk_size = total
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Headless maze model and solver, usable without Tkinter or a display."""
+from array import array
+from collections import deque
+import heapq
+
+import numpy as np
+
+# Neighbor moves as (dr, dc), in the order the solver tries them
+MOVES = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+# Adjacency bits, one per open side of a cell (same order as MOVES)
+SOUTH, NORTH, EAST, WEST = 1, 2, 4, 8
+
+# Frontier size above which a BFS level is expanded with NumPy instead of a loop
+WIDE_FRONTIER = 256
+
+
+class Maze:
+    """Wall grid of an R x C maze.
+
+    Horizontal walls are stored in an (R+1) x C array (hw[r][c] is the wall
+    above cell (r, c)) and vertical walls in an R x (C+1) array (vw[r][c] is
+    the wall left of cell (r, c)). A value of 1 means a wall. Both arrays are
+    uint8, one byte per wall; packed() squeezes them down to one bit per wall.
+    """
+
+    def __init__(self, rows, cols, hw=None, vw=None):
+        if rows < 1 or cols < 1:
+            raise ValueError(f"Invalid maze size {rows}x{cols}")
+        self.R = rows
+        self.C = cols
+        if hw is None and vw is None:
+            self.hw = np.zeros((rows + 1, cols), dtype=np.uint8)
+            self.vw = np.zeros((rows, cols + 1), dtype=np.uint8)
+            self.set_border_walls()
+        else:
+            self.hw = self._wall_array(hw, (rows + 1, cols), "horizontal")
+            self.vw = self._wall_array(vw, (rows, cols + 1), "vertical")
+
+    @staticmethod
+    def _wall_array(walls, shape, name):
+        if walls is None:
+            return np.zeros(shape, dtype=np.uint8)
+        arr = (np.asarray(walls) != 0).astype(np.uint8)
+        if arr.shape != shape:
+            raise ValueError(f"{name} walls have shape {arr.shape}, expected {shape}")
+        return arr
+
+    @classmethod
+    def from_packed(cls, rows, cols, hbits, vbits):
+        """Rebuild a maze from the bit planes returned by packed()"""
+        hw = np.unpackbits(hbits, count=(rows + 1) * cols).reshape(rows + 1, cols)
+        vw = np.unpackbits(vbits, count=rows * (cols + 1)).reshape(rows, cols + 1)
+        return cls(rows, cols, hw, vw)
+
+    def set_border_walls(self):
+        self.hw[0, :] = self.hw[self.R, :] = 1
+        self.vw[:, 0] = self.vw[:, self.C] = 1
+
+    def clear(self):
+        self.hw.fill(0)
+        self.vw.fill(0)
+        self.set_border_walls()
+
+    def copy(self):
+        return Maze(self.R, self.C, self.hw.copy(), self.vw.copy())
+
+    def toggle_wall(self, kind, r, c):
+        """Flip horizontal ('h') or vertical ('v') wall (r, c); returns the cells it borders"""
+        if kind == 'h':
+            self.hw[r, c] ^= 1
+            cells = [(r-1, c), (r, c)]
+        else:
+            self.vw[r, c] ^= 1
+            cells = [(r, c-1), (r, c)]
+        return [cell for cell in cells if self.in_bounds(*cell)]
+
+    def in_bounds(self, r, c):
+        return 0 <= r < self.R and 0 <= c < self.C
+
+    def can_move(self, r, c, dr, dc):
+        if dr == 1: return self.hw[r+1, c] == 0
+        if dr == -1: return self.hw[r, c] == 0
+        if dc == 1: return self.vw[r, c+1] == 0
+        if dc == -1: return self.vw[r, c] == 0
+        return False
+
+    def packed(self):
+        """Return (hbits, vbits), the wall planes packed eight walls per byte"""
+        return np.packbits(self.hw), np.packbits(self.vw)
+
+    @property
+    def nbytes(self):
+        return self.hw.nbytes + self.vw.nbytes
+
+    def to_lists(self):
+        """Return (hw, vw) as nested int lists, the JSON maze file layout"""
+        return self.hw.tolist(), self.vw.tolist()
+
+
+def adjacency(maze):
+    """Per-cell bitmask of open moves (SOUTH|NORTH|EAST|WEST), flattened row-major.
+
+    Moves off the grid are never open, even if a border wall was removed.
+    """
+    R, C = maze.R, maze.C
+    adj = np.zeros((R, C), dtype=np.uint8)
+    adj[:-1, :] |= (maze.hw[1:R, :] == 0) * np.uint8(SOUTH)
+    adj[1:, :] |= (maze.hw[1:R, :] == 0) * np.uint8(NORTH)
+    adj[:, :-1] |= (maze.vw[:, 1:C] == 0) * np.uint8(EAST)
+    adj[:, 1:] |= (maze.vw[:, 1:C] == 0) * np.uint8(WEST)
+    return adj.ravel()
+
+
+def bfs_prev(adj, cols, source, target=-1):
+    """Level-synchronous breadth-first search over flat cell indices.
+
+    adj is the flat uint8 bitmask from adjacency(). Returns an int32 array
+    with the predecessor of every reached cell, -1 for unreached cells and the
+    source pointing to itself; the search stops after the level that reaches
+    target. Narrow frontiers (corridors) are expanded cell by cell, wide ones
+    (open areas) as whole NumPy levels, so open multi-million-cell grids
+    finish in a few thousand vectorized steps. Memory is bounded by the
+    4-byte prev array plus the current frontier.
+    """
+    prev = np.full(adj.size, -1, dtype=np.int32)
+    pv = memoryview(prev)
+    ab = memoryview(adj)
+    prev[source] = source
+    search_all = target < 0
+    expanded = 0
+    queue = deque([source])
+    pop, push = queue.popleft, queue.append
+    while queue:
+        # Expand narrow levels cell by cell
+        while 0 < len(queue) < WIDE_FRONTIER and (search_all or pv[target] < 0):
+            expanded += len(queue)
+            for _ in range(len(queue)):
+                i = pop()
+                m = ab[i]
+                if m & SOUTH:
+                    j = i + cols
+                    if pv[j] < 0: pv[j] = i; push(j)
+                if m & NORTH:
+                    j = i - cols
+                    if pv[j] < 0: pv[j] = i; push(j)
+                if m & EAST:
+                    j = i + 1
+                    if pv[j] < 0: pv[j] = i; push(j)
+                if m & WEST:
+                    j = i - 1
+                    if pv[j] < 0: pv[j] = i; push(j)
+        if not queue or not (search_all or pv[target] < 0):
+            break
+        # Expand wide levels a whole level at a time
+        frontier = np.fromiter(queue, dtype=np.int64, count=len(queue))
+        while frontier.size >= WIDE_FRONTIER and (search_all or pv[target] < 0):
+            expanded += frontier.size
+            bits = adj[frontier]
+            parts = []
+            for bit, offset in ((SOUTH, cols), (NORTH, -cols), (EAST, 1), (WEST, -1)):
+                src = frontier[(bits & bit) != 0]
+                dst = src + offset
+                new = prev[dst] < 0
+                src, dst = src[new], dst[new]
+                prev[dst] = src
+                parts.append(dst)
+            frontier = np.concatenate(parts)
+        queue.clear()
+        queue.extend(frontier.tolist())
+    return prev, expanded
+
+
+def trace_path(prev, target):
+    """Walk a predecessor array back from target; returns flat indices, or None"""
+    pv = memoryview(prev)
+    if pv[target] < 0:
+        return None
+    path = [target]
+    push = path.append
+    cur = target
+    while pv[cur] != cur:
+        cur = pv[cur]
+        push(cur)
+    path.reverse()
+    return path
+
+
+def _bfs(adj, cols, source, target):
+    prev, expanded = bfs_prev(adj, cols, source, target)
+    return trace_path(prev, target), expanded
+
+
+def _astar(adj, cols, source, target):
+    """A* with the Manhattan distance, which is exact on open floor"""
+    tr, tc = divmod(target, cols)
+    g = array('i', [-1]) * len(adj)
+    prev = array('i', [-1]) * len(adj)
+    closed = bytearray(len(adj))
+    g[source] = 0
+    prev[source] = source
+    r, c = divmod(source, cols)
+    # Ties on f are broken towards the larger g, i.e. deeper along a corridor
+    heap = [(abs(r - tr) + abs(c - tc), 0, source)]
+    expanded = 0
+    while heap:
+        _, neg_g, i = heapq.heappop(heap)
+        if closed[i]:
+            continue
+        closed[i] = 1
+        expanded += 1
+        if i == target:
+            return trace_path(prev, target), expanded
+        m = adj[i]
+        ng = -neg_g + 1
+        for bit, offset in ((SOUTH, cols), (NORTH, -cols), (EAST, 1), (WEST, -1)):
+            if m & bit:
+                j = i + offset
+                if not closed[j] and (g[j] < 0 or ng < g[j]):
+                    g[j] = ng
+                    prev[j] = i
+                    r, c = divmod(j, cols)
+                    heapq.heappush(heap, (ng + abs(r - tr) + abs(c - tc), -ng, j))
+    return None, expanded
+
+
+def _bidirectional(adj, cols, source, target):
+    """BFS from both ends, always growing the smaller frontier by one level"""
+    if source == target:
+        return [source], 1
+    n = len(adj)
+    prev = [array('i', [-1]) * n, array('i', [-1]) * n]
+    dist = [array('i', [-1]) * n, array('i', [-1]) * n]
+    frontier = [[source], [target]]
+    for side, cell in ((0, source), (1, target)):
+        prev[side][cell] = cell
+        dist[side][cell] = 0
+    expanded = 0
+    while frontier[0] and frontier[1]:
+        side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+        own_prev, own_dist = prev[side], dist[side]
+        other_dist = dist[1 - side]
+        best, meet = None, None
+        nxt = []
+        expanded += len(frontier[side])
+        for i in frontier[side]:
+            m = adj[i]
+            for bit, offset in ((SOUTH, cols), (NORTH, -cols), (EAST, 1), (WEST, -1)):
+                if m & bit:
+                    j = i + offset
+                    if other_dist[j] >= 0:
+                        # Finish the level so the shortest meeting wins
+                        length = own_dist[i] + 1 + other_dist[j]
+                        if best is None or length < best:
+                            best, meet = length, (i, j)
+                    if own_dist[j] < 0:
+                        own_dist[j] = own_dist[i] + 1
+                        own_prev[j] = i
+                        nxt.append(j)
+        if meet is not None:
+            a, b = meet if side == 0 else meet[::-1]
+            head = trace_path(prev[0], a)
+            tail = trace_path(prev[1], b)
+            tail.reverse()
+            return head + tail, expanded
+        frontier[side] = nxt
+    return None, expanded
+
+
+# Search strategies selectable in search(); all return shortest paths
+STRATEGIES = {
+    'bfs': _bfs,
+    'astar': _astar,
+    'bidirectional': _bidirectional,
+}
+
+
+def search(maze, start, end, strategy='bfs'):
+    """Run one of STRATEGIES; returns (path as (row, col) list or None, nodes expanded)"""
+    try:
+        func = STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown search strategy {strategy!r}") from None
+    C = maze.C
+    adj = adjacency(maze)
+    if strategy != 'bfs':
+        adj = adj.tobytes()  # per-cell indexing is much faster on bytes
+    path, expanded = func(adj, C, start[0]*C + start[1], end[0]*C + end[1])
+    if path is None:
+        return None, expanded
+    rows, cols = np.divmod(np.array(path, dtype=np.int64), C)
+    return list(zip(rows.tolist(), cols.tolist())), expanded
+
+
+def solve(maze, start, end, strategy='bfs'):
+    """Shortest path from start to end as a list of (row, col), or None"""
+    return search(maze, start, end, strategy)[0]
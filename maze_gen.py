@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Seeded maze generators: backtracker, Kruskal, Prim, Wilson and braided mazes.
+
+All generators are iterative and work on flat cell indices with byte arrays,
+so they scale to millions of cells without recursion limits. They build two
+R x C passage grids (east[r, c] opens the wall between (r, c) and (r, c+1),
+south[r, c] the wall between (r, c) and (r+1, c)), which _to_maze() turns
+into the hw/vw wall arrays of a Maze in one vectorized step.
+
+    maze = generate(200, 300, 'wilson', seed=7)
+
+The same seed always gives the same maze.
+"""
+from array import array
+import os
+import random
+
+import numpy as np
+
+from maze_core import Maze
+
+
+def _to_maze(rows, cols, east, south):
+    hw = np.ones((rows + 1, cols), dtype=np.uint8)
+    vw = np.ones((rows, cols + 1), dtype=np.uint8)
+    hw[1:rows, :] = 1 - south[:rows - 1, :]
+    vw[:, 1:cols] = 1 - east[:, :cols - 1]
+    return Maze(rows, cols, hw, vw)
+
+
+def _neighbors(i, rows, cols):
+    """Flat indices of the cells next to i"""
+    r, c = divmod(i, cols)
+    out = []
+    if r > 0: out.append(i - cols)
+    if r < rows - 1: out.append(i + cols)
+    if c > 0: out.append(i - 1)
+    if c < cols - 1: out.append(i + 1)
+    return out
+
+
+def _open(east, south, a, b, cols):
+    """Open the wall between neighboring cells a and b (flat passage arrays)"""
+    if a > b:
+        a, b = b, a
+    if b == a + cols:
+        south[a] = 1
+    else:
+        east[a] = 1
+
+
+def _backtracker(rows, cols, rng, east, south):
+    """Depth-first search with an explicit stack: long winding corridors"""
+    n = rows * cols
+    # Unvisited cells get a sentinel row/column of visited ones around them,
+    # so the neighbor test needs no bounds checks
+    w = cols + 2
+    seen = bytearray([1]) * ((rows + 2) * w)
+    for r in range(rows):
+        seen[(r + 1) * w + 1:(r + 1) * w + 1 + cols] = bytes(cols)
+    start = rng.randrange(n)
+    r, c = divmod(start, cols)
+    seen[(r + 1) * w + c + 1] = 1
+    stack = [start]
+    push, pop, randrange = stack.append, stack.pop, rng.randrange
+    while stack:
+        i = stack[-1]
+        r, c = divmod(i, cols)
+        p = (r + 1) * w + c + 1
+        options = []
+        if not seen[p - w]: options.append(-cols)
+        if not seen[p + w]: options.append(cols)
+        if not seen[p - 1]: options.append(-1)
+        if not seen[p + 1]: options.append(1)
+        if not options:
+            pop()
+            continue
+        d = options[randrange(len(options))] if len(options) > 1 else options[0]
+        j = i + d
+        if d == cols: south[i] = 1
+        elif d == -cols: south[j] = 1
+        elif d == 1: east[i] = 1
+        else: east[j] = 1
+        seen[p + (w if d == cols else -w if d == -cols else d)] = 1
+        push(j)
+
+
+def _kruskal(rows, cols, rng, east, south):
+    """Random spanning tree by joining cells over shuffled walls: many short dead ends"""
+    n = rows * cols
+    # Candidate walls as a + b * n, where a is the west/north cell of the pair
+    idx = np.arange(n, dtype=np.int64).reshape(rows, cols)
+    walls = np.concatenate([(idx[:, :-1] + idx[:, 1:] * n).ravel(),
+                            (idx[:-1, :] + idx[1:, :] * n).ravel()])
+    np.random.default_rng(rng.getrandbits(64)).shuffle(walls)
+    parent = array('i', range(n))
+    joined = 0
+    for w in walls.tolist():
+        b, a = divmod(w, n)
+        # Find with path halving
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        ra = a
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if ra == b:
+            continue
+        parent[b] = ra
+        a, b = divmod(w, n)[::-1]
+        _open(east, south, a, b, cols)
+        joined += 1
+        if joined == n - 1:
+            break
+
+
+def _prim(rows, cols, rng, east, south):
+    """Grows one tree from random frontier cells: short, branchy passages"""
+    n = rows * cols
+    IN, FRONTIER = 1, 2
+    state = bytearray(n)
+    frontier = []
+
+    def add(i):
+        state[i] = IN
+        for j in _neighbors(i, rows, cols):
+            if not state[j]:
+                state[j] = FRONTIER
+                frontier.append(j)
+
+    add(rng.randrange(n))
+    while frontier:
+        # Swap-remove a random frontier cell
+        k = rng.randrange(len(frontier))
+        frontier[k], frontier[-1] = frontier[-1], frontier[k]
+        i = frontier.pop()
+        inside = [j for j in _neighbors(i, rows, cols) if state[j] == IN]
+        _open(east, south, i, inside[rng.randrange(len(inside))], cols)
+        add(i)
+
+
+def _wilson(rows, cols, rng, east, south):
+    """Loop-erased random walks: a uniformly random spanning tree, without bias"""
+    n = rows * cols
+    in_tree = bytearray(n)
+    in_tree[rng.randrange(n)] = 1
+    # Exit taken the last time the walk left each cell; overwriting it erases loops
+    exit_to = array('i', [-1]) * n
+    # Random directions are drawn in blocks, one byte per step
+    nprng = np.random.default_rng(rng.getrandbits(64))
+    dirs, pos = b"", 0
+    offsets = (-cols, cols, -1, 1)
+    order = list(range(n))
+    nprng.shuffle(order)
+    for start in order:
+        if in_tree[start]:
+            continue
+        i = start
+        while not in_tree[i]:
+            if pos >= len(dirs):
+                dirs, pos = nprng.integers(0, 4, 1 << 16, dtype=np.uint8).tobytes(), 0
+            d = dirs[pos]
+            pos += 1
+            r, c = divmod(i, cols)
+            if (d == 0 and r == 0) or (d == 1 and r == rows - 1) or (d == 2 and c == 0) or (d == 3 and c == cols - 1):
+                continue
+            j = i + offsets[d]
+            exit_to[i] = j
+            i = j
+        # Add the loop-erased walk to the tree
+        i = start
+        while not in_tree[i]:
+            in_tree[i] = 1
+            j = exit_to[i]
+            _open(east, south, i, j, cols)
+            i = j
+
+
+def braid(maze_passages, rows, cols, rng, fraction=1.0):
+    """Remove about fraction of the dead ends by opening a wall, adding loops.
+
+    maze_passages is the (east, south) pair of flat passage arrays; a dead
+    end is joined to another dead end next to it when there is one.
+    """
+    east, south = maze_passages
+    e = np.frombuffer(east, dtype=np.uint8).reshape(rows, cols)
+    s = np.frombuffer(south, dtype=np.uint8).reshape(rows, cols)
+    degree = e.astype(np.int8) + s
+    degree[:, 1:] += e[:, :-1]
+    degree[1:, :] += s[:-1, :]
+    degree = bytearray(degree.astype(np.uint8).tobytes())
+    dead = [i for i, d in enumerate(degree) if d == 1]
+    rng.shuffle(dead)
+    for i in dead:
+        if degree[i] != 1 or rng.random() >= fraction:
+            continue
+        closed = [j for j in _neighbors(i, rows, cols) if not _is_open(east, south, i, j, cols)]
+        if not closed:
+            continue
+        also_dead = [j for j in closed if degree[j] == 1]
+        candidates = also_dead or closed
+        j = candidates[rng.randrange(len(candidates))]
+        _open(east, south, i, j, cols)
+        degree[i] += 1
+        degree[j] += 1
+
+
+def _is_open(east, south, a, b, cols):
+    if a > b:
+        a, b = b, a
+    return south[a] if b == a + cols else east[a]
+
+
+# Perfect-maze generators; each carves a spanning tree into the passage arrays
+ALGORITHMS = {
+    'backtracker': _backtracker,
+    'kruskal': _kruskal,
+    'prim': _prim,
+    'wilson': _wilson,
+}
+
+# 'braided' is a backtracker maze with its dead ends removed (see braid())
+GENERATORS = tuple(ALGORITHMS) + ('braided',)
+
+
+def generate(rows, cols, algorithm='backtracker', seed=None, braid_fraction=None):
+    """Generate a rows x cols maze with one of GENERATORS.
+
+    Perfect mazes have exactly one route between any two cells. With
+    braid_fraction (default 1.0 for 'braided', 0 otherwise) that share of
+    the dead ends is opened up, giving loops and several routes.
+    """
+    if rows < 1 or cols < 1:
+        raise ValueError(f"Invalid maze size {rows}x{cols}")
+    if algorithm == 'braided':
+        func = _backtracker
+        braid_fraction = 1.0 if braid_fraction is None else braid_fraction
+    else:
+        try:
+            func = ALGORITHMS[algorithm]
+        except KeyError:
+            raise ValueError(f"Unknown maze generator {algorithm!r}") from None
+    rng = random.Random(seed)
+    east, south = bytearray(rows * cols), bytearray(rows * cols)
+    func(rows, cols, rng, east, south)
+    if braid_fraction:
+        braid((east, south), rows, cols, rng, braid_fraction)
+    as_grid = lambda a: np.frombuffer(a, dtype=np.uint8).reshape(rows, cols)
+    return _to_maze(rows, cols, as_grid(east), as_grid(south))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from maze_io import BINARY_EXT, save_maze
+
+    parser = argparse.ArgumentParser(description="Generate a corpus of maze files")
+    parser.add_argument("directory", help="where to write the mazes")
+    parser.add_argument("--size", type=int, nargs=2, default=(100, 100), metavar=("ROWS", "COLS"))
+    parser.add_argument("--algorithm", choices=GENERATORS, default="backtracker")
+    parser.add_argument("--count", type=int, default=1, help="number of mazes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first maze; the rest count up")
+    parser.add_argument("--braid", type=float, default=None, help="fraction of dead ends to remove")
+    parser.add_argument("--format", choices=("binary", "json"), default="binary")
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    rows, cols = args.size
+    ext = BINARY_EXT if args.format == "binary" else ".json"
+    t0 = time.perf_counter()
+    for k in range(args.count):
+        seed = args.seed + k
+        maze = generate(rows, cols, args.algorithm, seed, args.braid)
+        path = os.path.join(args.directory, f"{args.algorithm}_{rows}x{cols}_{seed}{ext}")
+        save_maze(path, maze, (0, 0), (rows - 1, cols - 1))
+    elapsed = time.perf_counter() - t0
+    print(f"{args.count} mazes of {rows}x{cols} in {elapsed:.2f} s "
+          f"({args.count * rows * cols / elapsed:,.0f} cells/s)")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Incremental shortest paths that are repaired, not recomputed, as walls change."""
+from array import array
+import heapq
+
+from maze_core import MOVES, SOUTH, NORTH, EAST, WEST, adjacency
+
+INF = float('inf')
+
+
+class IncrementalSolver:
+    """Lifelong Planning A* (LPA*) between a fixed start and end of a Maze.
+
+    The solver keeps its own adjacency bitmask of the maze, so after toggling
+    a wall call wall_changed() with the cells it borders (Maze.toggle_wall
+    returns them) and the next path() only re-expands the cells whose
+    distance the change actually affected.
+
+    The end may also move between searches (move_end()): keys then carry
+    the D* Lite offset km, so a solver rooted at a goal keeps its work
+    while the other end follows a driving car.
+    """
+
+    def __init__(self, maze, start, end):
+        self.maze = maze
+        self.reset(start, end)
+
+    def reset(self, start, end):
+        """Forget all search state and plan between a new start and end"""
+        n = self.maze.R * self.maze.C
+        self.start = start
+        self.end = end
+        self.g = array('d', [INF]) * n
+        self.rhs = array('d', [INF]) * n
+        self.heap = []
+        self.queued = {}  # cell -> its current key in the heap
+        self.expanded = 0
+        self.km = 0.0  # Sum of the heuristic shifts from moving the end
+        self.adj = bytearray(adjacency(self.maze).tobytes())
+        C = self.maze.C
+        self.offsets = ((SOUTH, C), (NORTH, -C), (EAST, 1), (WEST, -1))
+        s = self._index(start)
+        self.rhs[s] = 0.0
+        self._push(s)
+
+    def _index(self, cell):
+        return cell[0] * self.maze.C + cell[1]
+
+    def _neighbors(self, i):
+        m = self.adj[i]
+        return [i + offset for bit, offset in self.offsets if m & bit]
+
+    def _key(self, i):
+        r, c = divmod(i, self.maze.C)
+        m = min(self.g[i], self.rhs[i])
+        return (m + abs(r - self.end[0]) + abs(c - self.end[1]) + self.km, m)
+
+    def _push(self, i):
+        key = self._key(i)
+        self.queued[i] = key
+        heapq.heappush(self.heap, (key, i))
+
+    def _top(self):
+        # Skip heap entries superseded by a later push or removal
+        heap = self.heap
+        while heap and self.queued.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _update(self, i):
+        if i != self._index(self.start):
+            self.rhs[i] = min((self.g[j] + 1 for j in self._neighbors(i)), default=INF)
+        if self.g[i] != self.rhs[i]:
+            self._push(i)
+        else:
+            self.queued.pop(i, None)
+
+    def wall_changed(self, cells):
+        """Tell the solver that the wall between (or around) these cells toggled"""
+        maze = self.maze
+        for r, c in cells:
+            bits = 0
+            for bit, (dr, dc) in zip((SOUTH, NORTH, EAST, WEST), MOVES):
+                if maze.in_bounds(r+dr, c+dc) and maze.can_move(r, c, dr, dc):
+                    bits |= bit
+            self.adj[self._index((r, c))] = bits
+        for cell in cells:
+            self._update(self._index(cell))
+
+    def move_end(self, end):
+        """Plan to a new end, keeping the distances from start that are already known"""
+        self.km += abs(end[0] - self.end[0]) + abs(end[1] - self.end[1])
+        self.end = end
+
+    def _compute(self):
+        t = self._index(self.end)
+        g, rhs = self.g, self.rhs
+        while True:
+            top = self._top()
+            if top is None or (top[0] >= self._key(t) and rhs[t] == g[t]):
+                return
+            key, u = heapq.heappop(self.heap)
+            if key < self._key(u):
+                # Queued before the end moved: requeue with its current key
+                self._push(u)
+                continue
+            del self.queued[u]
+            self.expanded += 1
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+            else:
+                g[u] = INF
+                self._update(u)
+            for j in self._neighbors(u):
+                self._update(j)
+
+    def path(self):
+        """Current shortest path as a list of (row, col), or None"""
+        self._compute()
+        C = self.maze.C
+        cur = self._index(self.end)
+        if self.g[cur] == INF:
+            return None
+        s = self._index(self.start)
+        path = [cur]
+        while cur != s:
+            cur = min(self._neighbors(cur), key=self.g.__getitem__)
+            path.append(cur)
+        path.reverse()
+        return [divmod(i, C) for i in path]
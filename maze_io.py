@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Maze files: the JSON editor format, a compact memory-mapped binary format and path exports.
+
+Binary layout (little endian), version 1:
+
+    offset  size  field
+    0       4     magic b"PMAZ"
+    4       2     format version
+    6       2     header size in bytes (planes start here)
+    8       4     rows
+    12      4     cols
+    16      8     start row, start col (int32, -1 when unset)
+    24      8     end row, end col (int32, -1 when unset)
+    32      ...   horizontal walls, (rows+1) x cols bits, np.packbits order
+    ...     ...   vertical walls, rows x (cols+1) bits
+
+One bit per wall, about 1/16 of the JSON size. load_binary() maps the file
+and unpacks the planes straight from the mapping into the Maze arrays, so
+only the pages actually needed are read and nothing is parsed.
+"""
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from maze_core import Maze
+
+MAGIC = b"PMAZ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIiiii")
+
+# File extension of the binary format; everything else is saved as JSON
+BINARY_EXT = ".pmaze"
+
+
+def _plane_sizes(rows, cols):
+    return ((rows + 1) * cols + 7) // 8, (rows * (cols + 1) + 7) // 8
+
+
+def _cell(values):
+    return tuple(values) if values[0] >= 0 else None
+
+
+def save_binary(path, maze, start=None, end=None):
+    hbits, vbits = maze.packed()
+    sr, sc = start or (-1, -1)
+    er, ec = end or (-1, -1)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, HEADER.size, maze.R, maze.C, sr, sc, er, ec))
+        f.write(hbits.tobytes())
+        f.write(vbits.tobytes())
+
+
+def read_header(path):
+    """Return (rows, cols, start, end) without touching the wall planes"""
+    with open(path, "rb") as f:
+        return _parse_header(f.read(HEADER.size), path)[:4]
+
+
+def _parse_header(data, path):
+    if len(data) < HEADER.size or data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a binary maze file")
+    magic, version, header_size, rows, cols, sr, sc, er, ec = HEADER.unpack_from(data)
+    if version > VERSION:
+        raise ValueError(f"{path} has maze format version {version}, newer than {VERSION}")
+    return rows, cols, _cell((sr, sc)), _cell((er, ec)), header_size
+
+
+def load_binary(path):
+    """Load a binary maze file; returns (maze, start, end)"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        rows, cols, start, end, offset = _parse_header(mm[:HEADER.size], path)
+        hsize, vsize = _plane_sizes(rows, cols)
+        if len(mm) < offset + hsize + vsize:
+            raise ValueError(f"{path} is truncated: {len(mm)} bytes, expected {offset + hsize + vsize}")
+        hbits = np.frombuffer(mm, dtype=np.uint8, count=hsize, offset=offset)
+        vbits = np.frombuffer(mm, dtype=np.uint8, count=vsize, offset=offset + hsize)
+        maze = Maze.from_packed(rows, cols, hbits, vbits)
+        # The arrays are unpacked copies; drop the views before the mapping closes
+        del hbits, vbits
+    return maze, start, end
+
+
+def save_json(path, maze, start=None, end=None):
+    hw, vw = maze.to_lists()
+    maze_data = {
+        'rows': maze.R,
+        'cols': maze.C,
+        'horizontal_walls': hw,
+        'vertical_walls': vw,
+        'start': start,
+        'end': end
+    }
+    with open(path, 'w') as f:
+        json.dump(maze_data, f)
+
+
+def load_json(path):
+    """Load a JSON maze file; returns (maze, start, end)"""
+    with open(path, 'r') as f:
+        maze_data = json.load(f)
+    maze = Maze(maze_data['rows'], maze_data['cols'],
+                maze_data['horizontal_walls'], maze_data['vertical_walls'])
+    start = tuple(maze_data['start']) if maze_data.get('start') else None
+    end = tuple(maze_data['end']) if maze_data.get('end') else None
+    return maze, start, end
+
+
+def write_path_export(file_path, path, commands):
+    """Write a solved path as a text file: the cells, then the movement commands"""
+    with open(file_path, 'w') as f:
+        # Write path cells
+        f.write("Path (row, col):\n")
+        f.writelines(f"({r}, {c})\n" for r, c in path)
+        
+        # Write movement commands
+        f.write("\nMovement Commands:\n")
+        f.write(''.join(commands))
+
+
+def is_binary(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_maze(path):
+    """Load either format, recognized by content; returns (maze, start, end)"""
+    return load_binary(path) if is_binary(path) else load_json(path)
+
+
+def save_maze(path, maze, start=None, end=None):
+    """Save as binary for BINARY_EXT files, as JSON otherwise"""
+    if str(path).lower().endswith(BINARY_EXT):
+        save_binary(path, maze, start, end)
+    else:
+        save_json(path, maze, start, end)
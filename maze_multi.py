@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Cooperative routes for several cars in one maze: space-time A* over a reservation table.
+
+Time advances in steps; in each step a car drives one cell forward, turns
+a quarter, or waits ('W'). The real car takes different times for these,
+so the plan only holds if the cars are driven one step at a time, the next
+step starting when all have finished the last (car_fleet.FleetRun). Cars are
+planned one after another (cooperative A*): each one searches over
+(cell, heading, time) states and avoids the cells the cars before it
+reserved, then reserves its own. A car only drives into a cell that is
+empty at both ends of the step, and nobody drives into the cell it left
+in the same step, so cars never meet head on or close behind one another,
+however much faster one of them is. A car that has arrived keeps its cell
+for good, so later cars route around it, and a car still waiting for its
+route blocks its start cell. The heuristic is the exact time to
+the goal for a car alone in the maze, turns included. When a car finds no
+route, it is moved to the front of the order and the fleet is planned
+again; of the orders tried, the plan that routes the most cars in the
+fewest steps wins, and cars still stuck park as close to their goals as
+they can, then try once more for their goals around the final routes of
+the others.
+
+    starts = [(0, 0), (0, 9)]
+    plan = plan_fleet(maze, starts, assign_goals(maze, (9, 9), starts))
+    plan.routes[0]  # (path, commands) of the first car, or None
+
+Paths list one cell per time step, so a car's position at step t is
+path[t]; commands use F, L, R and W.
+"""
+from collections import deque
+import heapq
+
+from maze_core import adjacency
+from maze_planner import HEADING_BITS, HEADING_MOVES
+
+WAIT = 'W'
+
+
+class ReservationTable:
+    """Cells taken by the cars planned so far, by time step"""
+
+    def __init__(self):
+        self.cells = {}     # (cell, t) -> car
+        self.parked = {}    # cell -> step from which a car stays there
+        self.last = {}      # cell -> last step it is reserved in passing
+        self.end = 0        # After this step only the parked cars are left
+
+    def reserve(self, path, car):
+        """Take path (one flat cell index per step) for car, and its last cell for good"""
+        for t, cell in enumerate(path):
+            self.cells[(cell, t)] = car
+            if self.last.get(cell, -1) < t:
+                self.last[cell] = t
+        self.parked[path[-1]] = len(path) - 1
+        self.end = max(self.end, len(path) - 1)
+
+    def hold(self, cell):
+        """Block cell for good, for a car that has no route yet"""
+        self.parked[cell] = 0
+
+    def release(self, cell):
+        del self.parked[cell]
+
+    def blocked(self):
+        """Cells that are never free"""
+        return {cell for cell, since in self.parked.items() if since == 0}
+
+    def free(self, cell, t):
+        if (cell, t) in self.cells:
+            return False
+        since = self.parked.get(cell)
+        return since is None or t < since
+
+    def can_move(self, a, b, t):
+        """Drive from a at step t to b at t + 1 into a cell empty all step, with nobody close behind"""
+        return self.free(b, t) and self.free(b, t + 1) and self.free(a, t + 1)
+
+    def can_park(self, cell, t):
+        """Stay in cell from step t on without blocking a car that passes later"""
+        return self.last.get(cell, -1) < t and cell not in self.parked
+
+
+def _distances(adj, cols, source):
+    """Steps from source to every cell, -1 where it cannot be reached"""
+    dist = [-1] * len(adj)
+    dist[source] = 0
+    queue = deque([source])
+    offsets = tuple(dr * cols + dc for dr, dc in HEADING_MOVES)
+    while queue:
+        i = queue.popleft()
+        m = adj[i]
+        for h in range(4):
+            if m & HEADING_BITS[h]:
+                j = i + offsets[h]
+                if dist[j] < 0:
+                    dist[j] = dist[i] + 1
+                    queue.append(j)
+    return dist
+
+
+def _pose_distances(adj, cols, goal):
+    """Steps from every pose (index cell * 4 + heading) to goal, turns included; -1 if unreachable"""
+    offsets = tuple(dr * cols + dc for dr, dc in HEADING_MOVES)
+    dist = [-1] * (4 * len(adj))
+    queue = deque()
+    for h in range(4):
+        dist[goal * 4 + h] = 0
+        queue.append(goal * 4 + h)
+    while queue:
+        pose = queue.popleft()
+        i, h = divmod(pose, 4)
+        d = dist[pose] + 1
+        # The poses one step before: turned the other way, or a cell back
+        before = [i * 4 + (h + 1) % 4, i * 4 + (h + 3) % 4]
+        j = i - offsets[h]
+        if adj[i] & HEADING_BITS[(h + 2) % 4]:
+            before.append(j * 4 + h)
+        for p in before:
+            if dist[p] < 0:
+                dist[p] = d
+                queue.append(p)
+    return dist
+
+
+def _open_way(adj, cols, start, goal, blocked):
+    """True if goal can be reached from start without entering a blocked cell"""
+    if goal in blocked:
+        return False
+    offsets = tuple(dr * cols + dc for dr, dc in HEADING_MOVES)
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        if i == goal:
+            return True
+        m = adj[i]
+        for h in range(4):
+            if m & HEADING_BITS[h]:
+                j = i + offsets[h]
+                if j not in seen and j not in blocked:
+                    seen.add(j)
+                    queue.append(j)
+    return False
+
+
+def _shortest_way(adj, cols, start, dist):
+    """Cells of one shortest path from start down dist to its goal, empty if there is none"""
+    if dist[start] < 0:
+        return set()
+    offsets = tuple(dr * cols + dc for dr, dc in HEADING_MOVES)
+    way = {start}
+    i = start
+    while dist[i]:
+        i = next(i + offsets[h] for h in range(4)
+                 if adj[i] & HEADING_BITS[h] and dist[i + offsets[h]] == dist[i] - 1)
+        way.add(i)
+    return way
+
+
+def space_time_astar(adj, cols, start, heading, goal, dist, table, horizon, settle=False, pose_dist=None):
+    """Earliest route of one car past the reservations in table.
+
+    start and goal are flat cell indices, dist the steps to goal from every
+    cell and pose_dist (by default worked out here) from every pose, which
+    is the heuristic. Returns a list of (cell, heading) per time step,
+    ending parked on goal, or None if there is none within horizon steps.
+    With settle, a car that cannot reach goal parks as close to it as it
+    can instead.
+    """
+    if dist[start] < 0:
+        return None
+    if not settle and not _open_way(adj, cols, start, goal, table.blocked()):
+        return None
+    if pose_dist is None:
+        pose_dist = _pose_distances(adj, cols, goal)
+    closest = None
+    offsets = tuple(dr * cols + dc for dr, dc in HEADING_MOVES)
+    # Once every other car is parked the table no longer changes, so later
+    # visits of a pose are no better than the first: states past table.end
+    # share one time slot, which bounds the search when there is no route
+    still = table.end + 1
+    parent = {(start, heading, 0): None}
+    # Among equal estimates the state furthest along in time comes first
+    heap = [(pose_dist[start * 4 + heading], 0, start, heading)]
+    while heap:
+        _, t, cell, h = heapq.heappop(heap)
+        t = -t
+        state = (cell, h, min(t, still))
+        if cell == goal and table.can_park(goal, t):
+            return _route(parent, state)
+        if settle and (closest is None or (dist[cell], t) < closest[:2]) and table.can_park(cell, t):
+            closest = (dist[cell], t, state)
+        if t >= horizon:
+            continue
+        nt = t + 1
+        successors = []
+        if table.free(cell, nt):
+            successors += [(cell, h), (cell, (h + 1) % 4), (cell, (h + 3) % 4)]
+        if adj[cell] & HEADING_BITS[h]:
+            nxt = cell + offsets[h]
+            if table.can_move(cell, nxt, t):
+                successors.append((nxt, h))
+        for nc, nh in successors:
+            key = (nc, nh, min(nt, still))
+            if key not in parent:
+                parent[key] = state
+                heapq.heappush(heap, (nt + pose_dist[nc * 4 + nh], -nt, nc, nh))
+    return _route(parent, closest[2]) if closest else None
+
+
+def _route(parent, state):
+    route = []
+    while state is not None:
+        route.append(state[:2])
+        state = parent[state]
+    route.reverse()
+    return route
+
+
+def route_commands(route):
+    """Commands for a (cell, heading) per step route: one of F, L, R, W per step"""
+    commands = []
+    for (c0, h0), (c1, h1) in zip(route, route[1:]):
+        if c0 != c1:
+            commands.append('F')
+        elif h1 == (h0 + 1) % 4:
+            commands.append('R')
+        elif h1 == (h0 + 3) % 4:
+            commands.append('L')
+        else:
+            commands.append(WAIT)
+    return ''.join(commands)
+
+
+class FleetPlan:
+    """Routes of a fleet: routes[k] is (path, commands) for car k, or None if it stays put"""
+
+    def __init__(self, routes, order, goals):
+        self.routes = routes
+        self.order = order  # Planning priority that produced the routes
+        self.failed = [k for k, route in enumerate(routes) if route is None]
+        # Cars that park short of their goal, with another car in the way
+        self.short = [k for k, route in enumerate(routes) if route and route[0][-1] != goals[k]]
+        self.makespan = max((len(route[0]) - 1 for route in routes if route), default=0)
+        self.total_steps = sum(len(route[0]) - 1 for route in routes if route)
+
+    def __repr__(self):
+        return (f"FleetPlan({len(self.routes)} cars, makespan {self.makespan}, "
+                f"{len(self.short)} short, {len(self.failed)} unrouted)")
+
+
+def _plan_order(adj, cols, starts, headings, goals, dists, pose_dists, order, horizon, stay=(), settle=()):
+    """Plan the cars in order; the cars in stay do not move and block their start cells,
+    the ones in settle may park short of their goals"""
+    table = ReservationTable()
+    routes = [None] * len(starts)
+    for k in stay:
+        table.reserve([starts[k]], k)
+    # A car without a route yet blocks its start cell, so a car queued behind
+    # another gets its route once that one has moved off: go round the
+    # order until a round routes no more cars
+    waiting = [k for k in order if k not in stay]
+    for k in waiting:
+        table.hold(starts[k])
+    routed = True
+    while waiting and routed:
+        routed = False
+        for k in list(waiting):
+            table.release(starts[k])
+            route = space_time_astar(adj, cols, starts[k], headings[k], goals[k], dists[k], table, horizon,
+                                     k in settle, pose_dists[k])
+            if route is None:
+                table.hold(starts[k])
+                continue
+            cells = [cell for cell, _ in route]
+            table.reserve(cells, k)
+            routes[k] = (cells, route_commands(route))
+            waiting.remove(k)
+            routed = True
+    return routes
+
+
+def _reroute_short(adj, cols, starts, headings, goals, dists, pose_dists, routes, horizon):
+    """Plan the cars that park short of their goals again, around the final routes of all the others.
+
+    A car that got stuck was planned while the cars after it still blocked
+    their starts; once those have routes, the way may be clear.
+    """
+    for k in range(len(starts)):
+        if routes[k] and routes[k][0][-1] == goals[k]:
+            continue
+        table = ReservationTable()
+        for j, route in enumerate(routes):
+            if j != k:
+                table.reserve(route[0] if route else [starts[j]], j)
+        route = space_time_astar(adj, cols, starts[k], headings[k], goals[k], dists[k], table, horizon,
+                                 False, pose_dists[k])
+        if route is not None:
+            routes[k] = ([cell for cell, _ in route], route_commands(route))
+    return routes
+
+
+def plan_fleet(maze, starts, goals, headings=None, horizon=None, attempts=None):
+    """Plan conflict-free routes for cars from starts to goals (lists of (row, col)).
+
+    No two cars are ever in the same cell in the same step, and no two swap
+    cells in one step. A car that cannot get to its goal parks as close to it
+    as it can (plan.short), or stays at its start if it cannot move out of
+    the others' way (plan.failed). headings default to North. horizon bounds the steps
+    a route may take (by default enough to wait for every other car); up to
+    attempts priority orders are tried (by default one per car).
+    """
+    if len(set(map(tuple, goals))) != len(goals):
+        raise ValueError("Each car needs its own goal")
+    if len(set(map(tuple, starts))) != len(starts):
+        raise ValueError("Two cars cannot start in the same cell")
+    C = maze.C
+    adj = adjacency(maze).tobytes()
+    n = len(starts)
+    headings = list(headings) if headings is not None else [0] * n
+    flat_starts = [r * C + c for r, c in starts]
+    flat_goals = [r * C + c for r, c in goals]
+    dists = [_distances(adj, C, g) for g in flat_goals]
+    pose_dists = [_pose_distances(adj, C, g) for g in flat_goals]
+    if horizon is None:
+        longest = max((d[s] for d, s in zip(dists, flat_starts)), default=0)
+        horizon = 3 * longest + 2 * n * (maze.R + maze.C) + 8
+
+    # A car parked on another car's way shuts it out, so the cars whose goals
+    # are on the fewest other ways choose first; then the ones with the
+    # longest way, as they set the makespan
+    ways = [_shortest_way(adj, C, s, d) for s, d in zip(flat_starts, dists)]
+    crossing = [sum(g in way for j, way in enumerate(ways) if j != k) for k, g in enumerate(flat_goals)]
+    order = sorted(range(n), key=lambda k: (crossing[k], -dists[k][flat_starts[k]], k))
+    best = None
+    for _ in range(attempts or n):
+        routes = _plan_order(adj, C, flat_starts, headings, flat_goals, dists, pose_dists, order, horizon)
+        plan = FleetPlan(routes, order, flat_goals)
+        if best is None or (len(plan.failed), plan.makespan) < (len(best.failed), best.makespan):
+            best = plan
+        if not plan.failed:
+            break
+        # Give the cars that got stuck the first pick of the maze
+        order = plan.failed + [k for k in order if k not in plan.failed]
+    if best.failed:
+        # The cars that got stuck go last and park as close to their goals as
+        # they can get; any that cannot even get out of the way stay where
+        # they are, and the others are planned around them
+        settle = best.failed
+        order = [k for k in best.order if k not in settle] + settle
+        stay = []
+        while True:
+            routes = _plan_order(adj, C, flat_starts, headings, flat_goals, dists, pose_dists, order, horizon,
+                                 stay, settle)
+            best = FleetPlan(routes, order, flat_goals)
+            stuck = [k for k in best.failed if k not in stay]
+            if not stuck:
+                break
+            stay += stuck
+    if best.short or best.failed:
+        routes = _reroute_short(adj, C, flat_starts, headings, flat_goals, dists, pose_dists, best.routes, horizon)
+        best = FleetPlan(routes, best.order, flat_goals)
+    best.routes = [([divmod(i, C) for i in route[0]], route[1]) if route else None
+                   for route in best.routes]
+    return best
+
+
+def assign_goals(maze, end, starts):
+    """A parking cell for each car at starts: the reachable cells closest to end.
+
+    The cars closest to end get the cells furthest from the car in front,
+    so in a corridor the first car to arrive drives deepest into it and
+    does not park in the way of the ones behind.
+    """
+    C = maze.C
+    adj = adjacency(maze).tobytes()
+    dist = _distances(adj, C, end[0] * C + end[1])
+    cells = sorted((d, i) for i, d in enumerate(dist) if d >= 0)
+    if len(cells) < len(starts):
+        raise ValueError(f"Only {len(cells)} cells can reach {end}")
+    flat = [r * C + c for r, c in starts]
+    by_distance = sorted(range(len(starts)), key=lambda k: (dist[flat[k]] < 0, dist[flat[k]]))
+    front = _distances(adj, C, flat[by_distance[0]])
+    spots = sorted((i for _, i in cells[:len(starts)]), key=lambda i: -front[i])
+    goals = [None] * len(starts)
+    for k, i in zip(by_distance, spots):
+        goals[k] = divmod(i, C)
+    return goals
+
+
+def nearest_free(maze, cell, taken):
+    """The cell closest to cell (by steps) that is not in taken, None if all reachable ones are"""
+    C = maze.C
+    adj = adjacency(maze).tobytes()
+    dist = _distances(adj, C, cell[0] * C + cell[1])
+    taken = {tuple(t) for t in taken}
+    free = [(d, i) for i, d in enumerate(dist) if d >= 0 and divmod(i, C) not in taken]
+    return divmod(min(free)[1], C) if free else None
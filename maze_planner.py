@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Route planning over (cell, heading) states, costed in car drive time."""
+from array import array
+import heapq
+
+import numpy as np
+
+from maze_core import NORTH, EAST, SOUTH, WEST, adjacency, bfs_prev
+
+# Headings as used by the car: 0=North, 1=East, 2=South, 3=West
+HEADING_BITS = (NORTH, EAST, SOUTH, WEST)
+HEADING_MOVES = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+# Commands turning from heading h to (h + k) % 4. The firmware has no
+# turn-around command, so a 180 degree turn is driven as two right turns.
+TURN_COMMANDS = ('', 'R', 'RR', 'L')
+
+
+# Commands to face heading target from heading current, as
+# ORIENTATION_COMMANDS[target][current]. This is the table the GUI has
+# always sent: a 180 degree change is "BB" rather than two turns.
+ORIENTATION_COMMANDS = {
+    0: {0: '', 1: 'L', 2: 'BB', 3: 'R'},  # Face North
+    1: {0: 'R', 1: '', 2: 'L', 3: 'BB'},  # Face East
+    2: {0: 'BB', 1: 'R', 2: '', 3: 'L'},  # Face South
+    3: {0: 'L', 1: 'BB', 2: 'R', 3: ''}   # Face West
+}
+
+# Heading of each single-cell move (dr, dc)
+MOVE_HEADINGS = {(-1, 0): 0, (0, 1): 1, (1, 0): 2, (0, -1): 3}
+
+
+def path_commands(path, heading=0):
+    """Movement string for a cell path, turning with ORIENTATION_COMMANDS before each F.
+
+    Steps between cells that are not neighbors are skipped.
+    """
+    commands = []
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        target = MOVE_HEADINGS.get((r1 - r0, c1 - c0))
+        if target is not None:
+            commands.append(ORIENTATION_COMMANDS[target][heading])
+            heading = target
+            commands.append('F')
+    return ''.join(commands)
+
+
+def drive_commands(path, heading=0):
+    """Movement string for a cell path, turning with TURN_COMMANDS as plan_drive() does"""
+    commands = []
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        target = MOVE_HEADINGS.get((r1 - r0, c1 - c0))
+        if target is not None:
+            commands.append(TURN_COMMANDS[(target - heading) % 4])
+            heading = target
+            commands.append('F')
+    return ''.join(commands)
+
+
+class DriveCosts:
+    """Estimated time in seconds for each maneuver of the car"""
+
+    def __init__(self, forward=1.5, turn90=1.2, turn180=2.4):
+        self.forward = forward
+        self.turn90 = turn90
+        self.turn180 = turn180
+
+    def turn(self, k):
+        """Cost of turning k quarter turns clockwise (k in 0..3)"""
+        return (0, self.turn90, self.turn180, self.turn90)[k]
+
+    def __repr__(self):
+        return f"DriveCosts(forward={self.forward}, turn90={self.turn90}, turn180={self.turn180})"
+
+
+def plan_drive(maze, start, end, start_heading=0, costs=None):
+    """Cheapest route from start to end, counting turns as well as moves.
+
+    Runs Dijkstra over (cell, heading) states, where each step turns to one
+    of the four headings and then drives one cell forward. Returns
+    (path, commands, cost) with path a list of (row, col), commands the
+    movement string for the car and cost the estimated drive time, or None
+    if end is unreachable.
+    """
+    costs = costs or DriveCosts()
+    C = maze.C
+    adj = adjacency(maze).tobytes()
+    offsets = tuple(dr * C + dc for dr, dc in HEADING_MOVES)
+    turn_costs = [costs.turn(k) + costs.forward for k in range(4)]
+    n = 4 * len(adj)
+    source = 4 * (start[0] * C + start[1]) + start_heading
+    target = end[0] * C + end[1]
+
+    dist = array('d', [-1.0]) * n
+    prev = array('i', [-1]) * n
+    dist[source] = 0.0
+    prev[source] = source
+    heap = [(0.0, source)]
+    while heap:
+        d, state = heapq.heappop(heap)
+        if d > dist[state]:
+            continue
+        cell, h = divmod(state, 4)
+        if cell == target:
+            return _unwind(prev, state, C) + (d,)
+        m = adj[cell]
+        for nh in range(4):
+            if m & HEADING_BITS[nh]:
+                nd = d + turn_costs[(nh - h) % 4]
+                nxt = 4 * (cell + offsets[nh]) + nh
+                if dist[nxt] < 0 or nd < dist[nxt]:
+                    dist[nxt] = nd
+                    prev[nxt] = state
+                    heapq.heappush(heap, (nd, nxt))
+    return None
+
+
+def _unwind(prev, state, cols):
+    states = [state]
+    while prev[state] != state:
+        state = prev[state]
+        states.append(state)
+    states.reverse()
+    path = [divmod(s // 4, cols) for s in states]
+    commands = []
+    for a, b in zip(states, states[1:]):
+        commands.append(TURN_COMMANDS[(b % 4 - a % 4) % 4])
+        commands.append('F')
+    return path, ''.join(commands)
+
+
+class GoalField:
+    """Precomputed routes to one goal from every cell, for instant replanning.
+
+    Built once per maze and goal: without costs a breadth-first next-hop
+    table (one int32 per cell, the neighbor one step closer to the goal),
+    with DriveCosts a reverse Dijkstra over (cell, heading) states that
+    stores the next state and the remaining drive time of each (8 bytes
+    per state). route() then follows the table from any cell and heading,
+    which costs O(path length) instead of a new search.
+    """
+
+    def __init__(self, maze, goal, costs=None):
+        self.maze = maze
+        self.goal = tuple(goal)
+        self.costs = costs
+        C = maze.C
+        adj = adjacency(maze)
+        g = goal[0] * C + goal[1]
+        if costs is None:
+            self.next_hop = bfs_prev(adj, C, g)[0]
+            self.cost = None
+        else:
+            self.next_hop, self.cost = _reverse_drive_field(adj.tobytes(), C, g, costs)
+
+    @property
+    def nbytes(self):
+        return self.next_hop.nbytes + (self.cost.nbytes if self.cost is not None else 0)
+
+    def reachable(self, cell):
+        i = cell[0] * self.maze.C + cell[1]
+        return self.next_hop[i if self.cost is None else 4 * i] >= 0
+
+    def route(self, cell, heading=0):
+        """(path, commands) from cell, facing heading, to the goal; None if unreachable.
+
+        Commands follow the same conventions as the search that built the
+        field: path_commands() for the BFS table, TURN_COMMANDS (as in
+        plan_drive) for the drive-time table.
+        """
+        C = self.maze.C
+        nxt = memoryview(self.next_hop)
+        i = cell[0] * C + cell[1]
+        if self.cost is None:
+            if nxt[i] < 0:
+                return None
+            path = [i]
+            while nxt[i] != i:
+                i = nxt[i]
+                path.append(i)
+            cells = [divmod(j, C) for j in path]
+            return cells, path_commands(cells, heading)
+        state = 4 * i + heading
+        if nxt[state] < 0:
+            return None
+        states = [state]
+        while nxt[state] != state:
+            state = nxt[state]
+            states.append(state)
+        cells = [divmod(s // 4, C) for s in states]
+        commands = []
+        for a, b in zip(states, states[1:]):
+            commands.append(TURN_COMMANDS[(b % 4 - a % 4) % 4])
+            commands.append('F')
+        return cells, ''.join(commands)
+
+    def drive_time(self, cell, heading=0):
+        """Remaining drive time from cell and heading (drive-time fields only)"""
+        return float(self.cost[4 * (cell[0] * self.maze.C + cell[1]) + heading])
+
+
+def _reverse_drive_field(adj, cols, goal, costs):
+    """Dijkstra backwards from the goal over (cell, heading) states.
+
+    Returns (next state as int32, -1 where the goal is unreachable and the
+    goal states pointing to themselves; cost to go as float32).
+    """
+    n = 4 * len(adj)
+    offsets = tuple(dr * cols + dc for dr, dc in HEADING_MOVES)
+    step_costs = [costs.turn(k) + costs.forward for k in range(4)]
+    dist = array('d', [-1.0]) * n
+    nxt = array('i', [-1]) * n
+    heap = []
+    for h in range(4):
+        s = 4 * goal + h
+        dist[s] = 0.0
+        nxt[s] = s
+        heap.append((0.0, s))
+    while heap:
+        d, state = heapq.heappop(heap)
+        if d > dist[state]:
+            continue
+        cell, nh = divmod(state, 4)
+        # Every (prev, h) that turns to nh and drives forward into cell
+        prev = cell - offsets[nh]
+        if prev < 0 or prev >= len(adj) or not adj[prev] & HEADING_BITS[nh]:
+            continue
+        for h in range(4):
+            p = 4 * prev + h
+            nd = d + step_costs[(nh - h) % 4]
+            if dist[p] < 0 or nd < dist[p]:
+                dist[p] = nd
+                nxt[p] = state
+                heapq.heappush(heap, (nd, p))
+    return (np.frombuffer(nxt, dtype=np.int32).copy(),
+            np.frombuffer(dist, dtype=np.float64).astype(np.float32))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Raster images of a maze straight from its wall arrays, at any resolution, without a display.
+
+    python maze_render.py maze.pmaze maze.png --cell 8 --solve
+    python maze_render.py big.pmaze big.png --cell 4 --tile 4096   # big_r000_c000.png, ...
+
+Cells are filled by what they show (the canvas marks: path, car, end,
+start and the fleet cars), as a uint8 R x C array of indexes into a
+palette of color names. Walls are drawn from hw/vw as bands centered on
+the cell borders, and a thin grid outlines the cells as on the canvas.
+
+The image is rendered window by window with vectorized NumPy indexing:
+every pixel looks up its cell and the wall bands it falls in, so the
+cost is per pixel, independent of how many walls there are, and memory
+is bounded by the window. Images with more than MAX_IMAGE_PIXELS are
+written as tiles of tile x tile pixels, named by tile row and column.
+"""
+import os
+
+import numpy as np
+from PIL import Image, ImageColor
+
+# Fill colors of the cell marks, by index; the GUI appends the fleet colors
+MARK_COLORS = ("white", "lightblue", "orange", "red", "green")
+CELL_PATH, CELL_CAR, CELL_END, CELL_START = 1, 2, 3, 4
+
+WALL_COLOR = "black"
+GRID_COLOR = "black"
+
+# Pixels per cell from which cell outlines are drawn by default
+GRID_MIN_CELL_PX = 4
+
+# Larger images are written as tiles, each rendered on its own
+MAX_IMAGE_PIXELS = 64 * 1024 * 1024
+TILE_PX = 4096
+
+# Rows of pixels rendered at a time when one image is written whole
+STRIP_PIXELS = 4 * 1024 * 1024
+
+
+def _rgb(colors):
+    return np.array([ImageColor.getrgb(color)[:3] for color in colors], dtype=np.uint8)
+
+
+def _bands(coords, offset, cell_px, wall_px, count):
+    """Border index (0..count) whose wall band covers each coordinate, -1 for none"""
+    u = coords - offset + wall_px // 2
+    index = u // cell_px
+    return np.where((u - index * cell_px < wall_px) & (index >= 0) & (index <= count), index, -1)
+
+
+def _spans(coords, offset, cell_px, wall_px, count):
+    """Cell index (0..count-1) whose wall segment covers each coordinate, and the one before it
+    where the segments overlap at a corner; -1 for none"""
+    u = coords - offset + wall_px // 2
+    index = u // cell_px
+    main = np.where((index >= 0) & (index < count), index, -1)
+    before = np.where((u - index * cell_px < wall_px) & (index >= 1) & (index <= count), index - 1, -1)
+    return main, before
+
+
+def _segments(walls, rows, main, before):
+    """For a pixel grid, whether the wall (rows, main or before) is set; -1 indexes are off"""
+    # Only the walls the window touches are copied, padded by a row and a
+    # column that are never set, where the -1 indexes land
+    r0 = max(rows.min(initial=0), 0)
+    c0 = max(min(main.min(initial=0), before.min(initial=0)), 0)
+    r1 = rows.max(initial=-1) + 1
+    c1 = max(main.max(initial=-1), before.max(initial=-1)) + 1
+    padded = np.zeros((max(r1 - r0, 0) + 1, max(c1 - c0, 0) + 1), dtype=bool)
+    padded[:-1, :-1] = walls[r0:r1, c0:c1]
+    r = np.where(rows >= 0, rows - r0, -1)[:, None]
+    return (padded[r, np.where(main >= 0, main - c0, -1)[None, :]]
+            | padded[r, np.where(before >= 0, before - c0, -1)[None, :]])
+
+
+class MazeRenderer:
+    """Renders windows of the full image of maze; cells (R x C marks) may be None for blank cells"""
+
+    def __init__(self, maze, cells=None, palette=MARK_COLORS, cell_px=16, wall_px=None, grid=None):
+        self.maze = maze
+        self.cells = cells
+        self.palette = _rgb(palette)
+        self.cell_px = max(1, int(cell_px))
+        if wall_px is None:
+            wall_px = round(self.cell_px / 6)
+        self.wall_px = min(max(1, int(wall_px)), self.cell_px)
+        self.grid = self.cell_px >= GRID_MIN_CELL_PX if grid is None else grid
+        self.wall_rgb = _rgb([WALL_COLOR])[0]
+        self.grid_rgb = _rgb([GRID_COLOR])[0]
+        # Room for the outer walls, which are centered on the border too
+        self.offset = self.wall_px // 2
+        self.height = maze.R * self.cell_px + self.wall_px
+        self.width = maze.C * self.cell_px + self.wall_px
+
+    @property
+    def size(self):
+        """(width, height) of the full image in pixels"""
+        return self.width, self.height
+
+    def render(self, y0=0, y1=None, x0=0, x1=None):
+        """Pixels [y0, y1) x [x0, x1) of the full image as an RGB uint8 array"""
+        y1 = self.height if y1 is None else min(y1, self.height)
+        x1 = self.width if x1 is None else min(x1, self.width)
+        R, C = self.maze.R, self.maze.C
+        px, wpx, off = self.cell_px, self.wall_px, self.offset
+        ys = np.arange(y0, y1, dtype=np.int64)
+        xs = np.arange(x0, x1, dtype=np.int64)
+
+        # Cell fills; outside the cells is background
+        rows = (ys - off) // px
+        cols = (xs - off) // px
+        row_in = (ys >= off) & (rows < R)
+        col_in = (xs >= off) & (cols < C)
+        marks = np.zeros((len(ys), len(xs)), dtype=np.uint8)
+        if self.cells is not None:
+            marks[np.ix_(row_in, col_in)] = self.cells[np.ix_(rows[row_in], cols[col_in])]
+        image = self.palette[marks]
+
+        if self.grid:
+            on_row = row_in & ((ys - off) % px == 0)
+            on_col = col_in & ((xs - off) % px == 0)
+            image[np.ix_(on_row, col_in)] = self.grid_rgb
+            image[np.ix_(row_in, on_col)] = self.grid_rgb
+
+        # hw[r, c] runs along border row r over cell column c; vw[r, c] along border column c
+        hw = self.maze.hw.astype(bool, copy=False)
+        vw = self.maze.vw.astype(bool, copy=False)
+        walls = _segments(hw, _bands(ys, off, px, wpx, R), *_spans(xs, off, px, wpx, C))
+        walls |= _segments(vw.T, _bands(xs, off, px, wpx, C), *_spans(ys, off, px, wpx, R)).T
+        image[walls] = self.wall_rgb
+        return image
+
+    def image(self, y0=0, y1=None, x0=0, x1=None):
+        return Image.fromarray(self.render(y0, y1, x0, x1), "RGB")
+
+    def full(self):
+        """The whole image, rendered in strips of rows"""
+        out = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        strip = max(1, STRIP_PIXELS // self.width)
+        for y in range(0, self.height, strip):
+            out[y:y + strip] = self.render(y, y + strip)
+        return Image.fromarray(out, "RGB")
+
+    def tiles(self, tile=TILE_PX):
+        """Yield (tile row, tile column, Image) covering the full image"""
+        for i, y in enumerate(range(0, self.height, tile)):
+            for j, x in enumerate(range(0, self.width, tile)):
+                yield i, j, self.image(y, y + tile, x, x + tile)
+
+
+def tile_path(path, row, col):
+    root, ext = os.path.splitext(path)
+    return f"{root}_r{row:03d}_c{col:03d}{ext or '.png'}"
+
+
+def export_image(path, maze, cells=None, palette=MARK_COLORS, cell_px=16, wall_px=None, grid=None, tile=None):
+    """Write the maze image to path, or as tiles next to it when it is too large (or tile is given).
+
+    Returns the list of files written.
+    """
+    renderer = MazeRenderer(maze, cells, palette, cell_px, wall_px, grid)
+    width, height = renderer.size
+    if tile is None and width * height <= MAX_IMAGE_PIXELS:
+        renderer.full().save(path)
+        return [path]
+    written = []
+    for row, col, image in renderer.tiles(tile or TILE_PX):
+        name = tile_path(path, row, col)
+        image.save(name)
+        written.append(name)
+    return written
+
+
+def mark_cells(maze, path=None, start=None, end=None, car=None):
+    """Cell marks for a maze with a path and endpoints, as the canvas shows them"""
+    cells = np.zeros((maze.R, maze.C), dtype=np.uint8)
+    if path:
+        rows, cols = zip(*path)
+        cells[list(rows), list(cols)] = CELL_PATH
+    for mark, cell in ((CELL_CAR, car), (CELL_END, end), (CELL_START, start)):
+        if cell:
+            cells[tuple(cell)] = mark
+    return cells
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from maze_core import solve
+    from maze_io import load_maze
+
+    parser = argparse.ArgumentParser(description="Render a maze file to a PNG image (or tiles of one)")
+    parser.add_argument("maze", help="maze file, JSON or binary")
+    parser.add_argument("output", help="image file; tiles get _rROW_cCOL before the extension")
+    parser.add_argument("--cell", type=int, default=16, help="pixels per cell")
+    parser.add_argument("--wall", type=int, default=None, help="wall thickness in pixels")
+    parser.add_argument("--no-grid", action="store_true", help="do not outline the cells")
+    parser.add_argument("--solve", action="store_true", help="draw the shortest path from start to end")
+    parser.add_argument("--tile", type=int, default=None,
+                        help=f"write tiles of this many pixels a side (automatic over {MAX_IMAGE_PIXELS:,} pixels)")
+    args = parser.parse_args()
+
+    maze, start, end = load_maze(args.maze)
+    path = solve(maze, start, end) if args.solve and start and end else None
+    if args.solve and path is None:
+        print("No path from start to end")
+    t0 = time.perf_counter()
+    files = export_image(args.output, maze, mark_cells(maze, path, start, end), cell_px=args.cell,
+                         wall_px=args.wall, grid=False if args.no_grid else None, tile=args.tile)
+    elapsed = time.perf_counter() - t0
+    width, height = MazeRenderer(maze, cell_px=args.cell, wall_px=args.wall).size
+    print(f"{maze.R}x{maze.C} maze as {width}x{height} pixels in {len(files)} file(s), {elapsed:.2f} s "
+          f"({width * height / elapsed / 1e6:,.1f} Mpixel/s)")
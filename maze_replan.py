@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Online replanning: follow the car's telemetry along a plan and repair the plan when it strays.
+
+A Replanner is told about each STEP, POS and DATA message while the car
+drives a planned path. A POS that is not the next cell or two of the path
+is a divergence, whether the car slipped or its commands do not drive the
+path; sensor readings taken where a motion ended update the maze walls on
+the four sides of the car, and a new wall across the rest of the path is
+a divergence too. replan() then re-solves from the car's cell and heading
+with an IncrementalSolver rooted at the goal, which keeps its distances
+across moves and wall changes, and returns the corrected path and commands.
+"""
+from car_protocol import BLOCK_CM, MOTIONS, SENSOR_ORDER, SENSOR_TURNS, SIDE_GAP_CM
+from maze_incremental import IncrementalSolver
+from maze_planner import HEADING_MOVES, drive_commands
+
+# Readings below this are a wall next to the car, from OPEN_CM on the way is
+# clear; in between (or 0, no echo) they say nothing
+WALL_CM = BLOCK_CM
+OPEN_CM = BLOCK_CM + SIDE_GAP_CM
+
+# How far ahead of the last STEP a POS may be and still count as on plan,
+# since STEP and POS messages can be coalesced away on a busy link
+POS_WINDOW = 3
+
+SENSOR_HEADINGS = dict(zip(SENSOR_ORDER, SENSOR_TURNS))
+
+
+def expected_poses(cell, heading, commands):
+    """Poses (row, col, heading) before the first and after every command"""
+    r, c = cell
+    poses = [(r, c, heading)]
+    for cmd in commands:
+        blocks, turns = MOTIONS.get(cmd, (0, 0))
+        dr, dc = HEADING_MOVES[heading]
+        r, c = r + dr * blocks, c + dc * blocks
+        heading = (heading + turns) % 4
+        poses.append((r, c, heading))
+    return poses
+
+
+def _wall(cell, heading):
+    """The ('h' or 'v', r, c) wall on one side of cell"""
+    r, c = cell
+    return (('h', r, c), ('v', r, c + 1), ('h', r + 1, c), ('v', r, c))[heading]
+
+
+class Replanner:
+    """Tracks a car driving commands along path, from heading, towards end in maze.
+
+    Walls learned from the sensors are written into maze itself. Telemetry
+    is only followed while active: after a new plan the car first has to
+    stop and take the new commands, and messages still in flight from the
+    old plan would look like divergences, so call start() once the car
+    reports that it is executing.
+    """
+
+    def __init__(self, maze, end, path, heading, commands):
+        self.maze = maze
+        self.end = tuple(end)
+        self.solver = IncrementalSolver(maze, self.end, tuple(path[0]))
+        self.replans = 0
+        self.walls_learned = 0
+        self.follow(path, heading, commands)
+
+    def follow(self, path, heading, commands):
+        """Expect the car to drive commands along path next, facing heading at its first cell"""
+        self.path = [tuple(cell) for cell in path]
+        self.cell = self.path[0]
+        self.heading = heading
+        self.commands = commands
+        self.poses = expected_poses(self.cell, heading, commands)
+        self.index = 0  # Cells of path reached
+        self.step = 0  # Commands done
+        self.moving = False
+        self.active = False
+        self.reason = None
+
+    def start(self):
+        self.active = True
+
+    def on_step(self, step):
+        """The car started command number step"""
+        if self.active:
+            self.step = min(step, len(self.commands))
+            self.moving = True
+
+    def on_position(self, cell):
+        """The car finished a motion at cell; returns True if that is off the path"""
+        if not self.active:
+            return False
+        cell = tuple(cell)
+        # While a command runs its POS is the pose after it, otherwise a repeat
+        done = min(self.step + 1 if self.moving else self.step, len(self.commands))
+        self.moving = False
+        self.cell = cell
+        # Turns are not measured: the heading is the one the commands give here
+        self.heading = self.poses[done][2]
+        for k in range(done, min(done + POS_WINDOW, len(self.poses))):
+            if self.poses[k][:2] == cell:
+                self.step, self.heading = k, self.poses[k][2]
+                break
+        ahead = self.path[self.index:self.index + POS_WINDOW]
+        if cell in ahead:
+            self.index += ahead.index(cell)
+            return False
+        self.reason = f"car at {cell}, expected {ahead[1] if len(ahead) > 1 else ahead[0]}"
+        return True
+
+    def on_sensor(self, sensor, cm):
+        """A distance reading; returns (cells next to changed walls, True if the plan is now blocked)"""
+        turn = SENSOR_HEADINGS.get(sensor)
+        if not self.active or self.moving or turn is None or not cm or WALL_CM <= cm < OPEN_CM:
+            return [], False
+        heading = (self.heading + turn) % 4
+        dr, dc = HEADING_MOVES[heading]
+        r, c = self.cell
+        if not self.maze.in_bounds(r + dr, c + dc):
+            return [], False  # The border stays closed
+        wall = cm < WALL_CM
+        if wall == (not self.maze.can_move(r, c, dr, dc)):
+            return [], False
+        cells = self.maze.toggle_wall(*_wall(self.cell, heading))
+        self.solver.wall_changed(cells)
+        self.walls_learned += 1
+        blocked = wall and self._blocked()
+        if blocked:
+            self.reason = f"{sensor} sensor found a wall at {self.cell}"
+        return cells, blocked
+
+    def wall_changed(self, cells):
+        """Tell the solver about a wall edited elsewhere (Maze.toggle_wall returns the cells)"""
+        self.solver.wall_changed(cells)
+
+    def _blocked(self):
+        """True if a wall now crosses the part of the path not driven yet"""
+        can_move = self.maze.can_move
+        rest = self.path[self.index:]
+        for (r0, c0), (r1, c1) in zip(rest, rest[1:]):
+            if not can_move(r0, c0, r1 - r0, c1 - c0):
+                return True
+        return False
+
+    def replan(self):
+        """(path, commands) from the car's believed pose to end, now expected; None if unreachable"""
+        self.replans += 1
+        if not self.maze.in_bounds(*self.cell):
+            return None
+        self.solver.move_end(self.cell)
+        path = self.solver.path()
+        if path is None:
+            return None
+        path.reverse()
+        commands = drive_commands(path, self.heading)
+        self.follow(path, self.heading, commands)
+        return path, commands
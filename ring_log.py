@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Fixed-size in-memory log with level and prefix filtering, for the GUI's communication log."""
+from collections import deque
+from logging import DEBUG, INFO, WARNING, ERROR
+import time
+
+# Selectable minimum levels, as shown in the GUI
+LEVELS = {"Debug": DEBUG, "Info": INFO, "Warning": WARNING, "Error": ERROR}
+
+# Direction marks of link traffic, skipped when matching a prefix
+TRAFFIC_MARKS = "←→ "
+
+
+class RingLog:
+    """The last capacity entries, each (seq, time, level, text).
+
+    seq counts every entry ever added, so a reader can ask for what came
+    after the last entry it saw, and tell from the gap how many it missed
+    once they were pushed out of the ring.
+    """
+
+    def __init__(self, capacity=10000):
+        self.entries = deque(maxlen=capacity)
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, text, level=INFO):
+        self.seq += 1
+        self.entries.append((self.seq, time.time(), level, text))
+
+    def extend(self, items):
+        """Add (level, text) pairs with one timestamp"""
+        now = time.time()
+        append = self.entries.append
+        seq = self.seq
+        for level, text in items:
+            seq += 1
+            append((seq, now, level, text))
+        self.seq = seq
+
+    @property
+    def dropped(self):
+        """Entries pushed out of the ring so far"""
+        return self.seq - len(self.entries)
+
+    def select(self, after=0, level=DEBUG, prefix=""):
+        """Entries newer than seq after, at or above level, starting with prefix.
+
+        The prefix is matched against the text and, for link traffic, against
+        the line after its direction mark, so "DATA" picks out the sensor
+        telemetry and "→" everything sent to the car.
+        """
+        out = []
+        # Walk back from the newest entry, so only the new ones are visited
+        for entry in reversed(self.entries):
+            if entry[0] <= after:
+                break
+            if entry[2] >= level and (not prefix or entry[3].startswith(prefix)
+                                      or entry[3].lstrip(TRAFFIC_MARKS).startswith(prefix)):
+                out.append(entry)
+        out.reverse()
+        return out
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Serial link to the car: transports, a blocking bulk reader and the UI message bus."""
+import queue
+import threading
+import time
+
+from car_protocol import FrameDecoder
+
+# Port name that connects to an in-process simulated car instead of a device
+SIM_PORT = "sim://car"
+
+
+class LoopbackPort:
+    """One end of an in-process byte pipe, with the part of the pyserial API we use.
+
+    Bytes written to one end of a loopback_pair() are read from the other.
+    read() blocks for up to timeout seconds like serial.Serial.read(), and
+    closing either end closes both, like pulling the cable; reading or
+    writing a closed end raises OSError.
+    """
+
+    def __init__(self, timeout=1.0):
+        self.timeout = timeout
+        self.peer = None
+        self.is_open = True
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+
+    @property
+    def in_waiting(self):
+        with self._cond:
+            return len(self._buf)
+
+    def read(self, size=1):
+        with self._cond:
+            if not self._buf:
+                self._cond.wait_for(lambda: self._buf or not self.is_open, self.timeout)
+            if not self._buf and not self.is_open:
+                raise OSError("Port is closed")
+            data = bytes(self._buf[:size])
+            del self._buf[:size]
+            return data
+
+    def write(self, data):
+        if not self.is_open:
+            raise OSError("Port is closed")
+        peer = self.peer
+        with peer._cond:
+            peer._buf += data
+            peer._cond.notify()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self._cond:
+            self._buf.clear()
+
+    def _shut(self):
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+
+    def close(self):
+        self._shut()
+        self.peer._shut()
+
+
+def loopback_pair(timeout=1.0):
+    """Two connected LoopbackPort ends"""
+    a, b = LoopbackPort(timeout), LoopbackPort(timeout)
+    a.peer, b.peer = b, a
+    return a, b
+
+
+def open_port(name, baudrate=115200, timeout=1.0, **sim_options):
+    """Open a serial device, or with SIM_PORT a simulated car on a loopback pipe.
+
+    sim_options are passed to car_sim.SimulatedCar (timing, maze, start, ...).
+    The returned object has the serial.Serial methods the GUI and
+    SerialReader use, so the rest of the link cannot tell the difference.
+    """
+    if name == SIM_PORT:
+        from car_sim import SimulatedCar
+        port, car_end = loopback_pair(timeout)
+        port.car = SimulatedCar(car_end, **sim_options)
+        port.car.start()
+        return port
+    import serial
+    return serial.Serial(name, baudrate, timeout=timeout)
+
+
+def coalesce(batch):
+    """Drop (line, message) entries superseded later in the same batch.
+
+    Only the latest DATA per sensor, the latest STEP and the latest POS
+    survive; everything else is kept. Survivors stay in the order of their
+    last occurrence, so a STEP followed by a POS still ends on the POS.
+    """
+    latest = {}
+    for n, item in enumerate(batch):
+        kind, value = item[1]
+        if kind == "DATA":
+            key = ("DATA", value[0])
+        elif kind in ("STEP", "POS"):
+            key = kind
+        else:
+            key = n
+        latest.pop(key, None)
+        latest[key] = item
+    return list(latest.values())
+
+
+class MessageBus:
+    """Thread-safe hand-off of parsed messages from I/O threads to the Tk loop.
+
+    Producers only call put(); the consumer calls drain() from the Tk
+    thread, which returns what arrived since the last frame, bounded by a
+    time budget so a flood of telemetry cannot stall the UI.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def empty(self):
+        return self._queue.empty()
+
+    def drain(self, budget, max_items=10000):
+        """Take queued items for up to budget seconds or max_items, whichever comes first"""
+        items = []
+        get = self._queue.get_nowait
+        deadline = time.perf_counter() + budget
+        try:
+            while len(items) < max_items:
+                items.append(get())
+                if not len(items) % 64 and time.perf_counter() > deadline:
+                    break
+        except queue.Empty:
+            pass
+        return items
+
+
+class SerialReader(threading.Thread):
+    """Reads messages from a serial port and puts (line, message) tuples on a MessageBus.
+
+    The thread blocks in read() until bytes arrive, then drains everything
+    the port has buffered in one call, so a burst of telemetry costs one
+    read instead of one per line. Text lines and binary frames are both
+    accepted (see car_protocol); partial input stays in the decoder's
+    buffer until the rest arrives. A read error ends the thread after
+    putting (None, ('ERROR', text)) on the bus.
+    """
+
+    def __init__(self, port, bus):
+        super().__init__(daemon=True)
+        self.port = port
+        self.bus = bus
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        decoder = FrameDecoder()
+        put = self.bus.put
+        while not self.stop_event.is_set():
+            try:
+                # Blocks for the first byte (up to the port timeout), then takes the backlog
+                data = self.port.read(max(1, self.port.in_waiting))
+            except Exception as e:
+                if not self.stop_event.is_set():
+                    put((None, ("ERROR", str(e))))
+                return
+            if data:
+                for item in decoder.feed(data):
+                    put(item)
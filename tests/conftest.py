@@ -0,0 +1,47 @@
+"""Shared fixtures: the modules live at the repository root, next to this folder."""
+from collections import deque
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maze_core import MOVES, Maze  # noqa: E402
+
+
+def random_maze(rows, cols, density=0.3, seed=0):
+    """A maze with each inner wall set with probability density"""
+    rng = np.random.default_rng(seed)
+    maze = Maze(rows, cols)
+    maze.hw[1:rows, :] = rng.random((rows - 1, cols)) < density
+    maze.vw[:, 1:cols] = rng.random((rows, cols - 1)) < density
+    return maze
+
+
+def bfs_distances(maze, source):
+    """Steps from source to every cell (None where unreachable), straight from the wall arrays"""
+    dist = {tuple(source): 0}
+    queue = deque([tuple(source)])
+    while queue:
+        r, c = queue.popleft()
+        for dr, dc in MOVES:
+            nxt = (r + dr, c + dc)
+            if nxt not in dist and maze.in_bounds(*nxt) and maze.can_move(r, c, dr, dc):
+                dist[nxt] = dist[(r, c)] + 1
+                queue.append(nxt)
+    return dist
+
+
+def is_walk(maze, path):
+    """Whether path steps between neighboring cells without crossing a wall"""
+    return all(abs(r1 - r0) + abs(c1 - c0) == 1 and maze.can_move(r0, c0, r1 - r0, c1 - c0)
+               for (r0, c0), (r1, c1) in zip(path, path[1:]))
+
+
+@pytest.fixture(params=range(8))
+def maze(request):
+    """Random mazes with loops and walled-off pockets, some of them tall or wide"""
+    rows, cols = [(12, 12), (20, 7), (5, 30), (1, 9)][request.param % 4]
+    return random_maze(rows, cols, density=0.25 + 0.05 * (request.param % 3), seed=request.param)
@@ -0,0 +1,161 @@
+import time
+
+from car_fleet import CarSession, FleetManager, FleetRun
+from car_protocol import FrameDecoder
+from car_sim import CarTiming, SimulatedCar
+from maze_core import Maze, solve
+from maze_multi import plan_fleet
+from maze_planner import HEADING_MOVES, drive_commands
+from serial_link import SIM_PORT, MessageBus, open_port
+
+
+def drain(manager, bus, done, timeout=10.0):
+    """Hand the bus to the sessions, as the GUI's Tk loop does, until done()"""
+    deadline = time.monotonic() + timeout
+    while not done() and time.monotonic() < deadline:
+        for name, line, message in bus.drain(0.01):
+            manager.sessions[name].handle(line, message)
+        for session in manager.sessions.values():
+            session.tick()
+        time.sleep(0.002)
+    return done()
+
+
+def test_two_simulated_cars_complete_their_routes():
+    maze = Maze(4, 4)
+    maze.hw[2, 1:3] = 1
+    bus = MessageBus()
+    manager = FleetManager(bus)
+    manager.start()
+    try:
+        sessions = []
+        for name, start, end in (("car1", (0, 0), (3, 0)), ("car2", (0, 3), (3, 3))):
+            port = open_port(SIM_PORT, timeout=0, timing=CarTiming.instant(), maze=maze.copy(), start=start,
+                             heading=2)
+            session = CarSession(name, port, start, 2)
+            manager.add(session)
+            path = solve(maze, start, end)
+            session.set_route(path, drive_commands(path, 2))
+            session.send_line("MODE:BIN")
+            sessions.append(session)
+        assert drain(manager, bus, lambda: all(s.acknowledged for s in sessions))
+        for session in sessions:
+            session.run_route()
+        assert drain(manager, bus, lambda: all(s.status == "Completed" for s in sessions))
+        for session, end in zip(sessions, ((3, 0), (3, 3))):
+            assert session.location == end and session.link_mode == "BIN"
+            assert session.step == len(session.commands) - 1
+            assert session.heading == session.end_heading and session.error is None
+    finally:
+        manager.stop()
+        manager.join(timeout=2)
+
+
+
+class ToCar:
+    """The session's port: its lines go straight to a SimulatedCar"""
+
+    def __init__(self):
+        self.car = None
+
+    def write(self, data):
+        self.car.feed(data)
+
+
+class FromCar:
+    """The car's port: what it writes is decoded for the session"""
+
+    def __init__(self):
+        self.decoder = FrameDecoder()
+        self.received = []
+
+    def write(self, data):
+        self.received += self.decoder.feed(data)
+
+
+def claims(car):
+    """The car's cell, and the one it is driving into (None when it is not)"""
+    if car.motion != 'F':
+        return (car.row, car.col), None
+    dr, dc = HEADING_MOVES[car.heading]
+    return (car.row, car.col), (car.row + dr, car.col + dc)
+
+
+def meet(a, b):
+    """Whether two cars share a cell or drive into the same one; following a car out of its cell is fine"""
+    (cell_a, next_a), (cell_b, next_b) = claims(a), claims(b)
+    return (cell_a == cell_b or (next_a is not None and (next_a == next_b or (next_a == cell_b and next_b is None)))
+            or (next_b is not None and next_b == cell_a and next_a is None))
+
+
+def crossing_cars():
+    # Two cars cross (1, 1); the plan has the second one wait a step for the first
+    maze = Maze(3, 3)
+    starts, goals, headings = [(0, 1), (1, 0)], [(2, 1), (1, 2)], [2, 1]
+    plan = plan_fleet(maze, starts, goals, headings)
+    # A wait is as long as a block forward, and the waiting car drives much faster
+    timings = [CarTiming(forward=1.0, turn=0.7, settle=0.5, sensor_interval=0),
+               CarTiming(forward=0.2, turn=0.2, settle=0.1, sensor_interval=0)]
+    cars, sessions = [], []
+    for k in range(2):
+        to_car, from_car = ToCar(), FromCar()
+        to_car.car = SimulatedCar(from_car, timings[k], maze=maze, start=starts[k], heading=headings[k])
+        session = CarSession(f"car{k + 1}", to_car, starts[k], headings[k])
+        session.set_route(*plan.routes[k])
+        cars.append((to_car.car, from_car))
+        sessions.append(session)
+    return plan, goals, cars, sessions
+
+
+def run_cars(cars, sessions, done, tick=lambda: None):
+    """Advance the cars' clocks and hand their messages over until done(); returns if they ever met"""
+    now, met = 0.0, False
+    while not done() and now < 60:
+        tick()
+        now += 0.05
+        for session, (car, from_car) in zip(sessions, cars):
+            car.advance(now)
+            received, from_car.received = from_car.received, []
+            for line, message in received:
+                session.handle(line, message)
+        met |= meet(cars[0][0], cars[1][0])
+    return met
+
+
+def test_open_loop_cars_leave_the_plan():
+    plan, goals, cars, sessions = crossing_cars()
+    for session in sessions:
+        session.run_route()
+    assert run_cars(cars, sessions, lambda: all(s.status == "Completed" for s in sessions))
+
+
+def test_fleet_run_keeps_cars_in_step():
+    plan, goals, cars, sessions = crossing_cars()
+    run = FleetRun(sessions)
+    assert run.steps == plan.makespan
+
+    def tick():
+        if run.tick():
+            # Every car stands where the plan puts it when a step starts
+            for session, (car, _) in zip(sessions, cars):
+                assert (car.row, car.col) == session.path[min(run.step - 1, len(session.path) - 1)]
+
+    assert not run_cars(cars, sessions, lambda: run.done, tick)
+    assert not run.stopped and run.step == plan.makespan
+    for session, goal in zip(sessions, goals):
+        assert session.location == goal and session.status == "Completed"
+        assert session.heading == session.end_heading
+        assert session.step == len(session.commands) - 1
+
+
+def test_fleet_run_ends_when_a_car_stops():
+    to_car, from_car = ToCar(), FromCar()
+    to_car.car = SimulatedCar(from_car, CarTiming.instant(), start=(0, 0), heading=2)
+    session = CarSession("car1", to_car, (0, 0), 2)
+    session.set_route([(0, 0), (1, 0), (2, 0)], "FF")
+    run = FleetRun([session, CarSession("car2", None, (0, 2), 2)])
+    assert run.tick() and session.running and not run.tick()
+    to_car.car.feed(b"STOP\n")
+    for line, message in from_car.received:
+        session.handle(line, message)
+    assert not run.tick() and run.done and run.stopped and run.step == 1
@@ -0,0 +1,113 @@
+import struct
+
+import pytest
+
+from car_protocol import (
+    FRAME_POS, FRAME_SENSORS, FRAME_STATUS, FRAME_STEP, FRAME_TEXT, SYNC, FrameDecoder, PathStreamer,
+    compress_commands, crc8, decode_frame, encode_frame, expand_commands, parse_message, parse_runs,
+)
+
+
+def test_crc8_check_value():
+    # CRC-8/SMBUS (poly 0x07, init 0) of "123456789"
+    assert crc8(b"123456789") == 0xF4
+    assert crc8(b"6789", crc8(b"12345")) == 0xF4
+
+
+def test_frame_layout():
+    frame = encode_frame(FRAME_POS, struct.pack("<hh", 2, -1))
+    assert frame[0] == SYNC and frame[1] == FRAME_POS and frame[2] == 4
+    assert frame[-1] == crc8(frame[1:-1])
+
+
+@pytest.mark.parametrize("kind, payload, lines", [
+    (FRAME_SENSORS, bytes((30, 200, 12, 7)), ["DATA:front:30", "DATA:right:200", "DATA:left:12", "DATA:back:7"]),
+    (FRAME_STEP, struct.pack("<H", 513), ["STEP:513"]),
+    (FRAME_POS, struct.pack("<hh", 12, 3), ["POS:12:3"]),
+    (FRAME_STATUS, bytes((9,)), ["STATUS:Completed"]),
+    (FRAME_STATUS, bytes((10, 44, 1)), ["STATUS:Path received (300 commands)"]),
+    (FRAME_TEXT, b"Maze car initialized", ["Maze car initialized"]),
+])
+def test_frames_decode_as_their_text_lines(kind, payload, lines):
+    decoded = FrameDecoder().feed(encode_frame(kind, payload))
+    assert decoded == [(line, parse_message(line)) for line in lines]
+    assert decode_frame(kind, payload) == decoded
+
+
+def test_decoder_mixes_text_and_frames_split_anywhere():
+    stream = (b"STATUS:Executing\n" + encode_frame(FRAME_STEP, struct.pack("<H", 1))
+              + b"DATA:front:40\r\n" + encode_frame(FRAME_POS, struct.pack("<hh", 0, 1)))
+    expected = FrameDecoder().feed(stream)
+    assert [line for line, _ in expected] == ["STATUS:Executing", "STEP:1", "DATA:front:40", "POS:0:1"]
+    for size in (1, 2, 3, 5, 7):
+        decoder = FrameDecoder()
+        out = []
+        for i in range(0, len(stream), size):
+            out += decoder.feed(stream[i:i + size])
+        assert out == expected and decoder.errors == 0
+
+
+def test_decoder_skips_damaged_frames():
+    good = encode_frame(FRAME_STEP, struct.pack("<H", 9))
+    bad = bytearray(encode_frame(FRAME_POS, struct.pack("<hh", 4, 4)))
+    bad[4] ^= 0xFF
+    decoder = FrameDecoder()
+    out = decoder.feed(bytes(bad) + good + b"MODE:BIN\n")
+    assert [line for line, _ in out] == ["STEP:9", "MODE:BIN"]
+    assert decoder.errors >= 1
+
+
+@pytest.mark.parametrize("line, message", [
+    ("DATA:Front:123", ("DATA", ("front", "123"))),
+    ("STEP:4", ("STEP", 4)),
+    ("POS:2:3", ("POS", (2, 3))),
+    ("MODE:TEXT", ("MODE", "TEXT")),
+    ("STEP:x", ("TEXT", "STEP:x")),
+    ("Ready", ("TEXT", "Ready")),
+    ("ACK:3:97", ("ACK", (3, 97))),
+    ("NAK:3:97", ("NAK", (3, 97))),
+    ("FREE:98", ("FREE", 98)),
+])
+def test_parse_message(line, message):
+    assert parse_message(line) == message
+
+
+@pytest.mark.parametrize("commands, runs", [
+    ("", ""),
+    ("F", "F"),
+    ("FFFFRFF", "F4RF2"),
+    ("LLBBF", "L2B2F"),
+    ("F" * 600, "F255F255F90"),
+])
+def test_run_length_round_trip(commands, runs):
+    assert compress_commands(commands) == runs
+    assert expand_commands(runs) == commands
+
+
+def test_parse_runs():
+    assert parse_runs("F4RF12") == [("F", 4), ("R", 1), ("F", 12)]
+    assert parse_runs(compress_commands("F" * 300)) == [("F", 255), ("F", 45)]
+
+
+def test_path_streamer_sends_whole_path_within_free_slots():
+    commands = "FFRFFFFLB" * 40 + "F" * 700
+    sent = []
+    streamer = PathStreamer(commands, sent.append, window=2, chunk_bytes=16)
+    streamer.start()
+    assert sent == [f"STREAM:{len(commands)}"]
+    slots = free = 12
+    streamer.handle("ACK", (0, free))
+    received = []
+    while not streamer.done:
+        if len(sent) == len(received) + 1:
+            # Nothing more fits: the car drives what it holds and reports the room
+            free = slots
+            streamer.handle("FREE", free)
+            continue
+        _, seq, runs = sent[len(received) + 1].split(":")
+        stored = sum(ch.isalpha() for ch in runs)
+        assert len(runs) <= 16 and stored <= free
+        received.append(runs)
+        free -= stored
+        streamer.handle("ACK", (int(seq), free))
+    assert expand_commands("".join(received)) == commands
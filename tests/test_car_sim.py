@@ -0,0 +1,94 @@
+from car_protocol import FrameDecoder
+from car_sim import CarTiming, SimulatedCar
+from maze_core import Maze
+
+
+class Wire:
+    """The PC end of the car's port: collects what the car writes"""
+
+    def __init__(self):
+        self.decoder = FrameDecoder()
+        self.lines = []
+
+    def write(self, data):
+        self.lines += [line for line, _ in self.decoder.feed(data)]
+
+    def take(self, *kinds):
+        lines, self.lines = self.lines, []
+        return [line for line in lines if line.split(":")[0] in kinds]
+
+
+def car(**options):
+    wire = Wire()
+    timing = CarTiming(forward=1.0, backward=1.0, turn=0.5, settle=0.25, sensor_interval=0)
+    return SimulatedCar(wire, timing, **options), wire
+
+
+def test_path_runs_on_the_virtual_clock():
+    sim, wire = car(start=(2, 2), heading=2)
+    sim.feed(b"POSE:2:2:2\nPATH:FLF\nEXEC\n")
+    sim.advance(0.0)
+    assert wire.take("STATUS", "STEP") == [
+        "STATUS:Path received (3 commands)", "STATUS:Executing path", "STEP:0", "STATUS:Moving Forward"]
+    sim.advance(0.99)
+    assert wire.take("POS") == []
+    # Forward 1 s, settle, turn 0.5 s, settle, forward 1 s
+    for now, lines in [(1.0, ["POS:3:2"]), (1.25, ["STEP:1", "STATUS:Turning Left"]),
+                       (1.75, ["POS:3:2"]), (2.0, ["STEP:2", "STATUS:Moving Forward"]),
+                       (3.0, ["POS:3:3"]), (3.25, ["STATUS:Completed", "POS:3:3"])]:
+        sim.advance(now - 1e-6)
+        assert wire.take("POS", "STEP", "STATUS") == []
+        sim.advance(now)
+        assert wire.take("POS", "STEP", "STATUS") == lines
+
+
+def test_forward_runs_drive_straight_on():
+    sim, wire = car(start=(0, 0), heading=1)
+    sim.feed(b"POSE:0:0:1\nRPATH:F3\nEXEC\n")
+    sim.advance(3.0)
+    assert wire.take("POS") == ["POS:0:0", "POS:0:1", "POS:0:2", "POS:0:3"]
+    sim.advance(3.25)
+    assert wire.take("STATUS") == ["STATUS:Completed"]
+
+
+def test_position_is_dead_reckoned_from_the_pose():
+    sim, wire = car(start=(2, 2), heading=2)
+    # Without a POSE the car believes it starts at (0, 0) facing North
+    sim.feed(b"PATH:F\nEXEC\n")
+    sim.advance(2.0)
+    assert wire.take("POS") == ["POS:-1:0", "POS:-1:0"]
+    assert (sim.row, sim.col) == (3, 2)
+    sim.feed(b"POSE:3:2:2\nPOSE:9\nPATH:FF\nEXEC\n")
+    sim.advance(2.5)
+    # A malformed pose, or one while the path runs, is answered with the current one
+    sim.feed(b"POSE:0:0:0\n")
+    sim.advance(5.0)
+    assert wire.take("POS") == ["POS:3:2", "POS:3:2", "POS:3:2", "POS:4:2", "POS:5:2", "POS:5:2"]
+
+
+def test_stop_ends_the_motion():
+    sim, wire = car(start=(1, 1))
+    sim.feed(b"PATH:FFFF\nEXEC\n")
+    sim.advance(0.5)
+    sim.feed(b"STOP\n")
+    sim.advance(10.0)
+    assert wire.take("POS", "STATUS")[-1] == "STATUS:Stopped"
+
+
+def test_sensors_read_the_maze_walls():
+    maze = Maze(1, 5)
+    maze.vw[0, 4] = 1
+    sim, _ = car(maze=maze, start=(0, 1), heading=1)
+    # front, right, left, back; a wall in the same block is SIDE_GAP_CM away
+    assert sim.sensor_distances() == (55, 5, 5, 30)
+    sim.heading = 3
+    assert sim.sensor_distances() == (30, 5, 5, 55)
+
+
+def test_binary_mode_sends_the_same_messages():
+    sim, wire = car(start=(0, 0), heading=2)
+    sim.feed(b"POSE:0:0:2\nMODE:BIN\nPATH:F\nEXEC\n")
+    sim.advance(2.0)
+    assert wire.take("MODE", "POS", "STATUS") == [
+        "POS:0:0", "MODE:BIN", "STATUS:Path received (1 commands)", "STATUS:Executing path",
+        "STATUS:Moving Forward", "POS:1:0", "STATUS:Completed", "POS:1:0"]
@@ -0,0 +1,79 @@
+import struct
+
+import pytest
+
+from car_protocol import FRAME_POS, encode_frame
+from car_telemetry import (
+    FROM_CAR, HEADER, RECORD, TO_CAR, RecordingPort, TelemetryRecorder, read_recording, replay,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Port:
+    """Returns the queued chunks from read(), keeps what is written"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.written = b""
+        self.in_waiting = 7
+
+    def read(self, size=1):
+        return self.chunks.pop(0) if self.chunks else b""
+
+    def write(self, data):
+        self.written += data
+        return len(data)
+
+
+def record(path, clock):
+    recorder = TelemetryRecorder(path, clock)
+    port = RecordingPort(Port([b"STATUS:Exec", b"uting path\nPOS:0:1\n", b"",
+                               encode_frame(FRAME_POS, struct.pack("<hh", 0, 2))]), recorder)
+    port.write(b"EXEC\n")
+    for step in range(4):
+        clock.now += 0.25
+        port.read(port.in_waiting)
+    recorder.close()
+    return recorder, port
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run.ptel")
+    recorder, port = record(path, Clock())
+    assert port.written == b"EXEC\n" and port.in_waiting == 7
+    # Empty reads are not recorded
+    assert recorder.records == 4
+    started, records = read_recording(path)
+    assert started > 0
+    assert [(round(t, 6), direction) for t, direction, _ in records] == [
+        (0.0, TO_CAR), (0.25, FROM_CAR), (0.5, FROM_CAR), (1.0, FROM_CAR)]
+    assert records[1][2] == b"STATUS:Exec"
+    messages = []
+    count, _ = replay(path, lambda line, message: messages.append(message))
+    assert count == 3
+    assert messages == [("STATUS", "Executing path"), ("POS", (0, 1)), ("POS", (0, 2))]
+
+
+def test_truncated_tail_is_dropped(tmp_path):
+    path = tmp_path / "run.ptel"
+    record(str(path), Clock())
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    assert len(read_recording(str(path))[1]) == 3
+    # Cut inside a record header too
+    path.write_bytes(data[:HEADER.size + RECORD.size + len(b"EXEC\n") + 2])
+    assert [d for _, _, d in read_recording(str(path))[1]] == [b"EXEC\n"]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "maze.pmaze"
+    path.write_bytes(b"PMAZ" + bytes(40))
+    with pytest.raises(ValueError):
+        read_recording(str(path))
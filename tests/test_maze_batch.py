@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from conftest import random_maze
+from maze_batch import output_names, run
+from maze_gen import generate
+from maze_io import save_maze
+
+
+def test_output_names():
+    a, b = os.path.join("in", "a", "m.pmaze"), os.path.join("in", "b", "m.json")
+    assert output_names([a, os.path.join("in", "x.pmaze")]) == ["m", "x"]
+    assert output_names([a, b]) == ["a__m.pmaze", "b__m.json"]
+    with pytest.raises(ValueError):
+        output_names([a, a])
+
+
+def test_run_exports_every_maze(tmp_path):
+    files = []
+    for folder in ("a", "b"):
+        os.makedirs(tmp_path / folder)
+        files.append(str(tmp_path / folder / "m.pmaze"))
+        save_maze(files[-1], generate(8, 8, seed=len(files)))
+    files.append(str(tmp_path / "blocked.json"))
+    maze = random_maze(4, 4)
+    maze.hw[2, :] = 1
+    save_maze(files[-1], maze)
+    out = tmp_path / "out"
+    results = run(files, str(out), jobs=1, quiet=True)
+    assert [r["solved"] for r in results] == [True, True, False]
+    assert sorted(os.listdir(out)) == ["a__m.pmaze.path.txt", "b__m.pmaze.path.txt"]
+    assert (out / "a__m.pmaze.path.txt").read_text() != (out / "b__m.pmaze.path.txt").read_text()
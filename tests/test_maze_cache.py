@@ -0,0 +1,49 @@
+import os
+
+from conftest import random_maze
+from maze_cache import SolutionCache, solution_key
+
+
+def test_key_depends_on_walls_endpoints_and_settings():
+    maze = random_maze(6, 6, seed=1)
+    key = solution_key(maze, (0, 0), (5, 5), ('search', 'bfs'))
+    assert key == solution_key(maze.copy(), [0, 0], [5, 5], ('search', 'bfs'))
+    assert key != solution_key(maze, (0, 0), (5, 4), ('search', 'bfs'))
+    assert key != solution_key(maze, (0, 0), (5, 5), ('search', 'astar'))
+    maze.toggle_wall('h', 3, 3)
+    assert key != solution_key(maze, (0, 0), (5, 5), ('search', 'bfs'))
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = SolutionCache(max_bytes=1500)
+    path = [(0, c) for c in range(5)]
+    for key in "abc":
+        cache.put(key, path, "FFFF")
+    cache.get("a")
+    cache.put("d", path, "FFFF")
+    assert "b" not in cache and "a" in cache
+    assert cache.size <= 1500
+    assert cache.get("b") is None and cache.misses == 1
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = [(r, 0) for r in range(9)]
+    SolutionCache(directory=str(tmp_path)).put("k", path, "RRF8")
+    cache = SolutionCache(directory=str(tmp_path))
+    assert cache.get("k") == (path, "RRF8")
+    assert cache.hits == 1
+
+
+def test_disk_size_follows_rewrites_and_trimming(tmp_path):
+    directory = str(tmp_path)
+    cache = SolutionCache(directory=directory, max_disk_bytes=400)
+
+    def on_disk():
+        return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+    for n in range(20):
+        cache.put(f"key{n % 3}", [(0, c) for c in range(n + 1)], "F" * n)
+        assert cache.disk_size == on_disk()
+    for n in range(20):
+        cache.put(f"other{n}", [(0, 0), (0, 1)], "F")
+        assert cache.disk_size == on_disk() <= 400
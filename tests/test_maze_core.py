@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from conftest import bfs_distances, is_walk, random_maze
+from maze_core import STRATEGIES, Maze, adjacency, search, solve
+
+
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_search_finds_shortest_paths(maze, strategy):
+    start = (0, 0)
+    dist = bfs_distances(maze, start)
+    for end in [(maze.R - 1, maze.C - 1), (maze.R // 2, maze.C // 2), (0, maze.C - 1), start]:
+        path, expanded = search(maze, start, end, strategy)
+        if end not in dist:
+            assert path is None
+            continue
+        assert path[0] == start and path[-1] == end
+        assert len(path) - 1 == dist[end]
+        assert is_walk(maze, path)
+
+
+def test_solve_without_path():
+    maze = Maze(3, 3)
+    maze.hw[1, :] = 1
+    for strategy in STRATEGIES:
+        assert solve(maze, (0, 0), (2, 2), strategy) is None
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        search(Maze(2, 2), (0, 0), (1, 1), 'dfs')
+
+
+def test_toggle_wall_returns_bordering_cells():
+    maze = Maze(3, 4)
+    assert maze.toggle_wall('h', 1, 2) == [(0, 2), (1, 2)]
+    assert not maze.can_move(0, 2, 1, 0) and not maze.can_move(1, 2, -1, 0)
+    assert maze.toggle_wall('v', 2, 0) == [(2, 0)]  # border wall, now open
+    maze.toggle_wall('h', 1, 2)
+    assert maze.can_move(0, 2, 1, 0)
+
+
+def test_adjacency_never_leaves_the_grid():
+    maze = Maze(2, 2, np.zeros((3, 2)), np.zeros((2, 3)))
+    adj = adjacency(maze).reshape(2, 2)
+    assert adj.tolist() == [[1 | 4, 1 | 8], [2 | 4, 2 | 8]]
+
+
+def test_packed_round_trip():
+    maze = random_maze(13, 7, seed=3)
+    copy = Maze.from_packed(maze.R, maze.C, *maze.packed())
+    assert np.array_equal(copy.hw, maze.hw) and np.array_equal(copy.vw, maze.vw)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from conftest import bfs_distances
+from maze_gen import GENERATORS, generate
+
+
+def open_sides(maze):
+    return int((maze.hw[1:-1] == 0).sum() + (maze.vw[:, 1:-1] == 0).sum())
+
+
+@pytest.mark.parametrize("algorithm", [a for a in GENERATORS if a != 'braided'])
+def test_perfect_mazes_are_spanning_trees(algorithm):
+    maze = generate(17, 23, algorithm, seed=5)
+    assert len(bfs_distances(maze, (0, 0))) == 17 * 23
+    assert open_sides(maze) == 17 * 23 - 1
+    assert maze.hw[0].all() and maze.hw[-1].all() and maze.vw[:, 0].all() and maze.vw[:, -1].all()
+
+
+def test_braided_mazes_have_no_dead_ends():
+    maze = generate(15, 15, 'braided', seed=2)
+    assert len(bfs_distances(maze, (0, 0))) == 15 * 15
+    assert open_sides(maze) > 15 * 15 - 1
+    for r in range(15):
+        for c in range(15):
+            exits = sum(maze.in_bounds(r + dr, c + dc) and maze.can_move(r, c, dr, dc)
+                        for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)))
+            assert exits >= 2
+
+
+@pytest.mark.parametrize("algorithm", GENERATORS)
+def test_seed_reproduces_maze(algorithm):
+    a, b = generate(9, 11, algorithm, seed=42), generate(9, 11, algorithm, seed=42)
+    assert np.array_equal(a.hw, b.hw) and np.array_equal(a.vw, b.vw)
+
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        generate(0, 5)
+    with pytest.raises(ValueError):
+        generate(5, 5, 'maze-o-matic')
@@ -0,0 +1,56 @@
+import random
+
+from conftest import bfs_distances, is_walk, random_maze
+from maze_incremental import IncrementalSolver
+
+
+def check(solver, maze):
+    dist = bfs_distances(maze, solver.start)
+    path = solver.path()
+    if solver.end not in dist:
+        assert path is None
+        return
+    assert path[0] == solver.start and path[-1] == solver.end
+    assert len(path) - 1 == dist[solver.end] and is_walk(maze, path)
+
+
+def test_repairs_match_bfs_as_walls_toggle():
+    for seed in range(6):
+        rng = random.Random(seed)
+        maze = random_maze(15, 15, density=0.3, seed=seed)
+        solver = IncrementalSolver(maze, (0, 0), (14, 14))
+        check(solver, maze)
+        for _ in range(60):
+            if rng.random() < 0.5:
+                cells = maze.toggle_wall('h', rng.randrange(1, maze.R), rng.randrange(maze.C))
+            else:
+                cells = maze.toggle_wall('v', rng.randrange(maze.R), rng.randrange(1, maze.C))
+            solver.wall_changed(cells)
+            check(solver, maze)
+
+
+def test_moving_end_matches_bfs():
+    rng = random.Random(7)
+    maze = random_maze(12, 18, density=0.25, seed=7)
+    solver = IncrementalSolver(maze, (6, 9), (0, 0))
+    for _ in range(40):
+        r, c = solver.end
+        dr, dc = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        if maze.in_bounds(r + dr, c + dc):
+            solver.move_end((r + dr, c + dc))
+        if rng.random() < 0.3:
+            solver.wall_changed(maze.toggle_wall('v', rng.randrange(maze.R), rng.randrange(1, maze.C)))
+        check(solver, maze)
+
+
+def test_repair_expands_less_than_a_fresh_search():
+    maze = random_maze(40, 40, density=0.2, seed=1)
+    solver = IncrementalSolver(maze, (0, 0), (39, 39))
+    solver.path()
+    fresh = solver.expanded
+    r, c = solver.path()[len(solver.path()) // 2]
+    cells = maze.toggle_wall('v', r, c + 1) if c + 1 < maze.C else maze.toggle_wall('v', r, c)
+    solver.wall_changed(cells)
+    before = solver.expanded
+    check(solver, maze)
+    assert solver.expanded - before < fresh
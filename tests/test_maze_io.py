@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from conftest import random_maze
+from maze_io import is_binary, load_binary, load_maze, read_header, save_binary, save_maze
+
+
+@pytest.mark.parametrize("name", ["maze.pmaze", "maze.json"])
+@pytest.mark.parametrize("shape", [(1, 1), (7, 13), (64, 3)])
+def test_round_trip(tmp_path, name, shape):
+    maze = random_maze(*shape, density=0.5, seed=sum(shape))
+    maze.vw[0, 0] = 0  # an opened border wall is kept too
+    path = tmp_path / name
+    save_maze(str(path), maze, (0, 0), (shape[0] - 1, shape[1] - 1))
+    assert is_binary(str(path)) == name.endswith(".pmaze")
+    loaded, start, end = load_maze(str(path))
+    assert (loaded.R, loaded.C) == shape
+    assert np.array_equal(loaded.hw, maze.hw) and np.array_equal(loaded.vw, maze.vw)
+    assert start == (0, 0) and end == (shape[0] - 1, shape[1] - 1)
+
+
+def test_binary_without_endpoints(tmp_path):
+    path = str(tmp_path / "open.pmaze")
+    save_binary(path, random_maze(5, 4))
+    assert read_header(path) == (5, 4, None, None)
+    assert load_binary(path)[1:] == (None, None)
+
+
+def test_binary_rejects_bad_files(tmp_path):
+    path = tmp_path / "bad.pmaze"
+    path.write_bytes(b"not a maze at all, just some bytes")
+    with pytest.raises(ValueError):
+        load_binary(str(path))
+    save_binary(str(path), random_maze(30, 30))
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(ValueError, match="truncated"):
+        load_binary(str(path))
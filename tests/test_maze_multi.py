@@ -0,0 +1,101 @@
+import pytest
+
+from conftest import bfs_distances, random_maze
+from maze_core import Maze
+from maze_gen import generate
+from maze_multi import assign_goals, nearest_free, plan_fleet
+from maze_planner import HEADING_MOVES
+
+
+def drive(maze, start, heading, commands):
+    """Cells a car occupies at each step while following commands"""
+    cells = [start]
+    (r, c), h = start, heading
+    for cmd in commands:
+        if cmd == 'F':
+            dr, dc = HEADING_MOVES[h]
+            assert maze.in_bounds(r + dr, c + dc) and maze.can_move(r, c, dr, dc)
+            r, c = r + dr, c + dc
+        elif cmd in 'LR':
+            h = (h + (1 if cmd == 'R' else 3)) % 4
+        else:
+            assert cmd == 'W'
+        cells.append((r, c))
+    return cells
+
+
+def check_plan(maze, starts, goals, plan, headings=None):
+    headings = headings or [0] * len(starts)
+    timelines = []
+    for k, route in enumerate(plan.routes):
+        if route is None:
+            assert k in plan.failed
+            timelines.append([starts[k]])
+            continue
+        path, commands = route
+        assert drive(maze, starts[k], headings[k], commands) == list(path)
+        assert (path[-1] == goals[k]) == (k not in plan.short)
+        timelines.append(path)
+    at = lambda k, t: timelines[k][min(t, len(timelines[k]) - 1)]
+    for t in range(plan.makespan + 1):
+        cells = [at(k, t) for k in range(len(starts))]
+        assert len(set(cells)) == len(cells), f"two cars in one cell at step {t}"
+        if t:
+            moves = {(at(k, t - 1), at(k, t)) for k in range(len(starts))}
+            assert not any((b, a) in moves for a, b in moves if a != b), f"two cars swap at step {t}"
+            before = {at(k, t - 1) for k in range(len(starts))}
+            assert not any(b in before for a, b in moves if a != b), f"a car follows another at step {t}"
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_fleet_in_perfect_maze_is_collision_free(seed):
+    maze = generate(12, 12, 'backtracker', seed=seed)
+    starts = [(0, c) for c in range(4)]
+    goals = assign_goals(maze, (11, 11), starts)
+    plan = plan_fleet(maze, starts, goals)
+    check_plan(maze, starts, goals, plan)
+    assert not plan.failed
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_fleet_with_crossing_goals_is_collision_free(seed):
+    maze = random_maze(10, 10, density=0.2, seed=seed)
+    reach = bfs_distances(maze, (5, 5))
+    cells = sorted(reach)
+    starts, goals = cells[:5], cells[-5:][::-1]
+    headings = [seed % 4, 1, 2, 3, 0][:len(starts)]
+    plan = plan_fleet(maze, starts, goals, headings)
+    check_plan(maze, starts, goals, plan, headings)
+
+
+def test_cars_swap_places():
+    # Each car's goal is the other's start, so whichever is planned first
+    # finds its goal blocked until the other has a route
+    maze = Maze(3, 5)
+    starts, goals = [(1, 0), (1, 4)], [(1, 4), (1, 0)]
+    plan = plan_fleet(maze, starts, goals, [1, 3])
+    check_plan(maze, starts, goals, plan, [1, 3])
+    assert not plan.short and not plan.failed
+
+
+def test_rejects_shared_cells():
+    maze = Maze(3, 3)
+    with pytest.raises(ValueError):
+        plan_fleet(maze, [(0, 0), (0, 1)], [(2, 2), (2, 2)])
+    with pytest.raises(ValueError):
+        plan_fleet(maze, [(0, 0), (0, 0)], [(2, 2), (2, 1)])
+
+
+def test_assign_goals_needs_enough_reachable_cells():
+    maze = Maze(3, 3)
+    maze.hw[2, 2] = maze.vw[2, 2] = 1  # (2, 2) walled in
+    with pytest.raises(ValueError):
+        assign_goals(maze, (2, 2), [(0, 0), (0, 1)])
+    goals = assign_goals(maze, (1, 1), [(0, 0), (0, 1)])
+    assert (1, 1) in goals and len(set(goals)) == 2
+
+
+def test_nearest_free():
+    maze = Maze(1, 4)
+    assert nearest_free(maze, (0, 1), [(0, 1), (0, 2)]) == (0, 0)
+    assert nearest_free(maze, (0, 0), [(0, c) for c in range(4)]) is None
@@ -0,0 +1,82 @@
+import pytest
+
+from conftest import bfs_distances, is_walk
+from maze_core import Maze
+from maze_planner import HEADING_MOVES, TURN_COMMANDS, DriveCosts, GoalField, drive_commands, path_commands, plan_drive
+
+
+def drive(path, heading, costs):
+    """Commands and drive time of a path, turning with TURN_COMMANDS before each block"""
+    commands, total = [], 0.0
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        target = HEADING_MOVES.index((r1 - r0, c1 - c0))
+        k = (target - heading) % 4
+        commands.append(TURN_COMMANDS[k] + 'F')
+        total += costs.turn(k) + costs.forward
+        heading = target
+    return ''.join(commands), total
+
+
+def test_commands_for_a_path():
+    path = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+    # Facing North: south is behind, so the GUI table backs up, the drive planner turns
+    assert path_commands(path, 0) == "BBFLFLFLF"
+    assert drive_commands(path, 0) == "RRFLFLFLF"
+    assert drive_commands(path, 2) == "FLFLFLF"
+
+
+@pytest.mark.parametrize("heading", range(4))
+def test_plan_drive_is_cheapest(maze, heading):
+    costs = DriveCosts()
+    start, end = (0, 0), (maze.R - 1, maze.C - 1)
+    dist = bfs_distances(maze, start)
+    plan = plan_drive(maze, start, end, heading, costs)
+    if end not in dist:
+        assert plan is None
+        return
+    path, commands, cost = plan
+    assert path[0] == start and path[-1] == end and is_walk(maze, path)
+    assert len(path) - 1 >= dist[end]
+    expected_commands, expected_cost = drive(path, heading, costs)
+    assert commands == expected_commands and cost == pytest.approx(expected_cost)
+    # The reverse field computes the same optimum from the other end
+    assert cost == pytest.approx(GoalField(maze, end, costs).drive_time(start, heading))
+
+
+def test_plan_drive_avoids_turns():
+    # Every route of four steps is shortest; only the L shape turns just once
+    path, commands, cost = plan_drive(Maze(3, 3), (0, 0), (2, 2), 1)
+    assert commands == "FFRFF"
+    assert cost == pytest.approx(4 * DriveCosts().forward + DriveCosts().turn90)
+
+
+def test_bfs_goal_field_routes_are_shortest(maze):
+    goal = (maze.R // 2, maze.C // 2)
+    field = GoalField(maze, goal)
+    dist = bfs_distances(maze, goal)
+    for r in range(maze.R):
+        for c in range(maze.C):
+            assert field.reachable((r, c)) == ((r, c) in dist)
+            route = field.route((r, c), 1)
+            if route is None:
+                continue
+            path, commands = route
+            assert path[0] == (r, c) and path[-1] == goal and is_walk(maze, path)
+            assert len(path) - 1 == dist[(r, c)]
+            assert commands == path_commands(path, 1)
+
+
+def test_drive_goal_field_matches_plan_drive(maze):
+    costs = DriveCosts()
+    goal = (maze.R - 1, 0)
+    field = GoalField(maze, goal, costs)
+    for cell in [(0, 0), (0, maze.C - 1), (maze.R // 2, maze.C // 2)]:
+        route = field.route(cell, 3)
+        plan = plan_drive(maze, cell, goal, 3, costs)
+        assert (route is None) == (plan is None)
+        if route:
+            path, commands = route
+            expected_commands, expected_cost = drive(path, 3, costs)
+            assert is_walk(maze, path) and commands == expected_commands
+            assert expected_cost == pytest.approx(plan[2])
+            assert field.drive_time(cell, 3) == pytest.approx(plan[2])
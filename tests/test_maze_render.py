@@ -0,0 +1,53 @@
+import numpy as np
+from PIL import Image
+
+from conftest import random_maze
+from maze_render import (
+    CELL_END, CELL_PATH, CELL_START, MARK_COLORS, MazeRenderer, export_image, mark_cells, tile_path,
+)
+
+WHITE, BLACK = (255, 255, 255), (0, 0, 0)
+
+
+def test_walls_and_cells_land_where_expected():
+    maze = random_maze(6, 9, seed=4)
+    renderer = MazeRenderer(maze, cell_px=10, wall_px=2, grid=False)
+    image = renderer.render()
+    assert renderer.size == (9 * 10 + 2, 6 * 10 + 2)
+    for r in range(maze.R):
+        for c in range(1, maze.C):
+            # Middle of the border left of (r, c), and the middle of the cell itself
+            y, x = 1 + r * 10 + 5, 1 + c * 10
+            assert tuple(image[y, x]) == (BLACK if maze.vw[r, c] else WHITE)
+            assert tuple(image[y, x + 5]) == WHITE
+    for r in range(1, maze.R):
+        for c in range(maze.C):
+            assert tuple(image[1 + r * 10, 1 + c * 10 + 5]) == (BLACK if maze.hw[r, c] else WHITE)
+
+
+def test_windows_and_tiles_match_the_full_image():
+    maze = random_maze(13, 17, seed=2)
+    cells = mark_cells(maze, [(0, 0), (0, 1), (1, 1)], (0, 0), (12, 16))
+    renderer = MazeRenderer(maze, cells, cell_px=7)
+    full = np.asarray(renderer.full())
+    assert np.array_equal(renderer.render(10, 50, 33, 90), full[10:50, 33:90])
+    stitched = np.zeros_like(full)
+    for i, j, tile in renderer.tiles(32):
+        stitched[i * 32:(i + 1) * 32, j * 32:(j + 1) * 32] = np.asarray(tile)
+    assert np.array_equal(stitched, full)
+
+
+def test_mark_cells():
+    maze = random_maze(3, 3)
+    cells = mark_cells(maze, [(0, 0), (0, 1), (1, 1)], (0, 0), (1, 1))
+    assert cells.tolist() == [[CELL_START, CELL_PATH, 0], [0, CELL_END, 0], [0, 0, 0]]
+    assert len(MARK_COLORS) > CELL_START
+
+
+def test_export_writes_tiles_when_asked(tmp_path):
+    maze = random_maze(10, 10, seed=1)
+    path = str(tmp_path / "maze.png")
+    assert export_image(path, maze, cell_px=8) == [path]
+    width, height = Image.open(path).size
+    files = export_image(path, maze, cell_px=8, tile=50)
+    assert files[0] == tile_path(path, 0, 0) and len(files) == -(-width // 50) * -(-height // 50)
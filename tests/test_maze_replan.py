@@ -0,0 +1,121 @@
+from car_protocol import FrameDecoder
+from car_sim import CarTiming, SimulatedCar
+from conftest import bfs_distances, is_walk
+from maze_core import Maze, solve
+from maze_gen import generate
+from maze_planner import drive_commands
+from maze_replan import OPEN_CM, WALL_CM, Replanner, expected_poses
+
+
+def follow_straight():
+    # Open 4x4 maze, driving down column 0 from (0, 0) facing South
+    maze = Maze(4, 4)
+    path = [(0, 0), (1, 0), (2, 0), (3, 0), (3, 1), (3, 2), (3, 3)]
+    replanner = Replanner(maze, (3, 3), path, 2, "FFFLFFF")
+    replanner.start()
+    return maze, replanner
+
+
+def test_expected_poses():
+    assert expected_poses((0, 0), 2, "FFLRF") == [
+        (0, 0, 2), (1, 0, 2), (2, 0, 2), (2, 0, 1), (2, 0, 2), (3, 0, 2)]
+
+
+def test_positions_on_the_path_are_followed():
+    _, replanner = follow_straight()
+    for step, cell in enumerate([(1, 0), (2, 0), (3, 0)]):
+        replanner.on_step(step)
+        assert not replanner.on_position(cell)
+    assert replanner.index == 3 and replanner.heading == 2
+
+
+def test_position_off_the_path_is_a_divergence():
+    _, replanner = follow_straight()
+    replanner.on_step(0)
+    assert not replanner.on_position((1, 0))
+    replanner.on_step(1)
+    assert replanner.on_position((1, 1))
+    assert replanner.reason == "car at (1, 1), expected (2, 0)"
+
+
+def test_telemetry_before_start_is_ignored():
+    maze = Maze(3, 3)
+    replanner = Replanner(maze, (2, 2), [(0, 0), (1, 0)], 2, "F")
+    assert not replanner.on_position((2, 2))
+    assert replanner.on_sensor('front', 5) == ([], False)
+
+
+def test_sensor_learns_a_wall_across_the_path_and_replans():
+    maze, replanner = follow_straight()
+    replanner.on_step(0)
+    replanner.on_position((1, 0))
+    # Nothing is learned while the car moves, or from readings in the dead band
+    replanner.on_step(1)
+    assert replanner.on_sensor('front', 5) == ([], False)
+    replanner.on_position((1, 0))
+    assert replanner.on_sensor('front', (WALL_CM + OPEN_CM) // 2) == ([], False)
+    cells, blocked = replanner.on_sensor('front', 5)
+    assert cells == [(1, 0), (2, 0)] and blocked
+    assert not maze.can_move(1, 0, 1, 0) and replanner.walls_learned == 1
+    path, commands = replanner.replan()
+    assert path[0] == (1, 0) and path[-1] == (3, 3) and is_walk(maze, path)
+    assert len(path) - 1 == bfs_distances(maze, (1, 0))[(3, 3)]
+    assert replanner.path == path and replanner.commands == commands
+
+
+def test_sensor_opens_a_wall_that_is_not_there():
+    maze, replanner = follow_straight()
+    maze.vw[0, 1] = 1
+    # Facing South at (0, 0), the left sensor looks East
+    cells, blocked = replanner.on_sensor('left', OPEN_CM + 20)
+    assert cells == [(0, 0), (0, 1)] and not blocked
+    assert maze.can_move(0, 0, 0, 1)
+    assert solve(maze, (0, 0), (0, 1)) == [(0, 0), (0, 1)]
+
+
+class Link:
+    """The PC end of a simulated car's port: decodes what the car writes"""
+
+    def __init__(self):
+        self.decoder = FrameDecoder()
+        self.messages = []
+
+    def write(self, data):
+        self.messages += [message for _, message in self.decoder.feed(data)]
+
+
+def drive_simulated_car(pose):
+    """Run a planned route on a SimulatedCar away from (0, 0); returns (replanner, divergences, last POS)"""
+    maze = generate(6, 6, seed=4)
+    start, end, heading = (3, 2), (5, 5), 1
+    path = solve(maze, start, end)
+    commands = drive_commands(path, heading)
+    replanner = Replanner(maze.copy(), end, path, heading, commands)
+    link = Link()
+    sim = SimulatedCar(link, CarTiming.instant(), maze=maze, start=start, heading=heading)
+    row, col = start
+    sim.feed((f"POSE:{row}:{col}:{heading}\n" if pose else "").encode() + f"PATH:{commands}\nEXEC\n".encode())
+    sim.advance(0.0)
+    divergences, cell = 0, None
+    for kind, value in link.messages:
+        if kind == "STATUS" and value.startswith("Executing"):
+            replanner.start()
+        elif kind == "STEP":
+            replanner.on_step(value)
+        elif kind == "POS":
+            cell = value
+            divergences += replanner.on_position(value)
+        elif kind == "DATA":
+            divergences += replanner.on_sensor(value[0], int(value[1]))[1]
+    return replanner, divergences, cell
+
+
+def test_simulated_car_given_its_pose_stays_on_the_plan():
+    replanner, divergences, cell = drive_simulated_car(pose=True)
+    assert divergences == 0 and replanner.walls_learned == 0
+    assert cell == (5, 5) and replanner.index == len(replanner.path) - 1
+
+
+def test_simulated_car_without_a_pose_reports_a_divergence():
+    replanner, divergences, cell = drive_simulated_car(pose=False)
+    assert divergences and replanner.reason.startswith("car at (")
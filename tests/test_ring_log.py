@@ -0,0 +1,41 @@
+from logging import DEBUG, ERROR, INFO, WARNING
+
+from ring_log import RingLog
+
+
+def texts(entries):
+    return [entry[3] for entry in entries]
+
+
+def test_select_filters_by_level_and_prefix():
+    log = RingLog(100)
+    log.extend([(DEBUG, "← DATA:front:30"), (INFO, "← STATUS:Completed"), (INFO, "→ EXEC"),
+                (WARNING, "Replanning: no path"), (ERROR, "Error reading: gone")])
+    assert texts(log.select(level=INFO)) == [
+        "← STATUS:Completed", "→ EXEC", "Replanning: no path", "Error reading: gone"]
+    assert texts(log.select(level=WARNING)) == ["Replanning: no path", "Error reading: gone"]
+    # A prefix matches the text, or the line after the direction mark
+    assert texts(log.select(prefix="DATA")) == ["← DATA:front:30"]
+    assert texts(log.select(prefix="→")) == ["→ EXEC"]
+    assert texts(log.select(prefix="Repl")) == ["Replanning: no path"]
+
+
+def test_select_after_returns_only_newer_entries():
+    log = RingLog(100)
+    for n in range(5):
+        log.add(f"line {n}")
+    last = log.select()[-1][0]
+    assert last == log.seq == 5
+    log.add("line 5", DEBUG)
+    log.add("line 6")
+    assert texts(log.select(after=last)) == ["line 5", "line 6"]
+    assert texts(log.select(after=last, level=INFO)) == ["line 6"]
+    assert log.select(after=log.seq) == []
+
+
+def test_ring_drops_the_oldest_entries():
+    log = RingLog(3)
+    log.extend((INFO, f"line {n}") for n in range(10))
+    assert len(log) == 3 and log.dropped == 7
+    entries = log.select()
+    assert [entry[0] for entry in entries] == [8, 9, 10]
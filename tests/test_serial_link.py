@@ -0,0 +1,57 @@
+from serial_link import MessageBus, coalesce
+
+MESSAGES = {
+    "STEP:1": ("STEP", 1),
+    "STEP:2": ("STEP", 2),
+    "STEP:3": ("STEP", 3),
+    "POS:0:1": ("POS", (0, 1)),
+    "POS:0:2": ("POS", (0, 2)),
+    "POS:1:1": ("POS", (1, 1)),
+    "POS:1:2": ("POS", (1, 2)),
+    "DATA:front:30": ("DATA", ("front", "30")),
+    "DATA:front:55": ("DATA", ("front", "55")),
+    "DATA:left:12": ("DATA", ("left", "12")),
+    "DATA:back:9": ("DATA", ("back", "9")),
+    "DATA:back:8": ("DATA", ("back", "8")),
+    "STATUS:Executing": ("STATUS", "Executing"),
+    "STATUS:Moving forward": ("STATUS", "Moving forward"),
+    "STATUS:Completed": ("STATUS", "Completed"),
+    "hello": ("TEXT", "hello"),
+    "Path received": ("TEXT", "Path received"),
+}
+
+
+def batch(*lines):
+    return [(line, MESSAGES[line]) for line in lines]
+
+
+def test_coalesce_keeps_latest_of_each_kind_in_order():
+    items = batch("STEP:1", "DATA:front:30", "POS:0:1", "DATA:left:12", "STATUS:Moving forward",
+                  "DATA:front:55", "STEP:2", "POS:0:2")
+    assert [line for line, _ in coalesce(items)] == [
+        "DATA:left:12", "STATUS:Moving forward", "DATA:front:55", "STEP:2", "POS:0:2"]
+
+
+def test_coalesce_keeps_every_other_message():
+    items = batch("STATUS:Executing", "hello", "STATUS:Completed", "Path received", "Path received")
+    assert coalesce(items) == items
+
+
+def test_coalesce_step_then_pos_ends_on_pos():
+    items = batch("POS:1:1", "STEP:3", "POS:1:2")
+    assert [line for line, _ in coalesce(items)] == ["STEP:3", "POS:1:2"]
+
+
+def test_coalesce_keeps_read_errors():
+    error = (None, ("ERROR", "device reports readiness to read but returned no data"))
+    items = batch("DATA:back:9") + [error] + batch("DATA:back:8")
+    assert coalesce(items) == [error] + batch("DATA:back:8")
+
+
+def test_message_bus_drains_in_order():
+    bus = MessageBus()
+    for n in range(300):
+        bus.put(n)
+    assert bus.drain(1.0, max_items=100) == list(range(100))
+    assert bus.drain(1.0) == list(range(100, 300))
+    assert bus.empty() and bus.drain(1.0) == []